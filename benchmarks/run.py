@@ -0,0 +1,240 @@
+"""
+Benchmarks for ecr's startup and hot paths.
+
+    python benchmarks/run.py [--full] [-o results.json] [--baseline file] [--save-baseline]
+
+Results are written as JSON. With a baseline (default: benchmarks/baseline.json
+if it exists), every result slower than the baseline by more than the tolerance
+is reported and the exit code is 1. Budgets are absolute limits checked on every run.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+sys.path.insert(0, SRC)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# absolute limits (s), independent of the baseline
+budgets: Dict[str, float] = {
+    "startup.commandOverhead": 0.25,  # `ecr -c` over a bare interpreter
+}
+
+Result = Dict[str, object]
+
+
+def measure(func: Callable[[], None], repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(times: List[float], unit: str = "s", scale: float = 1, **extra) -> Result:
+    ret: Result = {"value": statistics.median(times) / scale, "min": min(times) / scale,
+                   "unit": unit, "repeat": len(times)}
+    ret.update(extra)
+    return ret
+
+
+def getEnv(home: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["HOME"] = env["USERPROFILE"] = home
+    env["PYTHONPATH"] = SRC + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def benchStartup(work: str, repeat: int) -> Dict[str, Result]:
+    home = os.path.join(work, "home")
+    os.makedirs(home, exist_ok=True)
+    env = getEnv(home)
+
+    def call(args: List[str]) -> Callable[[], None]:
+        return lambda: subprocess.run([sys.executable] + args, cwd=home, env=env, check=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    call(["-m", "ecr", "-c", "pwd"])()  # create the global data once
+    bare = measure(call(["-c", "pass"]), repeat)
+    imp = measure(call(["-c", "import ecr.__main__"]), repeat)
+    cmd = measure(call(["-m", "ecr", "-c", "pwd"]), repeat)
+    return {
+        "startup.python": result(bare),
+        "startup.import": result(imp),
+        "startup.command": result(cmd),
+        "startup.commandOverhead": result([max(0, x - statistics.median(bare)) for x in cmd]),
+    }
+
+
+def benchLoad(work: str, repeat: int) -> Dict[str, Result]:
+    from ecr.core import manager
+    from ecr.core import path as ecrpath
+    wdir = os.path.join(work, "load")
+    os.makedirs(wdir, exist_ok=True)
+    manager.initialize(wdir)
+    past = time.time() - 60  # out of the config cache's racy window
+    for file in os.listdir(ecrpath.getMainPath(wdir)):
+        os.utime(os.path.join(ecrpath.getMainPath(wdir), file), (past, past))
+    cacheFile = ecrpath.getConfigCachePath(wdir)
+
+    def miss() -> None:
+        if os.path.isfile(cacheFile):
+            os.remove(cacheFile)
+        manager.load(wdir)
+
+    ret = {"load.parse": result(measure(miss, repeat))}
+    manager.load(wdir)
+    ret["load.cached"] = result(measure(lambda: manager.load(wdir), repeat))
+    return ret
+
+
+def benchRunCommands(work: str, repeat: int) -> Dict[str, Result]:
+    from ecr.core.manager import runCommands
+    steps = 10
+    noop = shutil.which("true")
+    cmd = noop if noop else f'"{sys.executable}" -c pass'
+    wdir = os.path.join(work, "run")
+    os.makedirs(wdir, exist_ok=True)
+
+    def run() -> None:
+        assert runCommands(io="ss", commands=[cmd] * steps, variables={}, wdir=wdir,
+                           getSystemCommand=lambda p: p, inputFile=None, outputFile=None,
+                           showLog=False)
+    return {"runCommands.step": result(measure(run, repeat), scale=steps, noop=cmd)}
+
+
+def benchPathCompleter(work: str, repeat: int) -> Dict[str, Result]:
+    from prompt_toolkit.document import Document
+    from ecr.ui import PathCompleter
+    count = 20000
+    wdir = os.path.join(work, "complete")
+    os.makedirs(wdir, exist_ok=True)
+    for i in range(count):
+        open(os.path.join(wdir, f"file{i}.cpp"), "w").close()
+    completer = PathCompleter(get_paths=lambda: [wdir])
+    doc = Document("run file1")
+    return {"pathCompleter.20k": result(
+        measure(lambda: list(completer.get_completions(doc, None)), repeat))}
+
+
+def writeData(file: str, size: int) -> None:
+    line = b"".join(f"{i} " .encode() for i in range(100)) + b"\n"
+    block = line * max(1, (1 << 20) // len(line))
+    with open(file, "wb") as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+
+
+def benchJudger(work: str, repeat: int, full: bool) -> Dict[str, Result]:
+    from ecr.lib.judger import compareFiles, JudgeResult
+    sizes = [("1MB", 1 << 20, repeat), ("100MB", 100 << 20, max(1, repeat // 3))]
+    if full:
+        sizes.append(("1GB", 1 << 30, 1))
+    ret = {}
+    for name, size, rep in sizes:
+        std, out = os.path.join(work, f"std{name}"), os.path.join(work, f"out{name}")
+        writeData(std, size)
+        shutil.copyfile(std, out)
+
+        def judge() -> None:
+            assert compareFiles(std, out)[0] == JudgeResult.Accept
+        times = measure(judge, rep)
+        ret[f"judger.text.{name}"] = result(times, mbPerSecond=size / (1 << 20) / statistics.median(times))
+        os.remove(std)
+        os.remove(out)
+    return ret
+
+
+def compare(results: Dict[str, Result], baseline: Optional[Dict[str, Result]], tolerance: float) -> List[str]:
+    failures = []
+    for name, limit in budgets.items():
+        if name in results and results[name]["value"] > limit:  # type: ignore
+            failures.append(f"{name}: {results[name]['value']:.4f}s over budget {limit:.4f}s")
+    if not baseline:
+        return failures
+    for name, item in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], item["value"]
+        ratio = new / old if old else 1  # type: ignore
+        mark = ""
+        if ratio > 1 + tolerance:
+            mark = "  REGRESSION"
+            failures.append(f"{name}: {old:.6f} -> {new:.6f} ({ratio:.2f}x)")
+        print(f"  {name.ljust(28)} {ratio:6.2f}x{mark}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ecr benchmarks")
+    parser.add_argument("-o", "--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("-b", "--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", default=False,
+                        help="Store the results as the baseline")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("-r", "--repeat", type=int, default=10, help="Repeats per benchmark")
+    parser.add_argument("--full", action="store_true", default=False, help="Include the 1GB judger case")
+    parser.add_argument("-k", "--only", default=None, help="Only run groups starting with this prefix")
+    args = parser.parse_args()
+
+    from ecr import __version__
+    groups = {
+        "startup": lambda w: benchStartup(w, args.repeat),
+        "load": lambda w: benchLoad(w, args.repeat),
+        "runCommands": lambda w: benchRunCommands(w, args.repeat),
+        "pathCompleter": lambda w: benchPathCompleter(w, args.repeat),
+        "judger": lambda w: benchJudger(w, args.repeat, args.full),
+    }
+    results: Dict[str, Result] = {}
+    for name, func in groups.items():
+        if args.only and not name.startswith(args.only):
+            continue
+        work = tempfile.mkdtemp(prefix="ecr-bench-")
+        try:
+            for key, item in func(work).items():
+                results[key] = item
+                print(f"{key.ljust(28)} {item['value']:.6f}{item['unit']}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    data = {"version": __version__, "python": platform.python_version(),
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = None
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"Compared with {args.baseline}:")
+    failures = compare(results, baseline, args.tolerance)
+    for item in failures:
+        print(f"FAIL {item}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -55,5 +55,8 @@ setup(
         "watchdog>=0.9.0",
         "pygments>=2.2.0",
         "PyYAML>=3.13"
-    ]
+    ],
+    extras_require={
+        "zstd": ["zstandard"],
+    }
 )
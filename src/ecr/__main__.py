@@ -2,12 +2,10 @@ import os
 import shlex
 import sys
 from argparse import ArgumentParser, Namespace
-from typing import List, NoReturn
+from typing import List, NoReturn, Set
 
-import prompt_toolkit
-
-from . import commands, core, helper, log, shared, ui
-from .core import defaultData, getSystemCommand, manager
+from . import commands, helper, log, shared, ui
+from .core import defaultData, getSystemCommand, globalData, manager
 
 itParser: ArgumentParser = ArgumentParser()
 
@@ -33,14 +31,18 @@ class ITParser(ArgumentParser):
 builtinCmdLists: List[str] = list(commands.commandVerbs)
 
 
+_subParsers = None
+_parsedVerbs: Set[str] = set()
+
+
 def getITParser()->ITParser:
+    """The parser of builtin commands; the parser of a command is added by `addCommandParser`."""
+    global _subParsers
     parser = ITParser(
         prog="", description="Code Runner", add_help=True)
 
-    subpars = parser.add_subparsers()
-
-    for cmd in commands.commands:
-        cmd.createParser(subpars)
+    _subParsers = parser.add_subparsers()
+    _parsedVerbs.clear()
 
     # cmd_help = subpars.add_parser("help", help="Help")
     # cmd_help.set_defaults(func=gethelp)
@@ -48,6 +50,14 @@ def getITParser()->ITParser:
     return parser
 
 
+def addCommandParser(verb: str)->None:
+    """Import the command of `verb` and add its parser, so only dispatched commands are imported."""
+    if verb in _parsedVerbs:
+        return
+    commands.getCommand(verb).createParser(_subParsers)
+    _parsedVerbs.add(verb)
+
+
 def doSyscall(cmd, message) -> int:
     log.debug(f"System call: {cmd}")
     console = ui.getConsole()
@@ -65,25 +75,18 @@ def doSyscall(cmd, message) -> int:
 defaultPrompt = "> "
 
 
-def mainInit()->None:
+def mainInit(interactive: bool = True)->None:
     global itParser
-    from prompt_toolkit import PromptSession
-    # from pygments.lexers.shell import BashLexer
-    from .ui.helper.BashLexer import BashLexer
-    from prompt_toolkit.lexers import PygmentsLexer
-    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 
     itParser = getITParser()
     shared.setCwd(os.getcwd())
 
     helper.loadMan()
 
-    cliInputSession = PromptSession(
-        message=defaultPrompt,
-        lexer=PygmentsLexer(BashLexer),
-        auto_suggest=AutoSuggestFromHistory())
-
-    ui.setConsole(ui.CLI(inputCommandSession=cliInputSession))
+    if interactive:
+        ui.setConsole(ui.CLI(inputCommandSession=ui.cli.createInputCommandSession(defaultPrompt)))
+    else:  # `-c`: no prompt_toolkit, pygments or completers
+        ui.setConsole(ui.PlainCLI())
 
     log.debug("Main initializing finished.")
 
@@ -96,6 +99,11 @@ def executeCommand(oricmd: str) -> int:
     if cargs[0].startswith(">"):
         return doSyscall(oricmd[1:], "Call system command:")
     else:
+        if cargs[0] in commands.commandVerbs:
+            addCommandParser(cargs[0])
+        elif cargs[0] in ("-h", "--help"):
+            for verb in commands.commandVerbs:
+                addCommandParser(verb)
         try:
             cmd = itParser.parse_args(cargs)
         except BasicError as e:  # when parse failed, parser will call exit()
@@ -107,6 +115,10 @@ def executeCommand(oricmd: str) -> int:
                     f"{importedCommand[cargs[0]]} {' '.join(cargs[1:])}", "Imported command:")
             else:
                 console.warning("We can't recognize this command:")
+                if cargs[0] not in commands.commandVerbs and not cargs[0].startswith("-"):
+                    # the parsers of commands not dispatched yet are not added
+                    e = BasicError(f"invalid choice: {cargs[0]!r} (choose from "
+                                   f"{', '.join(map(repr, commands.commandVerbs))})")
                 console.write(f"  {e}")
                 if console.confirm("Do you mean a system command?",
                                    [ui.SwitchState.Yes, ui.SwitchState.No])\
@@ -120,7 +132,7 @@ def executeCommand(oricmd: str) -> int:
     return 0
 
 
-def getCommandCompleter()->prompt_toolkit.completion.Completer:
+def getCommandCompleter():
     from prompt_toolkit.completion import WordCompleter, merge_completers
     cmdLists = list(builtinCmdLists)
     man = shared.getManager()
@@ -148,7 +160,7 @@ def main()->int:  # pragma: no cover
         "-c", "--command", default=None, help="Execute command")
     baseCmd = baseParser.parse_args()
     if baseCmd.version:
-        return commands.VersionCommand.default(Namespace()).value
+        return commands.getCommand("version").func(Namespace()).value
     if baseCmd.dir:
         os.chdir(baseCmd.dir)
     if baseCmd.verbose:
@@ -157,13 +169,13 @@ def main()->int:  # pragma: no cover
         log.initializeLogger(level=log.logging.INFO,
                              data=shared.getLogData())
 
-    if not core.globalData.exists():
+    if not globalData.exists():
         try:
-            core.globalData.initialize()
+            globalData.initialize()
         except:
             log.errorWithException("Loading global failed.")
 
-    mainInit()
+    mainInit(interactive=not baseCmd.command)
 
     if baseCmd.command:
         return executeCommand(baseCmd.command)
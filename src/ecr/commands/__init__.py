@@ -1,35 +1,42 @@
-from typing import List
+import importlib
+from typing import Dict, List, Tuple
 
 from ..ui.command import Command
-from .cmd_cd import CdCommand
-from .cmd_clean import CleanCommand
-from .cmd_clear import ClearCommand
-from .cmd_cls import ClsCommand
-from .cmd_debug import DebugCommand
-from .cmd_edit import EditCommand
-from .cmd_exit import ExitCommand
-from .cmd_init import InitCommand
-from .cmd_new import NewCommand
-from .cmd_now import NowCommand
-from .cmd_pwd import PwdCommand
-from .cmd_reload import ReloadCommand
-from .cmd_run import RunCommand
-from .cmd_status import StatusCommand
-from .cmd_template import TemplateCommand
-from .cmd_test import TestCommand
-from .cmd_version import VersionCommand
 
-commands: List[Command] = [
-    CdCommand(), CleanCommand(), ClearCommand(), ClsCommand(),
-    DebugCommand(),
-    EditCommand(), ExitCommand(),
-    InitCommand(),
-    NewCommand(), NowCommand(),
-    PwdCommand(),
-    ReloadCommand(), RunCommand(),
-    StatusCommand(),
-    TemplateCommand(), TestCommand(),
-    VersionCommand(),
-]
+# verb: (module, class); a module is imported only when its command is dispatched
+commandModules: Dict[str, Tuple[str, str]] = {
+    "background": ("cmd_background", "BackgroundCommand"),
+    "bench": ("cmd_bench", "BenchCommand"),
+    "cd": ("cmd_cd", "CdCommand"),
+    "clean": ("cmd_clean", "CleanCommand"),
+    "clear": ("cmd_clear", "ClearCommand"),
+    "cls": ("cmd_cls", "ClsCommand"),
+    "complexity": ("cmd_complexity", "ComplexityCommand"),
+    "debug": ("cmd_debug", "DebugCommand"),
+    "edit": ("cmd_edit", "EditCommand"),
+    "exit": ("cmd_exit", "ExitCommand"),
+    "init": ("cmd_init", "InitCommand"),
+    "minimize": ("cmd_minimize", "MinimizeCommand"),
+    "new": ("cmd_new", "NewCommand"),
+    "now": ("cmd_now", "NowCommand"),
+    "pwd": ("cmd_pwd", "PwdCommand"),
+    "reload": ("cmd_reload", "ReloadCommand"),
+    "run": ("cmd_run", "RunCommand"),
+    "status": ("cmd_status", "StatusCommand"),
+    "stress": ("cmd_stress", "StressCommand"),
+    "template": ("cmd_template", "TemplateCommand"),
+    "test": ("cmd_test", "TestCommand"),
+    "version": ("cmd_version", "VersionCommand"),
+}
 
-commandVerbs: List[str] = [x.verb for x in commands]
+commandVerbs: List[str] = list(commandModules)
+
+_commands: Dict[str, Command] = {}
+
+
+def getCommand(verb: str) -> Command:
+    """The command of `verb`, importing its module on first use."""
+    if verb not in _commands:
+        module, name = commandModules[verb]
+        _commands[verb] = getattr(importlib.import_module(f".{module}", __name__), name)()
+    return _commands[verb]
@@ -0,0 +1,109 @@
+import os
+import tempfile
+from typing import List, Optional, cast
+
+from .. import shared, ui
+from ..core import WorkItemType, WorkManager
+from ..core.manager import CancelToken
+from ..ui.command import Command, Namespace, ReturnCode
+from .helper import assertInited
+
+
+class BackgroundBuilder:
+    """
+    Compile the current file work-item on a worker thread whenever it is saved.
+    The compile cache keeps the result, so a later `run` or `test` starts the program
+    right away; compile errors are written to the console when they happen.
+    """
+
+    def __init__(self, tman: WorkManager):
+        from watchdog.observers import Observer
+        from .watcher import ChangeEventHandler, DebouncedRunner
+        self.tman: WorkManager = tman
+        self.runner = DebouncedRunner(self.build, self.files)
+        self.observer = Observer()
+        self.observer.schedule(ChangeEventHandler(
+            lambda p: p in self.files(), self.runner.notify), tman.workingDirectory, recursive=False)
+
+    def files(self) -> List[str]:
+        item = self.tman.currentFile
+        if shared.getManager() is not self.tman or not item or item.type != WorkItemType.File:
+            return []
+        return [os.path.abspath(os.path.join(self.tman.workingDirectory, item.name))]
+
+    def build(self, token: CancelToken, changed: List[str]) -> None:  # pylint: disable=W0613
+        item = self.tman.currentFile
+        if shared.getManager() is not self.tman or not item or item.type != WorkItemType.File:
+            return
+        console = ui.getConsole()
+        fd, output = tempfile.mkstemp(prefix="ecr-build-")
+        os.close(fd)
+        try:
+            step = self.tman.build(item, showLog=False, cancelToken=token, compileOutput=output)
+            if step or token.cancelled:
+                return
+            with open(output, "r", encoding="utf-8", errors="replace") as f:
+                message = f.read().rstrip()
+            console.error(f"Background build of {item.name} failed")
+            if message:
+                console.write(message)
+        finally:
+            os.remove(output)
+
+    def start(self) -> None:
+        self.runner.start(initial=True)
+        self.observer.start()
+
+    def stop(self) -> None:
+        self.observer.stop()
+        self.runner.stop()
+        self.observer.join()
+
+    def wait(self) -> None:
+        self.runner.waitIdle()
+
+
+_builder: Optional[BackgroundBuilder] = None
+
+
+def waitBackgroundBuild() -> None:
+    """Let a running background build finish, so `run` and `test` find it in the compile cache."""
+    if _builder:
+        _builder.wait()
+
+
+def stopBackgroundBuild() -> None:
+    global _builder
+    if _builder:
+        _builder.stop()
+        _builder = None
+
+
+class BackgroundCommand(Command):
+    @staticmethod
+    def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
+        global _builder
+        if not assertInited():
+            return ReturnCode.UNLOADED
+        tman: WorkManager = cast(WorkManager, shared.getManager())
+        console = ui.getConsole()
+        state = args.state if args.state else ("off" if _builder else "on")
+        if state == "on":
+            if not _builder:
+                _builder = BackgroundBuilder(tman)
+                _builder.start()
+            console.info("Background building is on")
+        else:
+            stopBackgroundBuild()
+            console.info("Background building is off")
+        return ReturnCode.OK
+
+    def __init__(self):
+        super().__init__("background", help="Compile the current file in the background on save",
+                         func=BackgroundCommand.default)
+
+    def createParser(self, parsers):
+        cmd = super().createParser(parsers)
+        cmd.add_argument("state", nargs="?", choices=["on", "off"], default=None,
+                         help="Turn on or off (default: toggle)")
+        return cmd
@@ -0,0 +1,149 @@
+import math
+import os
+import shutil
+import statistics
+import tempfile
+from typing import List, Optional, Tuple, cast
+
+from .. import shared, ui
+from ..core import WorkManager, defaultData
+from ..core import path as ecrpath
+from ..core._CompileCache import getChangedFiles, snapshot
+from ..core.manager import BenchCandidate, runInterleaved
+from ..lib.datafile import packExts
+from ..lib.multitest import findCases
+from ..lib.stats import geomeanInterval, speedupInterval
+from ..ui.command import Command, Namespace, ReturnCode
+from .helper import assertInited
+
+
+def formatSpeedup(value: Tuple[float, float, float]) -> str:
+    speedup, low, high = value
+    if low != low:  # nan, not enough samples
+        return f"{speedup:.3f}x"
+    return f"{speedup:.3f}x [{low:.3f}, {high:.3f}]"
+
+
+class BenchCommand(Command):
+    @staticmethod
+    def getCases(tman: WorkManager, data: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+        dataPath = data if data else os.path.join(tman.workingDirectory, "data")
+        if os.path.isdir(dataPath) or any(os.path.isfile(dataPath + x) for x in packExts):
+            cases = findCases(dataPath)
+            if cases or data:
+                return [(x.name, x.inputFile) for x in cases]
+        return [("input", ecrpath.getFileInputPath(tman.getConfigPath()))]
+
+    @staticmethod
+    def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
+        if not assertInited():
+            return ReturnCode.UNLOADED
+        tman: WorkManager = cast(WorkManager, shared.getManager())
+        console = ui.getConsole()
+        if len(args.files) < 2:
+            console.error("Give at least two files to compare")
+            return ReturnCode.ERROR
+
+        # `file@executor` builds the file with another entry of executor.yml
+        specs = [x.split("@", 1) if "@" in x else [x, None] for x in args.files]
+        sources = [x[0] for x in specs]
+        candidates: List[BenchCandidate] = []
+        builtFiles: List[str] = []
+        try:
+            for ind, (file, executor) in enumerate(specs):
+                commands = None
+                if executor:
+                    if executor not in tman.executorMap:
+                        console.error(f"Executor not found: {executor}")
+                        return ReturnCode.ERROR
+                    commands = tman.executorMap[executor]
+                variables = None
+                if sources.count(file) > 1:  # keep the builds of the same file apart
+                    variables = {defaultData.CMDVAR_FileNameWithoutExt:
+                                 f"{os.path.splitext(file)[0]}.bench{ind}"}
+                item = tman.getWorkItem(file, False)
+                before = snapshot(tman.workingDirectory)
+                step = tman.build(item, variables, commands)
+                if variables:
+                    builtFiles += getChangedFiles(before, snapshot(tman.workingDirectory))
+                if not step:
+                    console.error(f"Building {args.files[ind]} failed")
+                    return ReturnCode.RUNERR
+                candidates.append(BenchCandidate(args.files[ind], step, tman.workingDirectory))
+
+            cases = BenchCommand.getCases(tman, args.data)
+            if not cases:
+                console.error("No input data")
+                return ReturnCode.ERROR
+            tempDir = tempfile.mkdtemp(prefix="ecr-bench-")
+            try:
+                result = runInterleaved(candidates, cases, args.repeat, args.warmup, tempDir,
+                                        onCase=lambda x: console.info(f"Benchmarking on {x}"))
+            finally:
+                shutil.rmtree(tempDir, ignore_errors=True)
+        finally:
+            for file in builtFiles:
+                try:
+                    os.remove(os.path.join(tman.workingDirectory, file))
+                except OSError:
+                    pass
+
+        if result.failure:
+            console.error(result.failure)
+            return ReturnCode.RUNERR
+        BenchCommand.printResult(result)
+        if any(result.mismatches):
+            for message in result.mismatches:
+                if message:
+                    console.write(message)
+            console.error("Outputs differ")
+            return ReturnCode.JUDGEERR
+        return ReturnCode.OK
+
+    @staticmethod
+    def printResult(result) -> None:
+        console = ui.getConsole()
+        names = [x.name for x in result.candidates]
+        base = names[0]
+        nameLen = max([len("geomean")] + [len(x[0]) for x in result.cases])
+        heads = [f"{x}(ms)" for x in names] + [f"{x} vs {base}" for x in names[1:]]
+        widths = [max(12, len(x)) for x in heads[:len(names)]] + \
+            [max(28, len(x)) for x in heads[len(names):]]
+        console.write("Input".ljust(nameLen) + "".join(
+            "  " + x.rjust(w) for x, w in zip(heads, widths)))
+        logs: List[List[float]] = [[] for _ in names]
+        for ci, (caseName, _) in enumerate(result.cases):
+            cells = [f"{statistics.median(result.times[k][ci]) * 1000:.3f}"
+                     for k in range(len(names))]
+            for k in range(1, len(names)):
+                speedup = speedupInterval(result.times[0][ci], result.times[k][ci])
+                if speedup[0] == speedup[0]:
+                    logs[k].append(math.log(speedup[0]))
+                cells.append(formatSpeedup(speedup))
+            line = caseName.ljust(nameLen) + "".join(
+                "  " + x.rjust(w) for x, w in zip(cells, widths))
+            if result.mismatches[ci]:
+                console.error(line)
+            else:
+                console.write(line)
+        if len(result.cases) > 1:
+            cells = ["" for _ in names] + [formatSpeedup(geomeanInterval(logs[k]))
+                                           if logs[k] else "-" for k in range(1, len(names))]
+            console.write("geomean".ljust(nameLen) + "".join(
+                "  " + x.rjust(w) for x, w in zip(cells, widths)))
+        console.write("Speedup > 1 means faster than the first; 95% confidence intervals in brackets.")
+
+    def __init__(self):
+        super().__init__("bench", help="Compare the speed of solutions", func=BenchCommand.default)
+
+    def createParser(self, parsers):
+        cmd = super().createParser(parsers)
+        cmd.add_argument("files", nargs="+", metavar="file[@executor]",
+                         help="Code files, the first one is the baseline")
+        cmd.add_argument("-n", "--repeat", type=int, default=10,
+                         help="Timed runs of each file per input (default: 10)")
+        cmd.add_argument("--warmup", type=int, default=1,
+                         help="Untimed runs per input, including the output check (default: 1)")
+        cmd.add_argument("--data", default=None,
+                         help="Directory with input files (default: ./data if it has any, else the input file)")
+        return cmd
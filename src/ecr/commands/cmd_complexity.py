@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from typing import cast
+
+from .. import shared, ui
+from ..core import WorkManager, WorkItem
+from ..core.manager import geometricSizes, measureScaling
+from ..lib.stats import fitComplexity
+from ..ui.command import Command, Namespace, ReturnCode
+from .helper import assertInited
+
+
+class ComplexityCommand(Command):
+    @staticmethod
+    def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
+        if not assertInited():
+            return ReturnCode.UNLOADED
+        tman: WorkManager = cast(WorkManager, shared.getManager())
+        console = ui.getConsole()
+
+        if not args.solution and not tman.currentFile:
+            console.error("No solution, use -s or `now` to choose one")
+            return ReturnCode.ERROR
+        sizes = geometricSizes(args.min, args.max, args.factor) if args.factor > 1 else []
+        if len(sizes) < 3:
+            console.error("Give at least three sizes (--min, --max, --factor)")
+            return ReturnCode.ERROR
+        solution = args.solution if args.solution else cast(WorkItem, tman.currentFile).name
+        steps = []
+        for file in (args.generator, solution):
+            step = tman.build(tman.getWorkItem(file, False))
+            if not step:
+                console.error(f"Building {file} failed")
+                return ReturnCode.RUNERR
+            steps.append(step)
+        generator, program = steps
+
+        console.write(f"{'n':>12}  {'time(ms)':>12}")
+        tempDir = tempfile.mkdtemp(prefix="ecr-complexity-")
+        try:
+            result = measureScaling(generator, program, tman.workingDirectory, tempDir, sizes,
+                                    args.repeat, args.budget,
+                                    onPoint=lambda n, t: console.write(f"{n:>12}  {t * 1000:>12.3f}"))
+        finally:
+            shutil.rmtree(tempDir, ignore_errors=True)
+        if result.failure:
+            console.error(result.failure)
+            return ReturnCode.RUNERR
+        if result.timeOut is not None:
+            console.warning(f"Time limit exceeded at n = {result.timeOut}")
+        if len(result.points) < 3:
+            console.error("Too few sizes measured to fit, lower --min")
+            return ReturnCode.ERROR
+
+        fits = fitComplexity([x[0] for x in result.points], [x[1] for x in result.points])
+        best = fits[0]
+        console.write("Fits: " + ", ".join(f"{x.name} {x.error * 100:.1f}%" for x in fits[:3])
+                      + " (relative error)")
+        console.info(f"Best fit: {best.name}")
+        limitN = args.limit_n if args.limit_n else args.max
+        projected = best.predict(limitN)
+        timeLimit = program.limit.timeLimit
+        console.write(f"Projected at n = {limitN}: {projected:.3f}s" +
+                      (f" (time limit {timeLimit}s)" if timeLimit else ""))
+        if timeLimit and projected > timeLimit:
+            console.error("Expected to exceed the time limit")
+            return ReturnCode.JUDGEERR
+        return ReturnCode.OK
+
+    def __init__(self):
+        super().__init__("complexity", help="Estimate the time complexity of code",
+                         func=ComplexityCommand.default)
+
+    def createParser(self, parsers):
+        cmd = super().createParser(parsers)
+        cmd.add_argument("generator", help="Generator, run with n as its argument")
+        cmd.add_argument("-s", "--solution", default=None,
+                         help="Code file to measure (default: current file)")
+        cmd.add_argument("--min", type=int, default=1000, help="Smallest n (default: 1000)")
+        cmd.add_argument("--max", type=int, default=1000000, help="Largest n (default: 1000000)")
+        cmd.add_argument("--factor", type=float, default=2, help="Ratio between sizes (default: 2)")
+        cmd.add_argument("-n", "--repeat", type=int, default=3,
+                         help="Timed runs per size, the median is used (default: 3)")
+        cmd.add_argument("--budget", type=float, default=1,
+                         help="Stop growing n once a run takes longer, in seconds (default: 1)")
+        cmd.add_argument("--limit-n", type=int, default=None,
+                         help="n to project the time at (default: --max)")
+        return cmd
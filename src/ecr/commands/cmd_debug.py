@@ -22,6 +22,12 @@ class DebugCommand(Command):
                 import json
                 out.write(json.dumps(
                     cast(WorkManager, shared.getManager()).__dict__, default=str, indent=4))
+            if args.time:
+                if not assertInited():
+                    return ReturnCode.UNLOADED
+                tman = cast(WorkManager, shared.getManager())
+                out.write(f"Config loaded in {tman.loadTime * 1000:.1f}ms"
+                          f" ({'from cache' if tman.configCached else 'parsed'})")
             if args.current:
                 if not assertInited():
                     return ReturnCode.UNLOADED
@@ -77,6 +83,8 @@ class DebugCommand(Command):
                          default=False, help="Show ECR data")
         cmd.add_argument("-c", "--current", action="store_true",
                          default=False, help="Show current work-item")
+        cmd.add_argument("-t", "--time", action="store_true",
+                         default=False, help="Show config load time")
         cmd.add_argument("-os", "--os", action="store_true",
                          default=False, help="Show OS data")
         cmd.add_argument("-l", "--log", action="store_true",
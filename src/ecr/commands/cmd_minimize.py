@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from typing import cast
+
+from .. import shared, ui
+from ..core import WorkManager, WorkItem
+from ..core.manager import FailureTester, minimize, predicates
+from ..ui.command import Command, Namespace, ReturnCode
+from .helper import assertInited
+
+
+class MinimizeCommand(Command):
+    @staticmethod
+    def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
+        if not assertInited():
+            return ReturnCode.UNLOADED
+        tman: WorkManager = cast(WorkManager, shared.getManager())
+        console = ui.getConsole()
+
+        if not args.solution and not tman.currentFile:
+            console.error("No solution, use -s or `now` to choose one")
+            return ReturnCode.ERROR
+        if args.on == "wrong" and not args.reference:
+            console.error("Checking for wrong answers needs a reference, use -r")
+            return ReturnCode.ERROR
+        if not os.path.isfile(args.input):
+            console.error(f"Input not found: {args.input}")
+            return ReturnCode.ERROR
+
+        solution = args.solution if args.solution else cast(WorkItem, tman.currentFile).name
+        steps = []
+        for file in [solution] + ([args.reference] if args.reference else []):
+            step = tman.build(tman.getWorkItem(file, False))
+            if not step:
+                console.error(f"Building {file} failed")
+                return ReturnCode.RUNERR
+            steps.append(step)
+
+        with open(args.input, "rb") as f:
+            data = f.read()
+        tempDir = tempfile.mkdtemp(prefix="ecr-minimize-")
+        try:
+            tester = FailureTester(steps[0], steps[1] if len(steps) > 1 else None,
+                                   tman.workingDirectory, tempDir, args.on)
+            result = minimize(data, tester, args.jobs,
+                              onReduce=lambda name, size: console.info(f"By {name}: {size} bytes"))
+        finally:
+            shutil.rmtree(tempDir, ignore_errors=True)
+
+        if result.message is None:
+            console.error(f"{solution} does not fail on {args.input}")
+            return ReturnCode.ERROR
+        output = args.output if args.output else "{0}.min{1}".format(*os.path.splitext(args.input))
+        with open(output, "wb") as f:
+            f.write(result.data)
+        console.write(f"{len(data)} -> {len(result.data)} bytes, "
+                      f"{result.tests} runs, {result.cacheHits} cached")
+        console.write(result.message)
+        console.ok(f"Saved as {output}")
+        return ReturnCode.OK
+
+    def __init__(self):
+        super().__init__("minimize", help="Shrink a failing input", func=MinimizeCommand.default)
+
+    def createParser(self, parsers):
+        cmd = super().createParser(parsers)
+        cmd.add_argument("input", help="Input file the solution fails on")
+        cmd.add_argument("-s", "--solution", default=None,
+                         help="Code file to check (default: current file)")
+        cmd.add_argument("-r", "--reference", default=None,
+                         help="Reference solution, needed to detect wrong answers")
+        cmd.add_argument("--on", choices=predicates, default=predicates[0],
+                         help="Kind of failure to keep (default: any)")
+        cmd.add_argument("-j", "--jobs", type=int, default=None,
+                         help="Parallel runs (default: cpu count)")
+        cmd.add_argument("-o", "--output", default=None,
+                         help="Where to save the result (default: <input>.min<ext>)")
+        return cmd
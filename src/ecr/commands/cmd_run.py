@@ -1,45 +1,44 @@
-import os
-import time
-from typing import cast
-
-from watchdog.events import FileSystemEventHandler
+from typing import List, Tuple, cast
 
 from .. import shared, ui
 from ..core import WorkItem, WorkItemType, WorkManager
 from ..core.defaultData import CIO_Types, CIO_SISO
+from ..core.manager import CancelToken, firstAffectedStep
+from ..lib.stats import Summary
 from ..ui.command import Command, Namespace, ReturnCode
+from .cmd_background import waitBackgroundBuild
 from .helper import assertInited, getItem, printFileModify
 
 
-class RunWatchEventHandler(FileSystemEventHandler):
-    def __init__(self, file, func):
-        self.func = func
-        self.file = file
-        self.state = False
-
-    def on_moved(self, event):  # pylint: disable=W0235
-        super().on_moved(event)
-        # self.func()
-
-        # what = 'directory' if event.is_directory else 'file'
-        # logging.info("Moved %s: from %s to %s", what, event.src_path,event.dest_path)
-
-    def on_created(self, event):  # pylint: disable=W0235
-        super().on_created(event)
-
-    def on_deleted(self, event):  # pylint: disable=W0235
-        super().on_deleted(event)
-        # self.func()
-
-    def on_modified(self, event):
-        super().on_modified(event)
-        if not self.file or os.path.split(event.src_path)[-1] == self.file:
-            self.state = not self.state
-            if self.state:  # one modify raise two event
-                self.func()
+def printBenchmark(name: str, rows: List[Tuple[str, List[float]]], warmup: int) -> None:
+    console = ui.getConsole()
+    console.info(f"Benchmark {name}: {len(rows[0][1])} runs after {warmup} warmup")
+    heads = ["min", "median", "mean", "p95", "stddev", "outliers"]
+    console.write("".ljust(10) + "".join(x.rjust(10) for x in heads))
+    for title, values in rows:
+        s = Summary(values)
+        console.write(title.ljust(10) + "".join(f"{x:10.3f}" for x in (
+            s.min, s.median, s.mean, s.p95, s.stddev)) + str(s.rejected).rjust(10))
 
 
 class RunCommand(Command):
+    @staticmethod
+    def bench(tman: WorkManager, item: WorkItem, repeat: int, warmup: int) -> ReturnCode:
+        console = ui.getConsole()
+        results = tman.benchmark(repeat, warmup, item=item)
+        if results is None:
+            console.error("Running failed")
+            return ReturnCode.RUNERR
+        if not results:
+            console.warning("Nothing to benchmark")
+            return ReturnCode.OK
+        printBenchmark(item.name, [
+            ("Wall(ms)", [x.wallTime * 1000 for x in results]),
+            ("CPU(ms)", [x.cpuTime * 1000 for x in results]),
+            ("RSS(MB)", [x.maxRss / 1024 for x in results]),
+        ], warmup)
+        return ReturnCode.OK
+
     @staticmethod
     def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
         if not assertInited():
@@ -76,7 +75,11 @@ class RunCommand(Command):
 
         result = ret[0] if len(ret) > 0 else False """
 
-        if not args.watch:
+        waitBackgroundBuild()
+        if getattr(args, "bench", None):
+            item, file = getItem(tman, args)
+            return RunCommand.bench(tman, item, args.bench, args.warmup)
+        elif not args.watch:
             item, file = getItem(tman, args)
             if item.type == WorkItemType.Directory:
                 args.io = CIO_SISO
@@ -87,36 +90,29 @@ class RunCommand(Command):
                 return ReturnCode.RUNERR
             return ReturnCode.OK
         else:
-            file = args.file if args.file else cast(
-                WorkItem, tman.currentFile).name
+            item, file = getItem(tman, args)
+            if item.type == WorkItemType.Directory:
+                args.io = CIO_SISO
 
-            def func():
-                item, file = getItem(tman, args)
-                if item.type == WorkItemType.Directory:
-                    args.io = CIO_SISO
+            def func(token: CancelToken, changed: List[str]):
                 console.clear()
                 console.info(f"Watching", end=" ")
                 printFileModify(file)
-                result = tman.execute(io=args.io, item=item)
-                if not result:
+                start = 0
+                if item.type == WorkItemType.Directory:
+                    start = firstAffectedStep(item.run, relativePaths(item.path, changed))
+                    if start is None:
+                        console.info("No run step depends on the changed files")
+                        return
+                result = tman.execute(io=args.io, item=item, cancelToken=token, startStep=start)
+                if token.cancelled:
+                    console.warning("Cancelled by a newer change")
+                elif not result:
                     console.error("Running failed")
 
-            from watchdog.observers import Observer
+            from .watcher import relativePaths, watchItem
             console.info(f"Watching {file} (press ctrl+c to end)")
-
-            path = tman.workingDirectory if item.type == WorkItemType.File else item.path
-            event_handler = RunWatchEventHandler(
-                file if item.type == WorkItemType.File else None, func)
-            observer = Observer()
-            observer.schedule(event_handler, path, recursive=False)
-            observer.start()
-            try:
-                while True:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                observer.stop()
-                console.info("Watching end.")
-            observer.join()
+            watchItem(tman.workingDirectory, item, func)
             return ReturnCode.OK
 
     def __init__(self):
@@ -132,4 +128,8 @@ class RunCommand(Command):
                          default=False, help="Watch the file and run auto till Ctrl-C")
         cmd.add_argument("-d", "--dir", action="store_true",
                          default=False, help="As directory")
+        cmd.add_argument("-b", "--bench", type=int, default=None, metavar="N",
+                         help="Compile once, then time N runs of the program on the input file")
+        cmd.add_argument("--warmup", type=int, default=1,
+                         help="Untimed runs before benchmarking (default: 1)")
         return cmd
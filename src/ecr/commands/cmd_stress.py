@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from typing import List, cast
+
+from .. import shared, ui
+from ..core import WorkManager
+from ..core._Step import CommandStep
+from ..core.manager import runStress, saveCase
+from ..ui.command import Command, Namespace, ReturnCode
+from .helper import assertInited
+
+
+class StressCommand(Command):
+    @staticmethod
+    def default(args: Namespace)->ReturnCode:  # pylint: disable=W0613
+        if not assertInited():
+            return ReturnCode.UNLOADED
+        tman: WorkManager = cast(WorkManager, shared.getManager())
+        console = ui.getConsole()
+
+        steps: List[CommandStep] = []
+        for file in (args.generator, args.reference, args.solution):
+            step = tman.build(tman.getWorkItem(file, False))
+            if not step:
+                console.error(f"Building {file} failed")
+                return ReturnCode.RUNERR
+            steps.append(step)
+
+        console.info(f"Stress testing {args.solution} against {args.reference} (press ctrl+c to stop)")
+        tempDir = tempfile.mkdtemp(prefix="ecr-stress-")
+        try:
+            result = runStress(*steps, wdir=tman.workingDirectory, tempDir=tempDir,
+                               iterations=args.iterations, workers=args.jobs, seed=args.seed)
+            console.write(f"{result.iterations} iterations in {result.elapsed:.3f}s, "
+                          f"{result.speed:.1f} iterations/s")
+            if result.failure:
+                console.error(result.failure)
+                return ReturnCode.RUNERR
+            case = result.counterexample
+            if not case:
+                console.ok("No counterexample found")
+                return ReturnCode.OK
+            console.error(f"Counterexample found with seed {case.seed}")
+            console.write(case.message)
+            dataPath = args.data if args.data else os.path.join(tman.workingDirectory, "data")
+            index = saveCase(dataPath, case.inputFile, case.answerFile)
+            console.info(f"Saved as {os.path.join(dataPath, f'input{index}.data')} "
+                         f"and std{index}.data")
+            return ReturnCode.JUDGEERR
+        finally:
+            shutil.rmtree(tempDir, ignore_errors=True)
+
+    def __init__(self):
+        super().__init__("stress", help="Compare a solution with a reference on generated inputs",
+                         func=StressCommand.default)
+
+    def createParser(self, parsers):
+        cmd = super().createParser(parsers)
+        cmd.add_argument("generator", help="Generator, run with the seed as its argument")
+        cmd.add_argument("reference", help="Reference (brute force) solution")
+        cmd.add_argument("solution", help="Solution to test")
+        cmd.add_argument("-n", "--iterations", type=int, default=None,
+                         help="Stop after N iterations (default: until a counterexample or ctrl+c)")
+        cmd.add_argument("-j", "--jobs", type=int, default=None,
+                         help="Parallel workers (default: cpu count)")
+        cmd.add_argument("--seed", type=int, default=1, help="First seed (default: 1)")
+        cmd.add_argument("--data", default=None,
+                         help="Directory to save the counterexample in (default: ./data)")
+        return cmd
@@ -1,10 +1,11 @@
-from typing import cast
+from typing import Optional, cast
 import os
 import shutil
 
 from .. import shared, ui, template
 from ..core import path as ecrpath
 from ..core import WorkManager
+from ..core.manager import TemplateEntry
 from ..ui import SwitchState
 from ..ui.command import Command, Namespace, ReturnCode
 from .helper import assertInited, printFileCreate, printFileDelete
@@ -22,21 +23,36 @@ class TemplateCommand(Command):
         if not assertInited():
             return ReturnCode.UNLOADED
         tman: WorkManager = cast(WorkManager, shared.getManager())
-        template.initialize(os.path.join(
-            ecrpath.getTemplatePath(tman.workingDirectory), args.name))
+        basepath = ecrpath.getTemplatePath(tman.getConfigPath())
+        os.makedirs(basepath, exist_ok=True)
+        template.initialize(os.path.join(basepath, args.name))
         printFileCreate(args.name)
         return ReturnCode.OK
 
+    @staticmethod
+    def ownTemplate(tman: WorkManager, name: str) -> Optional[str]:
+        """The template in the templates directory of `tman`, not a shared one it falls back to."""
+        tpath = os.path.join(ecrpath.getTemplatePath(tman.getConfigPath()), name)
+        if os.path.isdir(tpath):
+            return tpath
+        if ecrpath.findTemplate(tman.getConfigPath(), name):
+            ui.getConsole().error(f"Template `{name}` is shared, not in {ecrpath.getTemplatePath(tman.getConfigPath())}")
+        else:
+            ui.getConsole().error(f"No template `{name}`")
+        return None
+
     @staticmethod
     def clear(args: Namespace) -> ReturnCode:
         if not assertInited():
             return ReturnCode.UNLOADED
         tman: WorkManager = cast(WorkManager, shared.getManager())
         console = ui.getConsole()
+        tpath = TemplateCommand.ownTemplate(tman, args.name)
+        if not tpath:
+            return ReturnCode.ERROR
         if console.confirm(f"Do you want to clear template config of `{args.name}`?",
                            [SwitchState.Yes, SwitchState.No]) == SwitchState.Yes:
-            template.clear(os.path.join(ecrpath.getTemplatePath(
-                tman.workingDirectory), args.name))
+            template.clear(tpath)
         return ReturnCode.OK
 
     @staticmethod
@@ -45,26 +61,22 @@ class TemplateCommand(Command):
             return ReturnCode.UNLOADED
         tman: WorkManager = cast(WorkManager, shared.getManager())
         console = ui.getConsole()
+        tpath = TemplateCommand.ownTemplate(tman, args.name)
+        if not tpath:
+            return ReturnCode.ERROR
         if console.confirm(f"Do you want to remove template `{args.name}`?",
                            [SwitchState.Yes, SwitchState.No]) == SwitchState.Yes:
-            shutil.rmtree(os.path.join(ecrpath.getTemplatePath(
-                tman.workingDirectory), args.name))
+            shutil.rmtree(tpath)
             printFileDelete(args.name)
         return ReturnCode.OK
 
     @staticmethod
-    def showTemplate(basepath)->None:
-        tem, exp = template.load(basepath)
+    def showTemplate(entry: TemplateEntry)->None:
         console = ui.getConsole()
-        if exp:
-            console.error(f"Loading template failed: {exp}")
-        else:
-            import json
-            if tem:
-                console.write(json.dumps(
-                    tem.__dict__, default=str, indent=4))
-            else:
-                console.write("None")
+        if entry.error:
+            console.error(f"Loading template failed: {entry.error}")
+        import json
+        console.write(json.dumps(entry.info(), default=str, indent=4))
 
     @staticmethod
     def show(args: Namespace) -> ReturnCode:
@@ -72,24 +84,21 @@ class TemplateCommand(Command):
             return ReturnCode.UNLOADED
         tman: WorkManager = cast(WorkManager, shared.getManager())
         console = ui.getConsole()
-        if args.name:
-            tpath = os.path.join(
-                ecrpath.getTemplatePath(tman.workingDirectory), args.name)
-            if os.path.isdir(tpath):
-                TemplateCommand.showTemplate(tpath)
-                return ReturnCode.OK
+        index = tman.getTemplateIndex()
+        try:
+            if args.name:
+                entry = index.find(args.name)
+                if entry:
+                    TemplateCommand.showTemplate(entry)
+                else:
+                    console.write("No this template.")
             else:
-                console.write("No this template.")
-                return ReturnCode.OK
-        else:
-            basepath = ecrpath.getTemplatePath(tman.workingDirectory)
-            for item in os.listdir(basepath):
-                itempath = os.path.join(basepath, item)
-                if os.path.isfile(itempath):
-                    continue
-                console.info(item)
-                TemplateCommand.showTemplate(itempath)
-            return ReturnCode.OK
+                for entry in index.entries():
+                    console.info(entry.name)
+                    TemplateCommand.showTemplate(entry)
+        finally:
+            index.save()
+        return ReturnCode.OK
 
     def __init__(self):
         super().__init__("template", help="Tools for templates", func=TemplateCommand.default)
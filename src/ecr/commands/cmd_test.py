@@ -1,10 +1,11 @@
-import time
-from typing import cast
+from typing import List, cast
 
 from .. import shared, ui
-from ..core import WorkItem, WorkItemType, WorkManager, defaultData
+from ..core import WorkItemType, WorkManager, defaultData
+from ..core.manager import CancelToken, firstAffectedStep
 from ..ui.command import Command, Namespace, ReturnCode
-from .cmd_run import RunWatchEventHandler, RunCommand
+from .cmd_background import waitBackgroundBuild
+from .cmd_run import RunCommand
 from .helper import assertInited, getItem, printFileModify
 
 
@@ -19,8 +20,21 @@ class TestCommand(Command):
             console.write("Please set file first")
             return ReturnCode.ERROR
 
+        waitBackgroundBuild()
         if not args.watch:
             item, file = getItem(tman, args)
+            if args.stream and item.type == WorkItemType.File \
+                    and (args.judger or tman.defaultJudger) == defaultData.judger:
+                result = tman.streamJudge(item=item, tee=args.tee)
+                if not result:
+                    console.error("Judging failed")
+                    return ReturnCode.JUDGEERR
+                else:
+                    console.ok("Judging passed")
+                    return ReturnCode.OK
+            elif args.stream:
+                console.warning(
+                    "Streaming only supports file work-items with the text judger")
             if args.re:
                 runResult = RunCommand.default(
                     Namespace(io=defaultData.CIO_FIFO, file=args.file, dir=args.dir, watch=False))
@@ -36,38 +50,41 @@ class TestCommand(Command):
                 console.ok("Judging passed")
                 return ReturnCode.OK
         else:
-            file = args.file if args.file else cast(
-                WorkItem, tman.currentFile).name
+            item, file = getItem(tman, args)
 
-            def func():
-                item, file = getItem(tman, args)
+            def func(token: CancelToken, changed: List[str]):
                 console.clear()
                 console.info(f"Watching", end=" ")
                 printFileModify(file)
-                result = tman.judge(reexecute=args.re,
-                                    item=item, judger=args.judger)
-                if not result:
+                io, start = defaultData.CIO_FIFO, 0
+                if item.type == WorkItemType.Directory:
+                    io = defaultData.CIO_SISO
+                    # a change no run step depends on (e.g. the expected data) only judges again
+                    paths = relativePaths(item.path, changed)
+                    start = firstAffectedStep(item.run, paths) if args.re else None
+                    if start is None:
+                        if firstAffectedStep(item.test, paths) is None:
+                            console.info("No step depends on the changed files")
+                            return
+                        start = len(item.run)
+                if args.re:
+                    if not tman.execute(io=io, item=item, cancelToken=token, startStep=start):
+                        if token.cancelled:
+                            console.warning("Cancelled by a newer change")
+                        else:
+                            console.error("Running failed")
+                        return
+                result = tman.judge(item=item, judger=args.judger, cancelToken=token)
+                if token.cancelled:
+                    console.warning("Cancelled by a newer change")
+                elif not result:
                     console.error("Judging failed")
-                    return ReturnCode.JUDGEERR
                 else:
                     console.ok("Judging passed")
-                    return ReturnCode.OK
 
-            from watchdog.observers import Observer
+            from .watcher import relativePaths, watchItem
             console.info(f"Watching {file} (press ctrl+c to end)")
-            path = tman.workingDirectory if item.type == WorkItemType.File else item.path
-            event_handler = RunWatchEventHandler(
-                file if item.type == WorkItemType.File else None, func)
-            observer = Observer()
-            observer.schedule(event_handler, path, recursive=False)
-            observer.start()
-            try:
-                while True:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                observer.stop()
-                console.info("Watching end.")
-            observer.join()
+            watchItem(tman.workingDirectory, item, func)
             return ReturnCode.OK
 
     def __init__(self):
@@ -85,4 +102,8 @@ class TestCommand(Command):
                          default=False, help="Re-execute before judge")
         cmd.add_argument("-d", "--dir", action="store_true",
                          default=False, help="As directory")
+        cmd.add_argument("-s", "--stream", action="store_true",
+                         default=False, help="Re-execute and judge the output while it is produced")
+        cmd.add_argument("--tee", action="store_true",
+                         default=False, help="Also write the streamed output to the output file")
         return cmd
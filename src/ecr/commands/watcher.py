@@ -0,0 +1,226 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .. import log, ui
+from ..core import WorkItem, WorkItemType, defaultData
+from ..core.manager import CancelToken, stepOutputs
+from ..lib.globs import isIgnored, matchAny
+
+debounceDelay: float = 0.2  # s
+
+
+def hashFile(path: str) -> Optional[str]:
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+class ChangeEventHandler(FileSystemEventHandler):
+    """Pass the paths of created, modified, moved and deleted files accepted by `accept` to `notify`."""
+
+    def __init__(self, accept: Callable[[str], bool], notify: Callable[[str], None]):
+        self.accept = accept
+        self.notify = notify
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        # editors that save by renaming a temp file over the original only raise a move
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path and self.accept(os.path.abspath(path)):
+                self.notify(os.path.abspath(path))
+
+
+WatchFunc = Callable[[CancelToken, List[str]], None]
+
+
+class DebouncedRunner:
+    """
+    Call `func(token, changed)` on a worker thread once the watched files have been quiet
+    for `delay` seconds, with the paths whose contents differ from the last run.
+    A change to a file of the running version cancels the run through its token,
+    and the run starts over on the latest version. The changes of a cancelled or
+    failed run are passed again with the next ones until a run finishes.
+    """
+
+    def __init__(self, func: WatchFunc, files: Callable[[], List[str]],
+                 delay: float = debounceDelay):
+        self.func = func
+        self.files = files
+        self.delay: float = delay
+        self._cond = threading.Condition()
+        self._pending: bool = False
+        self._lastEvent: float = 0
+        self._stopped: bool = False
+        self._busy: bool = False
+        self._token: Optional[CancelToken] = None
+        self._hashes: Dict[str, Optional[str]] = {}  # of the version last run
+        self._stats: Dict[str, Tuple[int, int, Optional[str]]] = {}  # path: (mtime, size, hash)
+        self._unfinished: Set[str] = set()  # changes of runs that did not finish
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _hash(self, path: str) -> Optional[str]:
+        # files whose mtime and size are unchanged are not read again
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self._stats.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        ret = hashFile(path)
+        self._stats[path] = (st.st_mtime_ns, st.st_size, ret)
+        return ret
+
+    def _snapshot(self) -> Dict[str, Optional[str]]:
+        return {path: self._hash(path) for path in self.files()}
+
+    def start(self, initial: bool = False) -> None:
+        """With `initial`, run once right away instead of waiting for a change."""
+        if initial:
+            self._pending = True
+        else:
+            self._hashes = self._snapshot()
+        self._thread.start()
+
+    def waitIdle(self) -> None:
+        """Wait until pending changes have been handled and no run is going on."""
+        with self._cond:
+            while (self._pending or self._busy) and not self._stopped:
+                self._cond.wait()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            token = self._token
+            self._cond.notify_all()
+        if token:
+            token.cancel()
+        self._thread.join()
+
+    def notify(self, path: str) -> None:
+        with self._cond:
+            self._pending = True
+            self._lastEvent = time.monotonic()
+            token = self._token
+            known = path in self._hashes
+            old = self._hashes.get(path)
+            self._cond.notify_all()
+        if token and known and not token.cancelled and hashFile(path) != old:
+            token.cancel()
+
+    def _wait(self) -> bool:
+        """Wait for changes to settle; return False when stopped."""
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            while not self._stopped:
+                rest = self._lastEvent + self.delay - time.monotonic()
+                if rest <= 0:
+                    break
+                self._cond.wait(rest)
+            self._pending = False
+            self._busy = not self._stopped
+            return self._busy
+
+    def _loop(self) -> None:
+        while self._wait():
+            try:
+                self._runChanged()
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _runChanged(self) -> None:
+        hashes = self._snapshot()
+        changed = sorted({x for x in set(hashes) | set(self._hashes)
+                          if hashes.get(x) != self._hashes.get(x)} | self._unfinished)
+        if not changed:
+            log.debug("Watched files unchanged, skip running")
+            return
+        token = CancelToken()
+        with self._cond:
+            self._hashes = hashes
+            self._token = token
+        finished = False
+        try:
+            self.func(token, changed)
+            finished = not token.cancelled
+        except BaseException:
+            log.errorWithException("Watch run failed")
+        finally:
+            with self._cond:
+                self._token = None
+        self._unfinished = set() if finished else set(changed)
+        # files first seen after the run are its outputs; the watched files
+        # keep the hashes of the version that ran, so edits made meanwhile rerun
+        after = self._snapshot()
+        with self._cond:
+            self._hashes = {**after, **hashes}
+
+
+def watch(path: str, accept: Callable[[str], bool], files: Callable[[], List[str]],
+          func: WatchFunc, recursive: bool = False) -> None:
+    """Run `func` on changes under `path` till Ctrl-C."""
+    console = ui.getConsole()
+    runner = DebouncedRunner(func, files)
+    observer = Observer()
+    observer.schedule(ChangeEventHandler(accept, runner.notify), path, recursive=recursive)
+    runner.start()
+    observer.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        console.info("Watching end.")
+    finally:
+        observer.stop()
+        runner.stop()
+    observer.join()
+
+
+def watchItem(wdir: str, item: WorkItem, func: WatchFunc) -> None:
+    """
+    Watch the code file of a file work-item, or the folder of a directory one recursively,
+    except for the `ignore` globs of the item, `defaultData.watchIgnore` and the `outputs`
+    of its steps, which the runs write themselves.
+    """
+    if item.type == WorkItemType.File:
+        source = os.path.abspath(os.path.join(wdir, item.name))
+        watch(wdir, lambda p: p == source, lambda: [source], func)
+        return
+    root = os.path.abspath(item.path)
+    ignore = defaultData.watchIgnore + item.ignore + stepOutputs(item.run) + stepOutputs(item.test)
+
+    def relative(path: str) -> str:
+        return os.path.relpath(path, root).replace(os.sep, "/")
+
+    def accept(path: str) -> bool:
+        rel = relative(path)
+        return not rel.startswith("../") and not isIgnored(rel, ignore)
+
+    def files() -> List[str]:
+        ret = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [x for x in dirnames if not isIgnored(
+                relative(os.path.join(dirpath, x)), ignore)]
+            ret += [os.path.join(dirpath, x) for x in filenames
+                    if not matchAny(relative(os.path.join(dirpath, x)), ignore)]
+        return sorted(ret)
+    watch(root, accept, files, func, recursive=True)
+
+
+def relativePaths(root: str, paths: List[str]) -> List[str]:
+    return [os.path.relpath(x, root).replace(os.sep, "/") for x in paths]
@@ -0,0 +1,67 @@
+import os
+from typing import Callable, List, Optional, Tuple
+
+from ..lib.judger import JudgeResult, compareFiles
+from ._Runner import RunResult, repeatStep
+from ._Step import CommandStep
+
+
+class BenchCandidate:
+    def __init__(self, name: str, step: CommandStep, wdir: str):
+        self.name: str = name
+        self.step: CommandStep = step
+        self.wdir: str = wdir
+
+
+class BenchResult:
+    def __init__(self, candidates: List[BenchCandidate], cases: List[Tuple[str, Optional[str]]]):
+        self.candidates: List[BenchCandidate] = candidates
+        self.cases: List[Tuple[str, Optional[str]]] = cases
+        # times[candidate][case] = wall times (s), paired by round
+        self.times: List[List[List[float]]] = [[[] for _ in cases] for _ in candidates]
+        # per case, the diff of the first candidate whose output differs from the first one
+        self.mismatches: List[Optional[str]] = [None for _ in cases]
+        self.failure: Optional[str] = None
+
+
+def runInterleaved(candidates: List[BenchCandidate], cases: List[Tuple[str, Optional[str]]],
+                   repeat: int, warmup: int, tempDir: str,
+                   onCase: Optional[Callable[[str], None]] = None) -> BenchResult:
+    """
+    Time every candidate on every case (name, input file). For each case, all candidates
+    run once untimed with their outputs compared to the first one's, then `warmup - 1`
+    untimed rounds and `repeat` timed rounds. In a round, each candidate runs once,
+    starting from a different candidate each round, so drift hits all of them alike.
+    """
+    ret = BenchResult(candidates, cases)
+    count = len(candidates)
+
+    def run(k: int, inputFile: Optional[str], outputFile: Optional[str] = None) -> Optional[float]:
+        cand = candidates[k]
+        result = next(repeatStep(cand.step.command, cand.wdir, inputFile,
+                                 cand.step.limit, 1, outputFile))
+        if result.result != RunResult.Success:
+            ret.failure = f"{cand.name} failed on {caseName}: {result.result.name} {result}"
+            return None
+        return result.wallTime
+
+    for ci, (caseName, inputFile) in enumerate(cases):
+        if onCase:
+            onCase(caseName)
+        outputs = [os.path.join(tempDir, f"output{k}") for k in range(count)]
+        for k in range(count):
+            if run(k, inputFile, outputs[k]) is None:
+                return ret
+        for k in range(1, count):
+            judge, message = compareFiles(outputs[0], outputs[k])
+            if judge != JudgeResult.Accept and not ret.mismatches[ci]:
+                ret.mismatches[ci] = f"{candidates[k].name} differs from {candidates[0].name}\n{message}"
+        for r in range(max(0, warmup - 1) + repeat):
+            for j in range(count):
+                k = (r + j) % count
+                used = run(k, inputFile)
+                if used is None:
+                    return ret
+                if r >= warmup - 1:
+                    ret.times[k][ci].append(used)
+    return ret
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+from .. import log
+
+CONST_manifest: str = "manifest.json"
+CONST_compilers: str = "compilers.json"
+
+FileSnapshot = Dict[str, Tuple[int, int]]
+
+includeRE = re.compile(rb'^\s*#\s*include\s*"(?P<name>[^"]+)"', re.MULTILINE)
+
+
+def snapshot(wdir: str) -> FileSnapshot:
+    ret: FileSnapshot = {}
+    with os.scandir(wdir) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                ret[entry.name] = (st.st_mtime_ns, st.st_size)
+    return ret
+
+
+def getChangedFiles(before: FileSnapshot, after: FileSnapshot) -> List[str]:
+    return sorted(k for k, v in after.items() if before.get(k) != v)
+
+
+class CompileCache:
+    """
+    Content-addressed store of compile artifacts.
+
+    The key covers the source bytes (with quoted local includes), the expanded
+    compile commands and the identity of each compiler. Entries are evicted
+    least-recently-used first once the cache grows over `capacity` bytes.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path: str = path
+        self.capacity: int = capacity
+        self._compilers: Optional[Dict[str, str]] = None
+
+    def _compilerVersion(self, cmd: str) -> str:
+        try:
+            exe = shlex.split(cmd)[0]
+        except (ValueError, IndexError):
+            return ""
+        resolved = shutil.which(exe)
+        if not resolved:
+            return exe
+        st = os.stat(resolved)
+        ident = f"{resolved}:{st.st_mtime_ns}:{st.st_size}"
+        if self._compilers is None:
+            try:
+                with open(os.path.join(self.path, CONST_compilers), "r", encoding='utf-8') as f:
+                    self._compilers = json.load(f)
+            except (OSError, ValueError):
+                self._compilers = {}
+        if ident not in self._compilers:
+            try:
+                version = subprocess.run([resolved, "--version"], stdin=subprocess.DEVNULL,
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                         timeout=10).stdout.decode("utf-8", "replace")
+            except (OSError, subprocess.SubprocessError):
+                version = ""
+            self._compilers[ident] = version.strip()
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                with open(os.path.join(self.path, CONST_compilers), "w", encoding='utf-8') as f:
+                    json.dump(self._compilers, f)
+            except OSError:
+                log.warning("Saving compiler versions failed", exc_info=True)
+        return ident + "\n" + self._compilers[ident]
+
+    def getKey(self, source: str, commands: List[str]) -> Optional[str]:
+        if not os.path.isfile(source):
+            return None
+        h = hashlib.sha256()
+        pending, visited = [source], set()
+        while pending:
+            file = os.path.normpath(pending.pop())
+            if file in visited or not os.path.isfile(file):
+                continue
+            visited.add(file)
+            with open(file, "rb") as f:
+                data = f.read()
+            h.update(os.path.relpath(file, os.path.dirname(source)).encode("utf-8"))
+            h.update(hashlib.sha256(data).digest())
+            for m in includeRE.finditer(data):
+                pending.append(os.path.join(os.path.dirname(file),
+                                            m.group("name").decode("utf-8", "replace")))
+        for cmd in commands:
+            h.update(cmd.encode("utf-8"))
+            h.update(self._compilerVersion(cmd).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entryPath(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def restore(self, key: str, wdir: str) -> bool:
+        entry = self._entryPath(key)
+        try:
+            with open(os.path.join(entry, CONST_manifest), "r", encoding='utf-8') as f:
+                files = json.load(f)["files"]
+            for file in files:
+                shutil.copy2(os.path.join(entry, file), os.path.join(wdir, file))
+            os.utime(entry)
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def store(self, key: str, wdir: str, files: List[str]) -> bool:
+        entry = self._entryPath(key)
+        temp = f"{entry}.{os.getpid()}.tmp"
+        try:
+            if os.path.isdir(temp):
+                shutil.rmtree(temp)
+            os.makedirs(temp)
+            size = 0
+            for file in files:
+                shutil.copy2(os.path.join(wdir, file), os.path.join(temp, file))
+                size += os.path.getsize(os.path.join(temp, file))
+            with open(os.path.join(temp, CONST_manifest), "w", encoding='utf-8') as f:
+                json.dump({"files": files, "size": size}, f)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            os.rename(temp, entry)
+        except OSError:
+            log.warning(f"Storing compile cache failed: {key}", exc_info=True)
+            shutil.rmtree(temp, ignore_errors=True)
+            return False
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for bucket in os.listdir(self.path):
+            bpath = os.path.join(self.path, bucket)
+            if not os.path.isdir(bpath):
+                continue
+            for key in os.listdir(bpath):
+                entry = os.path.join(bpath, key)
+                try:
+                    with open(os.path.join(entry, CONST_manifest), "r", encoding='utf-8') as f:
+                        size = json.load(f)["size"]
+                    entries.append((os.path.getmtime(entry), size, entry))
+                    total += size
+                except (OSError, ValueError, KeyError):
+                    continue
+        entries.sort()
+        while total > self.capacity and entries:
+            _, size, entry = entries.pop(0)
+            log.debug(f"Evict compile cache: {entry}")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
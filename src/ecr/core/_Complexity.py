@@ -0,0 +1,57 @@
+import os
+import statistics
+from typing import Callable, List, Optional, Tuple
+
+from ._Runner import RunResult, repeatStep
+from ._Step import CommandStep
+
+
+class ScalingResult:
+    def __init__(self):
+        self.points: List[Tuple[int, float]] = []  # (n, median wall time in s)
+        self.failure: Optional[str] = None
+        self.timeOut: Optional[int] = None  # the first n that hit the time limit
+
+
+def geometricSizes(start: int, stop: int, factor: float) -> List[int]:
+    """start, start * factor, ... up to stop, without repeats."""
+    ret: List[int] = []
+    n = float(start)
+    while round(n) <= stop:
+        if not ret or round(n) > ret[-1]:
+            ret.append(round(n))
+        n *= factor
+    return ret
+
+
+def measureScaling(generator: CommandStep, solution: CommandStep, wdir: str, tempDir: str,
+                   sizes: List[int], repeat: int, budget: Optional[float] = None,
+                   onPoint: Optional[Callable[[int, float], None]] = None) -> ScalingResult:
+    """
+    For each n of `sizes`, run `generator n` into an input file and time `repeat` runs
+    of the solution on it, keeping the median wall time. Larger sizes are skipped once
+    a median exceeds `budget` seconds or a run hits the time limit of the solution.
+    """
+    ret = ScalingResult()
+    inputFile = os.path.join(tempDir, "input.data")
+    for n in sizes:
+        gen = next(repeatStep(generator.withArgs([str(n)]), wdir, None, generator.limit, 1, inputFile))
+        if gen.result != RunResult.Success:
+            ret.failure = f"Generator failed on n = {n}: {gen.result.name} {gen}"
+            return ret
+        times = []
+        for result in repeatStep(solution.command, wdir, inputFile, solution.limit, repeat):
+            if result.result == RunResult.TimeOut:
+                ret.timeOut = n
+                return ret
+            if result.result != RunResult.Success:
+                ret.failure = f"Solution failed on n = {n}: {result.result.name} {result}"
+                return ret
+            times.append(result.wallTime)
+        median = statistics.median(times)
+        ret.points.append((n, median))
+        if onPoint:
+            onPoint(n, median)
+        if budget is not None and median > budget:
+            break
+    return ret
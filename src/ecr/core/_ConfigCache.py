@@ -0,0 +1,64 @@
+import os
+import pickle
+import time
+from typing import Any, List, Optional, Tuple
+
+from .. import log
+
+CONST_cacheVersion: int = 1
+
+# a file changed within this window may still change without its mtime moving
+racyWindow: float = 2
+
+FileStamp = Tuple[str, int, int]
+
+
+def loadYaml(text: str) -> Any:
+    import yaml  # only needed when the config cache misses
+    # libyaml is several times faster than the pure-Python loader
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def loadYamlFile(file: str) -> Any:
+    with open(file, "r", encoding='utf-8') as f:
+        return loadYaml(f.read())
+
+
+def _stamp(files: List[str]) -> List[FileStamp]:
+    ret = []
+    for file in files:
+        st = os.stat(file)
+        ret.append((file, st.st_mtime_ns, st.st_size))
+    return ret
+
+
+def loadYamlFiles(files: List[str], cacheFile: Optional[str]) -> Tuple[List[Any], bool]:
+    """
+    Load the yaml files, using a pickled copy at `cacheFile` while none of them
+    has changed (by mtime and size). Return the data and whether the cache was used.
+    """
+    stamp = _stamp(files)
+    if cacheFile:
+        try:
+            with open(cacheFile, "rb") as f:
+                cache = pickle.load(f)
+            if cache["version"] == CONST_cacheVersion and cache["stamp"] == stamp:
+                return cache["data"], True
+        except FileNotFoundError:
+            pass
+        except Exception:  # pylint: disable=W0703
+            log.warning(f"Config cache is broken: {cacheFile}", exc_info=True)
+    data = [loadYamlFile(file) for file in files]
+    if cacheFile and all(x[1] < (time.time() - racyWindow) * 1e9 for x in stamp):
+        temp = f"{cacheFile}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cacheFile), exist_ok=True)
+            with open(temp, "wb") as f:
+                pickle.dump({"version": CONST_cacheVersion, "stamp": stamp, "data": data},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, cacheFile)
+        except OSError:
+            log.warning(f"Saving config cache failed: {cacheFile}", exc_info=True)
+            if os.path.isfile(temp):
+                os.remove(temp)
+    return data, False
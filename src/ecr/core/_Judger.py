@@ -0,0 +1,180 @@
+import ast
+import hashlib
+import importlib.util
+import os
+import shlex
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .. import log, ui
+from ..lib.judger import DataItem, JudgeResult, getFileContents
+from ..ui import color
+from ._Runner import RunCommandsResult, RunResult, StepResult
+
+JudgeFunction = Callable[[DataItem, DataItem], Tuple[JudgeResult, Optional[str]]]
+
+pythonOptions: List[str] = ["-u", "-B", "-E", "-s", "-O", "-OO"]
+
+
+class InProcessJudger:
+    def __init__(self, file: str, func: JudgeFunction, autoload: bool):
+        self.file: str = file
+        self.func: JudgeFunction = func
+        self.autoload: bool = autoload
+
+    def judge(self, expectFile: str, realFile: str) -> Tuple[JudgeResult, Optional[str]]:
+        try:
+            if self.autoload:
+                data = getFileContents(expectFile, realFile)
+                std, out = DataItem(expectFile, data[0]), DataItem(realFile, data[1])
+            else:
+                std, out = DataItem(expectFile, []), DataItem(realFile, [])
+            return self.func(std, out)
+        except SystemExit as e:  # judged() called inside the judge function
+            try:
+                return JudgeResult(e.code if e.code is not None else 0), None
+            except ValueError:
+                return JudgeResult.Error, f"Judger Error: exit code {e.code}"
+        except Exception as e:  # pylint: disable=W0703
+            log.errorWithException(f"Judger failed: {self.file}")
+            return JudgeResult.Error, f"Judger Error: {e}"
+
+
+# judger file -> ((mtime, size), judger or None if it can't run in process)
+_judgers: Dict[str, Tuple[Tuple[int, int], Optional[InProcessJudger]]] = {}
+
+
+def _isMainGuard(node: ast.expr) -> bool:
+    if not isinstance(node, ast.Compare) or len(node.ops) != 1 or not isinstance(node.ops[0], ast.Eq):
+        return False
+    left, right = node.left, node.comparators[0]
+    if isinstance(right, ast.Name):
+        left, right = right, left
+    if not isinstance(left, ast.Name) or left.id != "__name__":
+        return False
+    try:
+        return ast.literal_eval(right) == "__main__"
+    except ValueError:
+        return False
+
+
+def _findJudging(tree: ast.Module) -> Optional[Tuple[str, bool]]:
+    """Find `judging(func, autoload)` under `if __name__ == "__main__":`."""
+    for node in tree.body:
+        if not isinstance(node, ast.If) or not _isMainGuard(node.test):
+            continue
+        for stmt in node.body:
+            if not isinstance(stmt, ast.Expr) or not isinstance(stmt.value, ast.Call):
+                continue
+            call = stmt.value
+            name = call.func.id if isinstance(call.func, ast.Name) else \
+                call.func.attr if isinstance(call.func, ast.Attribute) else None
+            if name != "judging" or not call.args or not isinstance(call.args[0], ast.Name):
+                continue
+            try:
+                autoload = True
+                if len(call.args) > 1:
+                    autoload = bool(ast.literal_eval(call.args[1]))
+                for kw in call.keywords:
+                    if kw.arg == "autoload":
+                        autoload = bool(ast.literal_eval(kw.value))
+            except ValueError:
+                return None
+            return call.args[0].id, autoload
+    return None
+
+
+def _load(file: str) -> Optional[InProcessJudger]:
+    with open(file, "rb") as f:
+        source = f.read()
+    if b"judging" not in source:
+        return None
+    found = _findJudging(ast.parse(source, file))
+    if not found:
+        return None
+    funcName, autoload = found
+    name = "ecr_judger_" + hashlib.md5(os.path.abspath(file).encode("utf-8")).hexdigest()
+    spec = importlib.util.spec_from_file_location(name, file)
+    module = importlib.util.module_from_spec(spec)
+    dirname = os.path.dirname(os.path.abspath(file))
+    sys.path.insert(0, dirname)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)  # type: ignore
+    finally:
+        sys.path.remove(dirname)
+    func = getattr(module, funcName, None)
+    if not callable(func):
+        return None
+    return InProcessJudger(file, func, autoload)
+
+
+def parseJudgerCommand(cmd: str) -> Optional[Tuple[str, str, str]]:
+    """Split `python [options] judger.py expectFile realFile` into the three files."""
+    try:
+        if os.name == "posix":
+            args = shlex.split(cmd)
+        else:
+            args = [x.strip('"') for x in shlex.split(cmd, posix=False)]
+    except ValueError:
+        return None
+    if not args:
+        return None
+    exe = os.path.splitext(os.path.basename(args[0]))[0].lower()
+    if not (exe.startswith("python") or exe == "py"):
+        return None
+    args = args[1:]
+    while args and args[0] in pythonOptions:
+        args = args[1:]
+    if len(args) != 3 or not args[0].endswith(".py"):
+        return None
+    return args[0], args[1], args[2]
+
+
+def getInProcessJudger(file: str) -> Optional[InProcessJudger]:
+    """
+    Import a Python judger written with `ecr.lib.judger.judging` once and reuse it
+    until the file changes. Return None for judgers that have to run as a subprocess.
+    """
+    file = os.path.abspath(file)
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _judgers.get(file)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    try:
+        judger = _load(file)
+    except Exception:  # pylint: disable=W0703
+        log.warning(f"Loading judger in process failed: {file}", exc_info=True)
+        judger = None
+    log.debug(f"Load judger: {file} -> {'in process' if judger else 'subprocess'}")
+    _judgers[file] = (stamp, judger)
+    return judger
+
+
+def runJudger(judger: InProcessJudger, cmd: str, expectFile: str, realFile: str,
+              showLog: bool = True) -> RunCommandsResult:
+    console = ui.getConsole()
+    if showLog:
+        console.write("(", color.useYellow("1"), "/1) ", cmd, sep="")
+        console.write("-"*20)
+    stepResult = StepResult(cmd)
+    start = time.perf_counter()
+    judgeResult, message = judger.judge(expectFile, realFile)
+    stepResult.wallTime = time.perf_counter() - start
+    stepResult.returnCode = judgeResult.value
+    stepResult.result = RunResult.Success if judgeResult == JudgeResult.Accept else RunResult.Error
+    if message:
+        console.write(message)
+    if showLog:
+        console.write("-"*20)
+        console.write("   ->",
+                      color.useGreen("√") if stepResult.returnCode == 0 else color.useRed("×"),
+                      f"{stepResult.wallTime:.3f}s (in process)")
+    ret = RunCommandsResult(stepResult.result == RunResult.Success)
+    ret.steps.append(stepResult)
+    return ret
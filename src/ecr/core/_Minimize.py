@@ -0,0 +1,177 @@
+import hashlib
+import itertools
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from ..lib.judger import JudgeResult, compareFiles
+from ._Runner import RunResult, repeatStep
+from ._Step import CommandStep
+
+PREDICATE_Wrong: str = "wrong"
+PREDICATE_Crash: str = "crash"
+PREDICATE_Timeout: str = "timeout"
+PREDICATE_Any: str = "any"
+
+predicates: List[str] = [PREDICATE_Any, PREDICATE_Wrong, PREDICATE_Crash, PREDICATE_Timeout]
+
+crashResults = (RunResult.Error, RunResult.MemoryLimitExceeded)
+timeoutResults = (RunResult.TimeOut, RunResult.CpuTimeLimitExceeded)
+
+tokenRE = re.compile(rb"\s*\S+")
+
+
+class MinimizeResult:
+    def __init__(self, data: bytes):
+        self.data: bytes = data
+        self.message: Optional[str] = None  # why the smallest input fails
+        self.tests: int = 0  # candidates run
+        self.cacheHits: int = 0  # candidates already tried
+
+
+class FailureTester:
+    """
+    Decide whether the solution still fails on an input, by `predicate`:
+    `wrong` (output differs from the reference's), `crash`, `timeout` or `any` of them.
+    Inputs the reference fails on are treated as passing, they are not valid tests.
+    Results are cached by the sha256 of the input.
+    """
+
+    def __init__(self, solution: CommandStep, reference: Optional[CommandStep], wdir: str,
+                 tempDir: str, predicate: str = PREDICATE_Any):
+        self.solution: CommandStep = solution
+        self.reference: Optional[CommandStep] = reference
+        self.wdir: str = wdir
+        self.tempDir: str = tempDir
+        self.predicate: str = predicate
+        self.cache: Dict[str, Optional[str]] = {}
+        self.tests: int = 0
+        self.cacheHits: int = 0
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def _run(self, step: CommandStep, inputFile: str, outputFile: str):
+        return next(repeatStep(step.command, self.wdir, inputFile, step.limit, 1, outputFile))
+
+    def _test(self, data: bytes) -> Optional[str]:
+        temp = os.path.join(self.tempDir, str(next(self._counter)))
+        os.makedirs(temp)
+        inputFile, answerFile, outputFile = [
+            os.path.join(temp, x) for x in ("input.data", "std.data", "output.data")]
+        with open(inputFile, "wb") as f:
+            f.write(data)
+        try:
+            result = self._run(self.solution, inputFile, outputFile)
+            if result.result in crashResults:
+                return f"{result.result.name} {result}" \
+                    if self.predicate in (PREDICATE_Any, PREDICATE_Crash) else None
+            if result.result in timeoutResults:
+                return f"{result.result.name} {result}" \
+                    if self.predicate in (PREDICATE_Any, PREDICATE_Timeout) else None
+            if self.predicate not in (PREDICATE_Any, PREDICATE_Wrong) or not self.reference:
+                return None
+            if self._run(self.reference, inputFile, answerFile).result != RunResult.Success:
+                return None
+            judge, message = compareFiles(answerFile, outputFile)
+            return None if judge == JudgeResult.Accept else message
+        finally:
+            shutil.rmtree(temp, ignore_errors=True)
+
+    def test(self, data: bytes) -> Optional[str]:
+        """The failure message if the solution fails on `data`, else None."""
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if key in self.cache:
+                self.cacheHits += 1
+                return self.cache[key]
+        ret = self._test(data)
+        with self._lock:
+            self.cache[key] = ret
+            self.tests += 1
+        return ret
+
+
+def _split(units: List[bytes], n: int) -> List[List[bytes]]:
+    size, extra = divmod(len(units), n)
+    ret, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        ret.append(units[start:end])
+        start = end
+    return ret
+
+
+def ddmin(units: List[bytes], tester: FailureTester, pool: ThreadPoolExecutor, workers: int,
+          onReduce: Optional[Callable[[int], None]] = None) -> List[bytes]:
+    """
+    Delta debugging: the smallest sublist of `units` (by 1-minimality) that still fails.
+    The candidates of a round run in batches of `workers`; the first failing one in order wins.
+    """
+    def firstFailing(candidates: List[List[bytes]]) -> Optional[List[bytes]]:
+        for start in range(0, len(candidates), workers):
+            batch = candidates[start:start + workers]
+            results = list(pool.map(lambda x: tester.test(b"".join(x)), batch))
+            for cand, result in zip(batch, results):
+                if result is not None:
+                    return cand
+        return None
+
+    n = 2
+    while len(units) >= 2:
+        chunks = _split(units, n)
+        found = firstFailing(chunks)
+        if found is not None:
+            units, n = found, 2
+        else:
+            complements = [list(itertools.chain.from_iterable(chunks[:i] + chunks[i + 1:]))
+                           for i in range(n)] if n > 2 else []
+            found = firstFailing(complements)
+            if found is not None:
+                units, n = found, max(n - 1, 2)
+            elif n >= len(units):
+                break
+            else:
+                n = min(len(units), n * 2)
+                continue
+        if onReduce:
+            onReduce(sum(map(len, units)))
+    return units
+
+
+def splitTokens(data: bytes) -> List[bytes]:
+    """Tokens with their leading whitespace; trailing whitespace stays with the last one."""
+    units = tokenRE.findall(data)
+    rest = data[sum(map(len, units)):]
+    if not units:
+        return [data] if data else []
+    units[-1] += rest
+    return units
+
+
+def minimize(data: bytes, tester: FailureTester, workers: Optional[int] = None,
+             onReduce: Optional[Callable[[str, int], None]] = None) -> MinimizeResult:
+    """
+    Shrink a failing input by delta debugging over lines, then over tokens,
+    repeated until neither pass removes anything.
+    """
+    workers = workers if workers else os.cpu_count() or 1
+    ret = MinimizeResult(data)
+    ret.message = tester.test(data)
+    if ret.message is None:
+        return ret
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            size = len(data)
+            for name, split in (("lines", lambda x: x.splitlines(keepends=True)),
+                                ("tokens", splitTokens)):
+                data = b"".join(ddmin(split(data), tester, pool, workers,
+                                      (lambda x, name=name: onReduce(name, x)) if onReduce else None))
+            if len(data) >= size:
+                break
+    ret.data = data
+    ret.message = tester.cache[hashlib.sha256(data).hexdigest()]
+    ret.tests, ret.cacheHits = tester.tests, tester.cacheHits
+    return ret
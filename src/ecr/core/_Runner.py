@@ -1,94 +1,691 @@
+import math
+import os
+import shlex
+import signal
 import subprocess
+import threading
 import time
 from enum import Enum
-from typing import Dict, Optional, Tuple, Callable
+from typing import Dict, Iterator, List, Optional, Callable, Tuple, Union, cast
 
 from .. import log, ui
+from ..lib.datafile import feedData, isPlainFile
 from ..types import CommandList
 from ..ui import color
+from ._CompileCache import CompileCache, FileSnapshot, getChangedFiles, snapshot
+from ._Step import CONST_jobs, CONST_parallel, RunLimit, flattenSteps, isGroup, parseStep
+from ._UpToDate import StepRecord
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
 
 
 class RunResult(Enum):
     Success: int = 0
     Error: int = 1
     TimeOut: int = 2
+    MemoryLimitExceeded: int = 3
+    CpuTimeLimitExceeded: int = 4
+    Stopped: int = 5
+
+
+runResultDescription: Dict[RunResult, str] = {
+    RunResult.TimeOut: "Time out",
+    RunResult.MemoryLimitExceeded: "Memory limit exceeded",
+    RunResult.CpuTimeLimitExceeded: "CPU time limit exceeded",
+    RunResult.Stopped: "Stopped",
+}
+
+OutputHandler = Callable[[bytes], bool]
+
+
+signalDescription: Dict[str, str] = {
+    "SIGSEGV": "Segmentation fault",
+    "SIGKILL": "Killed",
+    "SIGABRT": "Aborted",
+    "SIGFPE": "Floating point exception",
+    "SIGBUS": "Bus error",
+    "SIGILL": "Illegal instruction",
+    "SIGTERM": "Terminated",
+    "SIGXCPU": "CPU time limit exceeded",
+    "SIGXFSZ": "File size limit exceeded",
+}
+
+
+class StepResult:
+    def __init__(self, command: str):
+        self.command: str = command
+        self.result: RunResult = RunResult.Error
+        self.returnCode: Optional[int] = None
+        self.wallTime: float = 0
+        self.userTime: float = 0
+        self.sysTime: float = 0
+        self.maxRss: int = 0  # KB
+        self.signal: Optional[str] = None
+
+    @property
+    def cpuTime(self) -> float:
+        return self.userTime + self.sysTime
+
+    @property
+    def signalDescription(self) -> Optional[str]:
+        if not self.signal:
+            return None
+        return signalDescription.get(self.signal, self.signal)
+
+    def __iter__(self):  # unpack as (result, returnCode)
+        return iter((self.result, self.returnCode))
+
+    def __str__(self) -> str:
+        ret = f"{self.wallTime:.3f}s cpu {self.cpuTime:.3f}s (user {self.userTime:.3f}s sys {self.sysTime:.3f}s) mem {self.maxRss / 1024:.1f}MB"
+        if self.signal:
+            ret += f" {self.signal} {self.signalDescription}"
+        return ret
+
+
+class RunCommandsResult:
+    def __init__(self, success: bool = True):
+        self.success: bool = success
+        self.steps: List[StepResult] = []
+
+    def __bool__(self) -> bool:
+        return self.success
+
+
+def getPopenArgs(cmd: str) -> Union[str, List[str]]:
+    return shlex.split(cmd) if os.name == "posix" else cmd
+
+
+def getPreexecFn(limit: Optional[RunLimit]) -> Optional[Callable[[], None]]:
+    if not resource or not limit:
+        return None
+    rlimits = []
+    if limit.memoryLimit:
+        # RLIMIT_DATA covers heap and private mappings on Linux without
+        # counting address space that runtimes only reserve
+        rtype = resource.RLIMIT_DATA if os.uname().sysname == "Linux" else resource.RLIMIT_AS
+        rlimits.append((rtype, limit.memoryLimit * 1024 * 1024))
+    if limit.cpuTimeLimit:
+        cpu = int(math.ceil(limit.cpuTimeLimit))
+        rlimits.append((resource.RLIMIT_CPU, cpu, cpu + 1))
+    if limit.stackSize:
+        rlimits.append((resource.RLIMIT_STACK, limit.stackSize * 1024 * 1024))
+    if not rlimits:
+        return None
+
+    def func() -> None:
+        for item in rlimits:
+            rtype, soft = item[0], item[1]
+            _, hard = resource.getrlimit(rtype)
+            if len(item) > 2:
+                hard = item[2] if hard == resource.RLIM_INFINITY else min(item[2], hard)
+            elif hard == resource.RLIM_INFINITY or soft < hard:
+                hard = soft
+            resource.setrlimit(rtype, (min(soft, hard), hard))
+    return func
+
+
+class StepProcess(subprocess.Popen):
+    """
+    A process started by `startProcess`, knowing when it was started, and whether
+    its stderr, piped to be scanned by the runner, is to be passed on to ours.
+    """
+
+    def __init__(self, args, forwardStderr: bool = False, **kwargs):
+        # taken before Popen, so the wall time includes starting the process
+        self.startTime: float = time.perf_counter()
+        self.forwardStderr: bool = forwardStderr
+        super().__init__(args, **kwargs)
+
+
+def startProcess(cmd: str, cwd: str, stdin=None, stdout=None, stderr=None,
+                 limit: Optional[RunLimit] = None) -> subprocess.Popen:
+    """
+    Start a step in its own session (process group on Windows),
+    so that the whole process tree can be killed.
+    """
+    kwargs: Dict = {}
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
+        kwargs["preexec_fn"] = getPreexecFn(limit)
+    else:
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore
+    if limit and limit.memoryLimit and hasattr(os, "wait4") and stderr in (None, subprocess.DEVNULL):
+        # read stderr to tell failed allocations from other errors, see `Runner.run`
+        kwargs["forwardStderr"] = stderr is None
+        stderr = subprocess.PIPE
+    return StepProcess(getPopenArgs(cmd), cwd=cwd, stdin=stdin, stdout=stdout,
+                       stderr=stderr, **kwargs)
+
+
+def getSignalName(returncode: Optional[int]) -> Optional[str]:
+    if returncode is None or returncode >= 0:
+        return None
+    try:
+        return signal.Signals(-returncode).name
+    except ValueError:
+        return f"SIG{-returncode}"
+
+
+killGrace: float = 0.5
+
+rssSampleInterval: float = 0.01  # s, longest wait between samples of VmHWM
+
+
+def _readPeakRss(procDir: int) -> Optional[int]:
+    """VmHWM (KB) of the process whose /proc directory is open as `procDir`; None once it exited."""
+    try:
+        with open("status", "rb", opener=lambda path, flags: os.open(path, flags, dir_fd=procDir)) as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+# what runtimes print when an allocation fails: C++, Python, Java, Go, Rust, perror(ENOMEM)
+allocationFailureMarkers: Tuple[bytes, ...] = (
+    b"std::bad_alloc", b"MemoryError", b"java.lang.OutOfMemoryError", b"runtime: out of memory",
+    b"memory allocation of", b"Cannot allocate memory")
+
+outputTailSize: int = 4096  # bytes of output kept to look for allocation failures
 
 
 class Runner:
-    def __init__(self, proc: subprocess.Popen, io: str, timelimit: Optional[int] = None):
+    def __init__(self, proc: subprocess.Popen, io: str, timelimit: Optional[float] = None,
+                 limit: Optional[RunLimit] = None, startTime: Optional[float] = None):
+        """`startTime` (`time.perf_counter`) defaults to that of a StepProcess, or to when `run` is called."""
         self.proc: subprocess.Popen = proc
-        self.timeLimit: Optional[int] = timelimit
+        self.startTime: Optional[float] = startTime if startTime is not None \
+            else getattr(proc, "startTime", None)
+        self.timeLimit: Optional[float] = timelimit
+        self.limit: Optional[RunLimit] = limit
         self.communicate = self.proc.communicate
         self.usedTime: float = 0
         self.isRunning: bool = False
+        self.isTimeout: bool = False
+        self.isStopped: bool = False
+        self._killTimer: Optional[threading.Timer] = None
+        self.sampledRss: int = 0  # KB, the largest VmHWM seen while running
+        self._tails: List[bytes] = [b"", b""]  # of the pumped stdout and of the drained stderr
         self.io: str = io
         self.canInput: bool = io[0] == "s"
 
+    def _signalTree(self, sig: int) -> bool:
+        try:
+            os.killpg(self.proc.pid, sig)  # the step leads its own process group
+            return True
+        except (ProcessLookupError, PermissionError):
+            return False
+
+    def kill(self) -> None:
+        # SIGTERM the whole tree, then SIGKILL whatever is left after a grace period
+        if os.name != "posix":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+        if self._signalTree(signal.SIGTERM):
+            self._killTimer = threading.Timer(
+                killGrace, self._signalTree, (signal.SIGKILL,))
+            self._killTimer.daemon = True
+            self._killTimer.start()
+
+    def reapTree(self) -> bool:
+        """
+        Kill what is left of the step's tree after its leader has been reaped.
+        Return False if some descendants are still running.
+        """
+        if os.name != "posix":
+            return True
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            if not self._signalTree(sig):
+                break
+            deadline = time.monotonic() + killGrace
+            while self._signalTree(0) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        if self._signalTree(0):
+            log.warning(f"Processes of step {self.proc.args} are still running")
+            return False
+        if self._killTimer:
+            self._killTimer.cancel()
+        return True
+
     def terminate(self) -> None:
-        self.proc.terminate()
-        # os.kill(self.proc.pid, 9)
+        self.kill()
         self.isRunning = False
         self.proc.wait()
+        self.reapTree()
 
     def input(self, data: str)->None:
         self.proc.stdin.write(data.encode("utf-8"))
         self.proc.stdin.flush()
 
-    def run(self)->Tuple[RunResult, Optional[int]]:
-        self.isRunning = True
-        isTimeout = False
-        bg_time = time.time()
+    def _timeout(self) -> None:
+        self.isTimeout = True
+        self.kill()
+
+    def _wait4(self, ret: StepResult) -> None:
+        timer = None
+        if self.timeLimit is not None:
+            rest = self.timeLimit - (time.perf_counter() - self.startTime) if self.startTime else self.timeLimit
+            timer = threading.Timer(max(rest, 0), self._timeout)
+            timer.daemon = True
+            timer.start()
+        try:
+            _, status, usage = os.wait4(self.proc.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+        if os.WIFSIGNALED(status):
+            self.proc.returncode = -os.WTERMSIG(status)
+        else:
+            self.proc.returncode = os.WEXITSTATUS(status)
+        ret.userTime, ret.sysTime = usage.ru_utime, usage.ru_stime
+        # ru_maxrss is in bytes on macOS and KB elsewhere
+        ret.maxRss = usage.ru_maxrss // 1024 if os.uname().sysname == "Darwin" \
+            else usage.ru_maxrss
+        if os.uname().sysname == "Linux" and resource:
+            # Linux keeps the RSS the child had before exec in ru_maxrss: that of this
+            # process when forked, or its peak when vforked. Only a peak above ours is the
+            # program's own; below it, the VmHWM sampled while it ran is the best known.
+            floor = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if ret.maxRss <= floor:
+                ret.maxRss = self.sampledRss
+
+    def _sampleRss(self, procDir: int, done: threading.Event) -> None:
+        # most programs run for a few milliseconds: sample often at first, but sleep
+        # between samples so that the step gets the CPU on a single core
+        delay = 0.0002
+        try:
+            while True:
+                rss = _readPeakRss(procDir)
+                if rss is None:  # exited
+                    break
+                self.sampledRss = max(self.sampledRss, rss)
+                if done.wait(delay):
+                    break
+                delay = min(delay * 1.5, rssSampleInterval)
+        finally:
+            os.close(procDir)
+
+    def _startSampling(self) -> Optional[threading.Event]:
+        """Sample the VmHWM of the step from its /proc directory until the returned event is set."""
+        if os.uname().sysname != "Linux":
+            return None
+        try:
+            # the directory stays bound to this process, even after its pid is reused
+            procDir = os.open(f"/proc/{self.proc.pid}", os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return None
+        done = threading.Event()
+        threading.Thread(target=self._sampleRss, args=(procDir, done), daemon=True).start()
+        return done
+
+    def _communicate(self) -> None:
         try:
-            # if self.io[1] != "s":  # not stdout
             self.communicate(timeout=self.timeLimit)
-            # pylint: disable=W0105
-            """else:  # stdout for async
-                while not self.proc.poll() and self.isRunning:
-                    if self.timeLimit != None and time.time() - bg_time > self.timeLimit:
-                        raise subprocess.TimeoutExpired(
-                            self.proc.cmd, self.timeLimit)
-                    s = self.proc.stdout.readline().decode("utf-8")
-                    safeOutput(s)
-                if self.proc.poll() != 0 and self.isRunning:  # hit error
-                    s = self.proc.stderr.read().decode("utf-8")
-                    safeOutput(s)"""
         except subprocess.TimeoutExpired:
-            isTimeout = True
+            self.isTimeout = True
             self.terminate()
+
+    def _drain(self, pumped: bool) -> List[threading.Thread]:
+        """
+        Close the stdin pipe and read the stdout (unless `pumped`) and stderr pipes on
+        threads, as `communicate` does, so the step can be waited for with `wait4`.
+        """
+        if self.proc.stdin:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        ret = []
+        if self.proc.stdout and not pumped:
+            ret.append(threading.Thread(target=self.proc.stdout.read, daemon=True))
+        if self.proc.stderr:
+            ret.append(threading.Thread(target=self._readStderr, daemon=True))
+        for thread in ret:
+            thread.start()
+        return ret
+
+    def _keepTail(self, ind: int, data: bytes) -> None:
+        self._tails[ind] = (self._tails[ind] + data)[-outputTailSize:]
+
+    def _readStderr(self) -> None:
+        fd = self.proc.stderr.fileno()
+        forward = getattr(self.proc, "forwardStderr", False)
+        while True:
+            data = os.read(fd, 1 << 16)
+            if not data:
+                break
+            self._keepTail(1, data)
+            while forward and data:
+                data = data[os.write(2, data):]
+
+    def allocationFailed(self) -> bool:
+        """Whether the output read from the step tells of a failed allocation."""
+        return any(marker in tail for tail in self._tails for marker in allocationFailureMarkers)
+
+    def _pump(self, onOutput: OutputHandler) -> None:
+        fd = self.proc.stdout.fileno()
+        while True:
+            data = os.read(fd, 1 << 16)
+            if not data:
+                break
+            self._keepTail(0, data)
+            if not self.isStopped and not onOutput(data):
+                self.isStopped = True
+                self.kill()
+
+    def run(self, onOutput: Optional[OutputHandler] = None)->StepResult:
+        """
+        With `onOutput`, the step's stdout pipe is read in chunks and passed to it;
+        the step is stopped as soon as it returns False.
+        """
+        self.isRunning = True
+        self.isTimeout = False
+        ret = StepResult(" ".join(self.proc.args) if isinstance(
+            self.proc.args, list) else str(self.proc.args))
+        readers = []
+        if onOutput:
+            readers.append(threading.Thread(target=self._pump, args=(onOutput,), daemon=True))
+            readers[0].start()
+        bg_time = self.startTime if self.startTime is not None else time.perf_counter()
+        try:
+            if hasattr(os, "wait4"):
+                # the rusage of this very process, not the maximum over all children
+                readers += self._drain(pumped=bool(onOutput))
+                sampling = self._startSampling()
+                try:
+                    self._wait4(ret)
+                finally:
+                    if sampling:
+                        sampling.set()
+            else:
+                self._communicate()
         except KeyboardInterrupt:
             self.terminate()
         finally:
-            ed_time = time.time()
+            ed_time = time.perf_counter()
             self.isRunning = False
             self.usedTime = ed_time - bg_time
-        if isTimeout:
-            return (RunResult.TimeOut, self.proc.returncode)
+            ret.wallTime = self.usedTime
+        ret.returnCode = self.proc.returncode
+        ret.signal = getSignalName(self.proc.returncode)
         if self.proc.returncode != 0:
-            return (RunResult.Error, self.proc.returncode)
-        return (RunResult.Success, self.proc.returncode)
+            self.reapTree()
+        for reader in readers:
+            reader.join(killGrace)
+            if reader.is_alive():  # descendants still hold the pipe
+                self.reapTree()
+                reader.join()
+        for pipe in (self.proc.stdout, self.proc.stderr):
+            if pipe:
+                pipe.close()
+        if self.isStopped:
+            ret.result = RunResult.Stopped
+        elif self.isTimeout:
+            ret.result = RunResult.TimeOut
+        elif self.proc.returncode != 0 and self.limit and self.limit.cpuTimeLimit and \
+                (ret.signal == "SIGXCPU" or ret.cpuTime >= self.limit.cpuTimeLimit):
+            ret.result = RunResult.CpuTimeLimitExceeded
+        elif self.proc.returncode != 0 and self.limit and self.limit.memoryLimit and \
+                (ret.maxRss >= self.limit.memoryLimit * 1024 * 0.8 or self.allocationFailed()):
+            # a refused allocation does not raise the peak RSS, so also look for
+            # the message of a runtime failing to allocate
+            ret.result = RunResult.MemoryLimitExceeded
+        elif self.proc.returncode != 0:
+            ret.result = RunResult.Error
+        else:
+            ret.result = RunResult.Success
+        return ret
 
 
-def runCommands(io: str, commands: CommandList, variables: Dict[str, str], wdir: str, getSystemCommand: Callable[[str], str], inputFile: str, outputFile: str, defaultTimeLimit: Optional[int] = None, showLog: bool = True) -> bool:
+class CancelToken:
+    """
+    Cancel commands run with this token from another thread: the running steps'
+    process trees are killed (their result is Stopped) and no further step starts.
+    """
+
+    def __init__(self):
+        self.cancelled: bool = False
+        self._runners: List[Runner] = []
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            runners = list(self._runners)
+        for runner in runners:
+            runner.isStopped = True
+            runner.kill()
+
+    def attach(self, runner: Runner) -> bool:
+        """Track a running step; return False if the token is already cancelled."""
+        with self._lock:
+            self._runners.append(runner)
+            return not self.cancelled
+
+    def detach(self, runner: Runner) -> None:
+        with self._lock:
+            if runner in self._runners:
+                self._runners.remove(runner)
+
+
+def repeatStep(command: str, wdir: str, inputFile: Optional[str], limit: RunLimit,
+               times: int, outputFile: Optional[str] = None) -> Iterator[StepResult]:
+    """
+    Run one step `times` times with stdin from `inputFile`, which may be compressed
+    or in a pack (see `lib.datafile.openData`). Its output is written to `outputFile`, or discarded.
+    """
+    for _ in range(times):
+        feeder = None
+        if inputFile and not isPlainFile(inputFile):
+            fd, feeder = feedData(inputFile)
+            fin = open(fd, "rb")
+        else:
+            fin = open(inputFile, "rb") if inputFile else None
+        fout = open(outputFile, "wb") if outputFile else None
+        try:
+            proc = startProcess(command, cwd=wdir, stdin=fin if fin else subprocess.DEVNULL,
+                                stdout=fout if fout else subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, limit=limit)
+            if feeder and fin:
+                fin.close()
+            ret = Runner(proc=proc, io="ff", timelimit=limit.timeLimit, limit=limit).run()
+        finally:
+            for f in (fin, fout):
+                if f:
+                    f.close()
+            if feeder:
+                feeder.join()
+        ret.command = command
+        yield ret
+
+
+def runGroup(group: Dict, variables: Dict[str, str], cwd: str,
+             getSystemCommand: Callable[[str], str], limit: RunLimit, showLog: bool = True,
+             cancelToken: Optional[CancelToken] = None, compileOutput: Optional[str] = None,
+             record: Optional[StepRecord] = None) -> List[StepResult]:
+    """
+    Run the steps of a group concurrently, at most `jobs` (default: cpu count) at once.
+    The output of each step is buffered and shown after the group in step order.
+    When a step fails, the running ones are stopped and the waiting ones are not started.
+    """
+    console = ui.getConsole()
+    steps = [parseStep(x, limit) for x in group[CONST_parallel]]
+    commands = [x.command.format(**variables) for x in steps]
+    jobs = group.get(CONST_jobs) or os.cpu_count() or 1
+    token = CancelToken()  # stops the group when one of its steps fails
+    lock = threading.Lock()
+    outputs: List[List[bytes]] = [[] for _ in steps]
+    skipped: List[Optional[str]] = [None for _ in steps]
+    started: List[bool] = [False for _ in steps]  # steps stopped before starting are not
+
+    def run(k: int) -> StepResult:
+        ret = StepResult(commands[k])
+        ret.result = RunResult.Stopped
+        if token.cancelled or (cancelToken and cancelToken.cancelled):
+            return ret
+        with lock:
+            skipped[k] = record.check(steps[k], cwd, commands[k]) if record else None
+        if skipped[k]:
+            ret.result = RunResult.Success
+            return ret
+        started[k] = True
+        begin = time.perf_counter()
+        runner = None
+        try:
+            proc = startProcess(getSystemCommand(commands[k]), cwd=cwd, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, limit=steps[k].limit)
+            runner = Runner(proc=proc, io="ff", timelimit=steps[k].limit.timeLimit, limit=steps[k].limit)
+            for tok in (token, cancelToken):
+                if tok and not tok.attach(runner):
+                    runner.isStopped = True
+                    runner.kill()
+            ret = runner.run(onOutput=lambda data: outputs[k].append(data) or True)
+            ret.command = commands[k]
+        except BaseException:
+            log.errorWithException(f"Run command failed: {commands[k]}")
+            ret.result = RunResult.Error
+        finally:
+            for tok in (token, cancelToken):
+                if tok and runner:
+                    tok.detach(runner)
+            if not ret.wallTime:  # failed to start or to be waited for
+                ret.wallTime = time.perf_counter() - begin
+        if ret.result != RunResult.Success:
+            token.cancel()
+            if record:
+                with lock:
+                    record.invalidate(commands[k])
+        elif record:
+            with lock:
+                record.update(steps[k], cwd, commands[k])
+        return ret
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(run, range(len(steps))))
+
+    if compileOutput:
+        with open(compileOutput, "ab") as f:
+            for data in outputs:
+                f.write(b"".join(data))
+    if showLog:
+        errf, passf = color.useRed("×"), color.useGreen("√")
+        for k, result in enumerate(results):
+            console.write("   ", color.useYellow(f"[{k + 1}]"), commands[k])
+            if skipped[k]:
+                console.write("   ->", color.useYellow("skipped"), f"({skipped[k]})")
+                continue
+            text = b"".join(outputs[k]).decode("utf-8", "replace").rstrip("\n")
+            if text and not compileOutput:
+                console.write(text)
+            if not started[k]:
+                console.write("   ->", color.useYellow("not started"))
+                continue
+            line = ["   ->", passf if result.result == RunResult.Success else errf, str(result)]
+            if result.result == RunResult.Stopped and not (cancelToken and cancelToken.cancelled):
+                line.append(color.useRed("Killed after another step failed"))
+            elif result.result in runResultDescription:
+                line.append(color.useRed(runResultDescription[result.result]))
+            console.write(*line)
+    return [x for k, x in enumerate(results) if not skipped[k]]
+
+
+def runCommands(io: str, commands: CommandList, variables: Dict[str, str], wdir: str, getSystemCommand: Callable[[str], str], inputFile: str, outputFile: str, defaultTimeLimit: Optional[int] = None, showLog: bool = True, compileCache: Optional[CompileCache] = None, sourceFile: Optional[str] = None, defaultLimit: Optional[RunLimit] = None, outputHandler: Optional[OutputHandler] = None, compileOnly: bool = False, cancelToken: Optional[CancelToken] = None, startStep: int = 0, compileOutput: Optional[str] = None, stepRecord: Optional[str] = None) -> RunCommandsResult:
+    """
+    Run the steps in order; with `compileOnly`, every step but the last (the program).
+    `cancelToken` stops them from another thread. Steps before `startStep` are skipped.
+    The stdout and stderr of the compile steps go to the file `compileOutput` if given.
+    With `stepRecord`, the file of a StepRecord, steps whose outputs are up to date are skipped.
+    """
     errf = color.useRed("×")
     passf = color.useGreen("√")
+    ret = RunCommandsResult()
     isSuccess = True
     sumStep = len(commands)
     cwd = wdir
     console = ui.getConsole()
+    # default memory, cpu and stack limits only apply to the program (last step)
+    baseLimit = RunLimit(timeLimit=defaultTimeLimit)
+    programLimit = baseLimit.merge(defaultLimit)
+
+    # every step before the last one is a compile step
+    cacheKey: Optional[str] = None
+    cacheHit = False
+    before: FileSnapshot = {}
+    if compileCache and sourceFile and sumStep > 1:
+        try:
+            cacheKey = compileCache.getKey(os.path.join(cwd, sourceFile), [
+                getSystemCommand(parseStep(x).command.format(**variables))
+                for x in flattenSteps(commands[:-1])])
+            if cacheKey:
+                cacheHit = compileCache.restore(cacheKey, cwd)
+                if not cacheHit:
+                    before = snapshot(cwd)
+        except BaseException:
+            log.errorWithException("Compile cache lookup failed")
+            cacheKey = None
+
+    def storeCache() -> None:
+        files = getChangedFiles(before, snapshot(cwd))
+        files = [x for x in files if x != os.path.basename(cast(str, sourceFile))]
+        stored = cast(CompileCache, compileCache).store(cacheKey, cwd, files) if files else False
+        log.debug(f"Compile cache miss: {cacheKey}, stored {files}")
+        if showLog:
+            console.write("   ->", color.useYellow("cache miss"),
+                          "(stored)" if stored else "(not stored)")
+
+    record = StepRecord(stepRecord) if stepRecord else None
     for ind, bcmd in enumerate(commands):
-        if not isSuccess:
+        if not isSuccess or (compileOnly and ind == sumStep - 1):
             break
-        cmd, timelimit = None, None
-        if not isinstance(bcmd, str):
-            cmd, timelimit = bcmd
-        else:
-            cmd, timelimit = bcmd, defaultTimeLimit
-        _cmd = cmd.format(**variables)
+        if cancelToken and cancelToken.cancelled:
+            isSuccess = False
+            break
+        if isGroup(bcmd):
+            if showLog:
+                console.write("(", color.useYellow(str(ind+1)), f"/{sumStep}) ",
+                              f"{len(bcmd[CONST_parallel])} steps in parallel", sep="")
+            useCache = cacheHit and ind < sumStep - 1
+            if ind < startStep or useCache:
+                if showLog:
+                    console.write("   ->", color.useYellow("skipped") if not useCache else passf,
+                                  color.useGreen("cache hit") if useCache else "(inputs unchanged)")
+                continue
+            results = runGroup(bcmd, variables, cwd, getSystemCommand, baseLimit,
+                               showLog, cancelToken, compileOutput, record)
+            ret.steps += results
+            isSuccess = all(x.result == RunResult.Success for x in results)
+            if isSuccess and cacheKey and not cacheHit and ind == sumStep - 2:
+                storeCache()
+            continue
+        step = parseStep(bcmd, programLimit if ind == sumStep - 1 else baseLimit)
+        limit = step.limit
+        timelimit = limit.timeLimit
+        _cmd = step.command.format(**variables)
         if showLog:
             console.write(
                 "(", color.useYellow(str(ind+1)), f"/{sumStep}) ", _cmd, sep="")
-        proc = None
-        rresult, retcode = None, None
+        if ind < startStep:
+            if showLog:
+                console.write("   ->", color.useYellow("skipped"), "(inputs unchanged)")
+            continue
+        if cacheHit and ind < sumStep - 1:
+            log.debug(f"Compile cache hit: {cacheKey}")
+            if showLog:
+                console.write("   ->", passf, color.useGreen("cache hit"))
+            continue
+        reason = record.check(step, cwd, _cmd) if record else None
+        if reason:
+            if showLog:
+                console.write("   ->", color.useYellow("skipped"), f"({reason})")
+            continue
+        stepResult = StepResult(_cmd)
+        fin, fout = None, None
         runner = None
         try:
             rcmd = getSystemCommand(_cmd)
@@ -97,42 +694,77 @@ def runCommands(io: str, commands: CommandList, variables: Dict[str, str], wdir:
                     timelimit = None
                 if showLog:
                     console.write("-"*20)
-                proc = subprocess.Popen(
+                fin = None if io[0] == "s" else open(inputFile, "r")
+                fout = None if io[1] == "s" else open(outputFile, "wb")
+                proc = startProcess(
                     rcmd,
                     cwd=cwd,
-                    stdin=None if io[0] == "s"
-                    else open(inputFile, "r"),
-                    stdout=None if io[1] == "s"
-                    else open(outputFile, "w"),
-                    stderr=None)
+                    stdin=fin,
+                    stdout=subprocess.PIPE if outputHandler else fout,
+                    stderr=None,
+                    limit=limit)
             else:
-                proc = subprocess.Popen(
+                fout = open(compileOutput, "ab") if compileOutput else None
+                proc = startProcess(
                     rcmd,
                     cwd=cwd,
-                    stdin=None, stdout=None, stderr=None)
+                    stdin=None, stdout=fout, stderr=subprocess.STDOUT if fout else None,
+                    limit=limit)
 
-            runner = Runner(proc=proc, io=io, timelimit=timelimit)
-            rresult, retcode = runner.run()
+            runner = Runner(proc=proc, io=io, timelimit=timelimit, limit=limit)
+            if cancelToken and not cancelToken.attach(runner):
+                runner.isStopped = True
+                runner.kill()
+            handler = None
+            if outputHandler and ind == sumStep - 1:
+                handler = outputHandler
+                if fout:  # tee the piped output to the output file
+                    def tee(data: bytes, f=fout) -> bool:
+                        f.write(data)
+                        return outputHandler(data)
+                    handler = tee
+            stepResult = runner.run(onOutput=handler)
+            stepResult.command = _cmd
         except BaseException:
-            log.errorWithException(f"Run command failed: {rcmd}")
+            log.errorWithException(f"Run command failed: {_cmd}")
             isSuccess = False
         finally:
+            if cancelToken and runner:
+                cancelToken.detach(runner)
+            for f in (fin, fout):
+                if f:
+                    f.close()
+            ret.steps.append(stepResult)
+            log.debug(f"Step finished: {_cmd} -> {stepResult.result.name} {stepResult}")
             if ind == sumStep - 1:  # last command
                 if showLog:
                     console.write("-"*20)
             if showLog:
                 console.write(
                     "   ->",
-                    passf if retcode == 0 else errf,
-                    f"{round(runner.usedTime*1000)/1000}s")
-            if rresult != RunResult.Success:
+                    passf if stepResult.returnCode == 0 else errf,
+                    str(stepResult))
+            if stepResult.result != RunResult.Success:
                 if showLog:
                     console.write(
                         "(", color.useRed(str(ind + 1)), f"/{sumStep}) ",
-                        _cmd, " -> ", color.useRed(str(retcode)), sep="", end=" ")
-                    if rresult == RunResult.TimeOut:
-                        console.write(color.useRed("Time out"))
+                        _cmd, " -> ", color.useRed(str(stepResult.returnCode)), sep="", end=" ")
+                    if stepResult.result in runResultDescription:
+                        console.write(color.useRed(
+                            runResultDescription[stepResult.result]))
+                    elif stepResult.signal:
+                        console.write(color.useRed(
+                            f"{stepResult.signal} ({stepResult.signalDescription})"))
                     else:
                         console.write()
                 isSuccess = False
-    return isSuccess
+                if record:
+                    record.invalidate(_cmd)
+            elif record:
+                record.update(step, cwd, _cmd)
+        if cacheKey and not cacheHit and isSuccess and ind == sumStep - 2:
+            storeCache()
+    if record:
+        record.save()
+    ret.success = isSuccess
+    return ret
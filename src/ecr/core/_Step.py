@@ -0,0 +1,109 @@
+import copy
+import shlex
+from typing import Callable, List, Optional, cast
+
+from ..lib.globs import matchAny
+from ..types import CommandList, StepConfig
+
+CONST_command: str = "command"
+CONST_timeLimit: str = "timeLimit"
+CONST_memoryLimit: str = "memoryLimit"
+CONST_cpuTimeLimit: str = "cpuTimeLimit"
+CONST_stackSize: str = "stackSize"
+CONST_inputs: str = "inputs"
+CONST_outputs: str = "outputs"
+CONST_parallel: str = "parallel"
+CONST_jobs: str = "jobs"
+
+
+class RunLimit:
+    def __init__(self, timeLimit: Optional[float] = None, memoryLimit: Optional[int] = None,
+                 cpuTimeLimit: Optional[float] = None, stackSize: Optional[int] = None):
+        self.timeLimit: Optional[float] = timeLimit  # wall time, s
+        self.memoryLimit: Optional[int] = memoryLimit  # MB
+        self.cpuTimeLimit: Optional[float] = cpuTimeLimit  # s
+        self.stackSize: Optional[int] = stackSize  # MB
+
+    def merge(self, other: Optional["RunLimit"]) -> "RunLimit":
+        ret = copy.copy(self)
+        if other:
+            for k, v in other.__dict__.items():
+                if v is not None:
+                    setattr(ret, k, v)
+        return ret
+
+
+class CommandStep:
+    def __init__(self, command: str, limit: Optional[RunLimit] = None,
+                 inputs: Optional[List[str]] = None, outputs: Optional[List[str]] = None):
+        self.command: str = command
+        self.limit: RunLimit = limit if limit else RunLimit()
+        self.inputs: Optional[List[str]] = inputs  # globs of the files it depends on
+        self.outputs: Optional[List[str]] = outputs  # globs of the files it makes
+        # for a step made by `WorkManager.build`, `command` is a system command made by
+        # `toSystem` (which wraps it for `defaultShell`) from `baseCommand`
+        self.baseCommand: Optional[str] = None
+        self.toSystem: Optional[Callable[[str], str]] = None
+
+    def withArgs(self, args: List[str]) -> str:
+        """The command with `args` quoted and appended before it is made a system command."""
+        ret = " ".join([self.command if self.baseCommand is None else self.baseCommand]
+                       + [shlex.quote(x) for x in args])
+        return self.toSystem(ret) if self.baseCommand is not None and self.toSystem else ret
+
+
+def parseStep(bcmd, default: Optional[RunLimit] = None) -> CommandStep:
+    """
+    A step is a command string, a [command, timeLimit] pair or a mapping
+    with `command` and any of `timeLimit`, `memoryLimit`, `cpuTimeLimit`, `stackSize`,
+    and `inputs` and `outputs`, globs of the files (relative to the working directory)
+    it depends on and makes.
+    """
+    default = default if default else RunLimit()
+    if isinstance(bcmd, str):
+        return CommandStep(bcmd, default.merge(None))
+    if isinstance(bcmd, dict):
+        return CommandStep(bcmd[CONST_command], default.merge(RunLimit(
+            timeLimit=bcmd.get(CONST_timeLimit),
+            memoryLimit=bcmd.get(CONST_memoryLimit),
+            cpuTimeLimit=bcmd.get(CONST_cpuTimeLimit),
+            stackSize=bcmd.get(CONST_stackSize))), bcmd.get(CONST_inputs), bcmd.get(CONST_outputs))
+    cmd, timelimit = bcmd
+    return CommandStep(cmd, default.merge(RunLimit(timeLimit=timelimit)))
+
+
+def isGroup(bcmd: StepConfig) -> bool:
+    """A group `{parallel: [steps], jobs: N}` runs its steps concurrently, at most N at once."""
+    return isinstance(bcmd, dict) and CONST_parallel in bcmd
+
+
+def flattenSteps(commands: CommandList) -> CommandList:
+    """The steps with the steps of groups in place of the groups."""
+    ret: CommandList = []
+    for bcmd in commands:
+        if isGroup(bcmd):
+            ret += cast(dict, bcmd)[CONST_parallel]
+        else:
+            ret.append(bcmd)
+    return ret
+
+
+def firstAffectedStep(commands: CommandList, changed: List[str]) -> Optional[int]:
+    """
+    Index of the first step depending on one of the `changed` paths (relative, `/`-separated),
+    or None. A step without `inputs` depends on every file.
+    """
+    for ind, bcmd in enumerate(commands):
+        for sub in flattenSteps([bcmd]):
+            inputs = parseStep(sub).inputs
+            if inputs is None or any(matchAny(x, inputs) for x in changed):
+                return ind
+    return None
+
+
+def stepOutputs(commands: CommandList) -> List[str]:
+    """The `outputs` globs of all steps, files the steps write themselves."""
+    ret: List[str] = []
+    for sub in flattenSteps(commands):
+        ret += parseStep(sub).outputs or []
+    return ret
@@ -0,0 +1,115 @@
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from ..lib.judger import JudgeResult, compareFiles
+from ._Runner import RunResult, repeatStep
+from ._Step import CommandStep
+
+dataFileRE = re.compile(r"^input(?P<index>\d+)\.data$")
+
+
+class Counterexample:
+    def __init__(self, seed: int, inputFile: str, answerFile: str, message: str):
+        self.seed: int = seed
+        self.inputFile: str = inputFile
+        self.answerFile: str = answerFile
+        self.message: str = message
+
+
+class StressResult:
+    def __init__(self):
+        self.iterations: int = 0
+        self.elapsed: float = 0  # s
+        self.counterexample: Optional[Counterexample] = None
+        self.failure: Optional[str] = None  # the generator or the reference failed
+
+    @property
+    def speed(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed else 0
+
+
+def runStress(generator: CommandStep, reference: CommandStep, solution: CommandStep, wdir: str,
+              tempDir: str, iterations: Optional[int] = None, workers: Optional[int] = None,
+              seed: int = 1, onProgress: Optional[Callable[[int], None]] = None) -> StressResult:
+    """
+    Run `generator seed` for increasing seeds, feed its output to the reference and the
+    solution and compare their outputs, on `workers` threads (default: cpu count),
+    until a counterexample is found or `iterations` iterations are done.
+    Each worker keeps its files in its own directory under `tempDir`.
+    """
+    ret = StressResult()
+    workers = workers if workers else os.cpu_count() or 1
+    lock = threading.Lock()
+    stop = threading.Event()
+    nextSeed = [seed]
+
+    def run(step: CommandStep, inputFile: Optional[str], outputFile: str, args: Optional[List[str]] = None):
+        command = step.withArgs(args) if args else step.command
+        return next(repeatStep(command, wdir, inputFile, step.limit, 1, outputFile))
+
+    def worker(index: int) -> None:
+        temp = os.path.join(tempDir, str(index))
+        os.makedirs(temp, exist_ok=True)
+        inputFile, answerFile, outputFile = [
+            os.path.join(temp, x) for x in ("input.data", "std.data", "output.data")]
+        while not stop.is_set():
+            with lock:
+                if iterations is not None and nextSeed[0] >= seed + iterations:
+                    return
+                current = nextSeed[0]
+                nextSeed[0] += 1
+            for step, fin, fout, args, name in (
+                    (generator, None, inputFile, [str(current)], "Generator"),
+                    (reference, inputFile, answerFile, None, "Reference")):
+                result = run(step, fin, fout, args)
+                if result.result != RunResult.Success:
+                    with lock:
+                        if not ret.failure:
+                            ret.failure = f"{name} failed on seed {current}: {result.result.name} {result}"
+                    stop.set()
+                    return
+            result = run(solution, inputFile, outputFile)
+            if result.result != RunResult.Success:
+                message = f"Solution failed: {result.result.name} {result}"
+            else:
+                judge, message = compareFiles(answerFile, outputFile)
+                if judge == JudgeResult.Accept:
+                    with lock:
+                        ret.iterations += 1
+                        count = ret.iterations
+                    if onProgress:
+                        onProgress(count)
+                    continue
+            with lock:
+                ret.iterations += 1
+                # keep the smallest seed among the workers that failed at the same time
+                if not ret.counterexample or current < ret.counterexample.seed:
+                    ret.counterexample = Counterexample(current, inputFile, answerFile, message)
+            stop.set()
+            return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(worker, ind) for ind in range(workers)]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            stop.set()
+    ret.elapsed = time.perf_counter() - start
+    return ret
+
+
+def saveCase(dataPath: str, inputFile: str, answerFile: str) -> str:
+    """Copy a case into `dataPath` as the next inputN.data / stdN.data pair, return N."""
+    os.makedirs(dataPath, exist_ok=True)
+    index = 1 + max([int(m.group("index")) for m in map(dataFileRE.match, os.listdir(dataPath)) if m],
+                    default=0)
+    shutil.copyfile(inputFile, os.path.join(dataPath, f"input{index}.data"))
+    shutil.copyfile(answerFile, os.path.join(dataPath, f"std{index}.data"))
+    return str(index)
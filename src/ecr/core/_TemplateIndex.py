@@ -0,0 +1,188 @@
+import os
+import pickle
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .. import log
+from .. import template as tp
+from ..types import CommandList
+from ._ConfigCache import racyWindow
+from ._UpToDate import hashFiles
+
+CONST_indexVersion: int = 2
+
+FileStamp = Tuple[str, int, int]  # relative path, mtime, size
+
+
+def _walk(root: str, prefix: str = "") -> List[FileStamp]:
+    ret: List[FileStamp] = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return ret
+    for entry in entries:
+        if entry.name == "__pycache__":
+            continue
+        rel = prefix + entry.name
+        if entry.is_dir():
+            ret += _walk(entry.path, rel + "/")
+        else:
+            st = entry.stat()
+            ret.append((rel, st.st_mtime_ns, st.st_size))
+    return sorted(ret)
+
+
+class TemplateEntry:
+    """What is known about a template, as of the files described by `stamp`."""
+
+    def __init__(self, name: str, path: str):
+        self.name: str = name
+        self.path: str = path
+        self.isDir: bool = os.path.isdir(path)
+        self.subject: str = name
+        self.rootPath: str = path
+        self.after: CommandList = []
+        self.link: List[str] = []
+        self.error: Optional[str] = None
+        self.files: int = 0
+        self.size: int = 0  # bytes
+        self.hash: str = ""  # of the files copied to the destination
+        self.stamp: List[FileStamp] = []
+
+    def template(self) -> tp.Template:
+        ret = tp.Template(self.subject, self.rootPath)
+        ret.after = self.after
+        ret.link = self.link
+        return ret
+
+    def info(self) -> Dict:
+        ret = {"path": self.path, "subject": self.subject, "rootPath": self.rootPath,
+               "after": self.after, "link": self.link, "files": self.files, "size": self.size,
+               "hash": self.hash}
+        if self.error:
+            ret["error"] = self.error
+        return ret
+
+
+def _statStamp(rel: str, path: str) -> List[FileStamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+    return [(rel, st.st_mtime_ns, st.st_size)]
+
+
+def _stamp(path: str, rootPath: Optional[str] = None) -> List[FileStamp]:
+    """
+    A file template itself, or the directory of a template, its config and its root
+    directory: a few stats however large the template is. Adding, removing or renaming
+    a file at the top of the template, or editing its config, changes the stamp.
+    """
+    if not os.path.isdir(path):
+        return _statStamp("", path)
+    ret = _statStamp(".", path) + _statStamp(
+        f"{tp.TEMPLATE_CONFIG_PATH}/config.yml", os.path.join(path, tp.TEMPLATE_CONFIG_PATH, "config.yml"))
+    if rootPath and os.path.normpath(os.path.abspath(rootPath)) != os.path.normpath(path):
+        ret += _statStamp(os.path.abspath(rootPath), rootPath)
+    return ret
+
+
+def _index(name: str, path: str) -> TemplateEntry:
+    ret = TemplateEntry(name, path)
+    if not ret.isDir:
+        ret.stamp = _stamp(path)
+        ret.files, ret.size = 1, ret.stamp[0][2] if ret.stamp else 0
+        ret.hash = hashFiles(os.path.dirname(path), [name])
+        return ret
+    tem, exp = tp.load(path)
+    if exp or not tem:
+        ret.error = str(exp)
+    else:
+        ret.subject, ret.rootPath = tem.subject, tem.rootPath
+        ret.after, ret.link = tem.after, tem.link
+    ret.stamp = _stamp(path, ret.rootPath)
+    files = [x for x in _walk(ret.rootPath)
+             if os.path.normpath(ret.rootPath) != os.path.normpath(path)
+             or not x[0].startswith(tp.TEMPLATE_CONFIG_PATH + "/")]
+    ret.files, ret.size = len(files), sum(x[2] for x in files)
+    ret.hash = hashFiles(ret.rootPath, [x[0] for x in files])
+    return ret
+
+
+class TemplateIndex:
+    """
+    Subject, root path, `after` commands, size and hash of the templates in `dirs`,
+    kept in a pickle at `cacheFile`. An entry is read again only when its stamp (see
+    `_stamp`) changed, so listing and instantiating stay fast with many large
+    templates; the size and hash of a template whose files were edited in place are
+    those of the last indexing. A name in an earlier directory hides the same name in later ones.
+    """
+
+    def __init__(self, dirs: List[str], cacheFile: Optional[str]):
+        self.dirs: List[str] = dirs
+        self.cacheFile: Optional[str] = cacheFile
+        self.data: Dict[str, TemplateEntry] = {}  # absolute path: entry
+        self._changed: bool = False
+        if cacheFile:
+            try:
+                with open(cacheFile, "rb") as f:
+                    cache = pickle.load(f)
+                if cache["version"] == CONST_indexVersion:
+                    self.data = cache["data"]
+            except FileNotFoundError:
+                pass
+            except Exception:  # pylint: disable=W0703
+                log.warning(f"Template index is broken: {cacheFile}", exc_info=True)
+
+    def _get(self, name: str, path: str) -> TemplateEntry:
+        path = os.path.abspath(path)
+        cached = self.data.get(path)
+        if cached and cached.stamp == _stamp(path, cached.rootPath):
+            return cached
+        log.debug(f"Index template {path}")
+        ret = _index(name, path)
+        # files changed within the racy window may change again without moving their mtime
+        if all(x[1] < (time.time() - racyWindow) * 1e9 for x in ret.stamp):
+            self.data[path] = ret
+            self._changed = True
+        elif path in self.data:
+            del self.data[path]
+            self._changed = True
+        return ret
+
+    def find(self, name: str) -> Optional[TemplateEntry]:
+        for item in self.dirs:
+            path = os.path.join(item, name)
+            if os.path.exists(path):
+                return self._get(name, path)
+        return None
+
+    def entries(self) -> List[TemplateEntry]:
+        ret: Dict[str, TemplateEntry] = {}
+        for item in self.dirs:
+            try:
+                names = sorted(os.listdir(item))
+            except OSError:
+                continue
+            for name in names:
+                if name not in ret and not name.startswith("__"):
+                    ret[name] = self._get(name, os.path.join(item, name))
+        return list(ret.values())
+
+    def save(self) -> None:
+        if not self.cacheFile or not self._changed:
+            return
+        # drop entries of removed templates
+        self.data = {k: v for k, v in self.data.items() if os.path.exists(k)}
+        temp = f"{self.cacheFile}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cacheFile), exist_ok=True)
+            with open(temp, "wb") as f:
+                pickle.dump({"version": CONST_indexVersion, "data": self.data},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.cacheFile)
+            self._changed = False
+        except OSError:
+            log.warning(f"Saving template index failed: {self.cacheFile}", exc_info=True)
+            if os.path.isfile(temp):
+                os.remove(temp)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from .. import log
+from ..lib.globs import expandGlobs
+from . import defaultData
+from ._Step import CommandStep
+
+
+def hashFiles(root: str, files: List[str]) -> str:
+    h = hashlib.sha256()
+    for file in files:
+        h.update(file.encode("utf-8") + b"\0")
+        try:
+            with open(os.path.join(root, file), "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            h.update(b"\1")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class StepRecord:
+    """
+    Make-like up-to-date checks for steps declaring both `inputs` and `outputs`.
+    A step whose last run succeeded is skipped when every output glob matches a file
+    and no input is newer than the oldest output, or when the content of its inputs and
+    outputs is the same as after that run, whose hashes are kept in a JSON file.
+    A failed or stopped run drops the record, so outputs it left behind are stale.
+    """
+
+    def __init__(self, file: str):
+        self.file: str = file
+        self.data: Dict[str, Dict[str, str]] = {}
+        self._changed: bool = False
+        try:
+            with open(file, "r", encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _files(self, step: CommandStep, cwd: str):
+        ignore = defaultData.watchIgnore
+        ins = expandGlobs(cwd, step.inputs or [], ignore)
+        outs = [expandGlobs(cwd, [x], ignore) for x in step.outputs or []]
+        return ins, outs
+
+    def check(self, step: CommandStep, cwd: str, command: str) -> Optional[str]:
+        """Why the step can be skipped, or None if it has to run."""
+        if step.inputs is None or step.outputs is None:
+            return None
+        record = self.data.get(command)
+        if not record or record.get("returnCode") != 0:
+            return None
+        ins, outs = self._files(step, cwd)
+        if not all(outs):
+            return None
+        outFiles = sorted({x for y in outs for x in y})
+        try:
+            newest = max((os.stat(os.path.join(cwd, x)).st_mtime_ns for x in ins), default=0)
+            oldest = min(os.stat(os.path.join(cwd, x)).st_mtime_ns for x in outFiles)
+        except OSError:
+            return None
+        if newest <= oldest:
+            return "up to date"
+        if record.get("inputs") == hashFiles(cwd, ins) \
+                and record.get("outputs") == hashFiles(cwd, outFiles):
+            return "same content"
+        return None
+
+    def update(self, step: CommandStep, cwd: str, command: str) -> None:
+        """Record the hashes after a successful run of the step."""
+        if step.inputs is None or step.outputs is None:
+            return
+        ins, outs = self._files(step, cwd)
+        self.data[command] = {
+            "inputs": hashFiles(cwd, ins),
+            "outputs": hashFiles(cwd, sorted({x for y in outs for x in y})),
+            "returnCode": 0,
+        }
+        self._changed = True
+
+    def invalidate(self, command: str) -> None:
+        """Forget the last successful run after a failed or stopped one."""
+        if self.data.pop(command, None) is not None:
+            self._changed = True
+
+    def save(self) -> None:
+        if not self._changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            tmp = f"{self.file}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding='utf-8') as f:
+                json.dump(self.data, f)
+            os.replace(tmp, self.file)
+        except OSError:
+            log.warning("Saving step records failed", exc_info=True)
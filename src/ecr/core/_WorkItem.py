@@ -2,13 +2,15 @@ from enum import Enum
 from typing import Dict, List, Optional, Callable
 import os
 import shutil
-import yaml
 
 from . import path as ecrpath
 from . import defaultData
 from .. import log, ui
+from ..lib.clone import cloneTree
+from ..lib.globs import matchAny
 from ..types import CommandList
 from ..template import Template, default_ignore
+from ._ConfigCache import loadYaml
 from ._Runner import runCommands
 
 
@@ -24,9 +26,11 @@ class WorkItem:
         self.type: WorkItemType = types
         self.run: CommandList = []
         self.test: CommandList = []
+        self.ignore: List[str] = []  # globs of files not to watch
 
 
 def initializeCodeDirectory(path: str) -> None:
+    import yaml
     config: Dict[str, Optional[List]] = {
         "run": [],
         "test": [],
@@ -40,9 +44,10 @@ def loadCodeDirectory(path: str, name: str)->Optional[WorkItem]:
     try:
         ret = WorkItem(path, name, WorkItemType.Directory)
         with open(ecrpath.getCodeDirConfigPath(path), "r", encoding='utf-8') as f:
-            config = yaml.load(f.read())
+            config = loadYaml(f.read())
             ret.test = config["test"]
             ret.run = config["run"]
+            ret.ignore = config.get("ignore") or []
         return ret
     except:
         log.errorWithException("Load dir-workitem failed")
@@ -50,11 +55,11 @@ def loadCodeDirectory(path: str, name: str)->Optional[WorkItem]:
 
 
 def _runcommands(commands: CommandList, variables: Dict[str, str], wdir: str, getSystemCommand: Callable[[str], str], defaultTimeLimit: Optional[int] = None) -> bool:
-    return runCommands(io=defaultData.CIO_SISO, commands=commands, variables=variables, wdir=wdir,
+    return bool(runCommands(io=defaultData.CIO_SISO, commands=commands, variables=variables, wdir=wdir,
                        getSystemCommand=getSystemCommand,
                        inputFile=None,
                        outputFile=None,
-                       defaultTimeLimit=defaultTimeLimit)
+                       defaultTimeLimit=defaultTimeLimit))
 
 
 def initializeCodeDirectoryWithTemplate(man, templ: Template, basepath: str, dstpath: str) -> None:
@@ -73,11 +78,13 @@ def initializeCodeDirectoryWithTemplate(man, templ: Template, basepath: str, dst
 
     console.info(f"Copying files")
 
-    if os.path.normpath(templ.rootPath) == os.path.normpath(basepath):
-        shutil.copytree(
-            templ.rootPath, dstpath, ignore=default_ignore)
-    else:
-        shutil.copytree(templ.rootPath, dstpath)
+    def link(rel: str) -> bool:
+        # only files the template explicitly marks as read-only data share its inode
+        return matchAny(rel, templ.link)
+
+    counts = cloneTree(templ.rootPath, dstpath, link=link,
+                       ignore=default_ignore if os.path.normpath(templ.rootPath) == os.path.normpath(basepath) else None)
+    log.debug(f"Template files: {counts}")
 
     if templ.after:
         console.info(f"After creating")
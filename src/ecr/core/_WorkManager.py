@@ -1,18 +1,24 @@
+import hashlib
 import os
 import platform
 import shutil
+import time
 from enum import Enum
-from typing import Callable, List, Optional, Tuple, cast
-
-import click
-import yaml
+from typing import Callable, Dict, List, Optional, Tuple, cast
 
 from ._manager import fileextToLanguage, languageToFileext, getSystemCommand
 from ._WorkItem import WorkItem, WorkItemType, loadCodeDirectory, initializeCodeDirectory, initializeCodeDirectoryWithTemplate
-from ._Runner import runCommands
+from ._Runner import CancelToken, OutputHandler, RunCommandsResult, RunResult, StepResult, repeatStep, runCommands
+from ._CompileCache import CompileCache
+from ._ConfigCache import loadYamlFiles
+from ._Judger import getInProcessJudger, parseJudgerCommand, runJudger
+from ._Step import CommandStep, RunLimit, isGroup, parseStep
+from ._TemplateIndex import TemplateIndex
 from . import defaultData
 from . import path as ecrpath
 from .. import log, ui
+from ..lib.clone import cloneFile, cloneTree
+from ..lib.judger import JudgeResult, StreamComparator
 from ..types import CommandList, CommandMapping, ExecutorMapping, JudgerMapping, CodeTemplateMapping
 
 CONST_tempFileFilter: str = "tempFileFilter"
@@ -20,13 +26,19 @@ CONST_importedCommand: str = "importedCommand"
 CONST_defaultShell: str = "defaultShell"
 CONST_defaultIO: str = "defaultIO"
 CONST_defaultTimeLimit: str = "defaultTimeLimit"
+CONST_defaultMemoryLimit: str = "defaultMemoryLimit"
+CONST_defaultCpuTimeLimit: str = "defaultCpuTimeLimit"
+CONST_defaultStackSize: str = "defaultStackSize"
 CONST_defaultEditor: str = "defaultEditor"
 CONST_defaultJudger: str = "defaultJudger"
 CONST_eVersion: str = "eVersion"
+CONST_compileCache: str = "compileCache"
+CONST_compileCacheSize: str = "compileCacheSize"
 
 
 def hasInitialized(basepath: str)->bool:
-    return os.path.exists(ecrpath.getMainPath(basepath))
+    # work items keep caches in an .ecr of their own, which is no workspace
+    return os.path.exists(ecrpath.getConfigPath(basepath))
 
 
 class WorkManagerState(Enum):
@@ -47,10 +59,17 @@ class WorkManager:
         self.defaultShell: Optional[str] = None
         self.defaultIO: str = defaultData.io
         self.defaultTimeLimit: int = defaultData.timeLimit
+        self.defaultMemoryLimit: Optional[int] = defaultData.memoryLimit
+        self.defaultCpuTimeLimit: Optional[int] = defaultData.cpuTimeLimit
+        self.defaultStackSize: Optional[int] = defaultData.stackSize
         self.defaultJudger: str = defaultData.judger
         self.defaultTemplate: CodeTemplateMapping = defaultData.templates
         self.state: WorkManagerState = WorkManagerState.Empty
         self.defaultEditor: Optional[str] = None
+        self.compileCache: bool = defaultData.compileCache
+        self.compileCacheSize: int = defaultData.compileCacheSize
+        self.loadTime: float = 0  # s
+        self.configCached: bool = False
         from . import __version__
         self.eVersion: str = __version__
 
@@ -60,6 +79,28 @@ class WorkManager:
         else:
             return self.workingDirectory
 
+    def getCompileCache(self) -> Optional[CompileCache]:
+        if not self.compileCache:
+            return None
+        return CompileCache(ecrpath.getCompileCachePath(ecrpath.getGlobalBasePath()),
+                            self.compileCacheSize * 1024 * 1024)
+
+    def getTemplateIndex(self) -> TemplateIndex:
+        """Index of the templates of this manager, cached with the compile cache in the global directory."""
+        return TemplateIndex(ecrpath.getTemplatePaths(self.getConfigPath()),
+                             ecrpath.getTemplateIndexPath(ecrpath.getGlobalBasePath()))
+
+    def getStepRecordPath(self, item: WorkItem) -> Optional[str]:
+        """Where the up-to-date records of a directory work-item's steps are kept."""
+        if item.type != WorkItemType.Directory:
+            return None
+        key = hashlib.sha1(os.path.abspath(item.path).encode("utf-8")).hexdigest()[:16]
+        return ecrpath.getStepRecordPath(self.getConfigPath(), key)
+
+    def getDefaultLimit(self) -> RunLimit:
+        return RunLimit(timeLimit=self.defaultTimeLimit, memoryLimit=self.defaultMemoryLimit,
+                        cpuTimeLimit=self.defaultCpuTimeLimit, stackSize=self.defaultStackSize)
+
     def getWorkItem(self, name: str, isdir: bool, renew: bool = False) -> Optional[WorkItem]:
         path = os.path.join(self.workingDirectory, name)
         if isdir:
@@ -99,23 +140,22 @@ class WorkManager:
                 if not template:
                     template = self.defaultTemplate["dir"] if "dir" in self.defaultTemplate else None
                 if template:
-                    tempPath = os.path.join(ecrpath.getTemplatePath(
-                        self.getConfigPath()), f"{template}")
-                if tempPath:
-                    if os.path.isdir(tempPath):
-                        from .. import template as tp
-                        tem, exp = tp.load(tempPath)
-                        if exp:
+                    index = self.getTemplateIndex()
+                    entry = index.find(template)
+                    index.save()
+                    if entry and entry.isDir:
+                        if entry.error:
+                            from .. import template as tp
                             log.warning(
-                                f"Template loading failed: {tempPath}", extra=exp)
-                            shutil.copytree(tempPath, dstPath,
-                                            ignore=tp.default_ignore)
+                                f"Template loading failed: {entry.path}: {entry.error}")
+                            cloneTree(entry.path, dstPath,
+                                      ignore=tp.default_ignore)
                         else:
                             initializeCodeDirectoryWithTemplate(
-                                self, tem, tempPath, dstPath)
+                                self, entry.template(), entry.path, dstPath)
                     else:
                         log.warning(
-                            f"Template directory not found: {tempPath}")
+                            f"Template directory not found: {template}")
                         os.mkdir(dstPath)
                         initializeCodeDirectory(dstPath)
                 else:
@@ -129,13 +169,16 @@ class WorkManager:
                     if not template:
                         template = self.defaultTemplate[lang] if lang in self.defaultTemplate else None
                     if template:
-                        tempPath = os.path.join(ecrpath.getTemplatePath(
-                            self.getConfigPath()), f"{template}.{languageToFileext[lang]}")
-                if tempPath:
-                    if os.path.isfile(tempPath):
-                        shutil.copyfile(tempPath, dstPath)
+                        template = f"{template}.{languageToFileext[lang]}"
+                        index = self.getTemplateIndex()
+                        entry = index.find(template)
+                        index.save()
+                        tempPath = entry.path if entry and not entry.isDir else None
+                if lang and template:
+                    if tempPath:
+                        cloneFile(tempPath, dstPath)
                     else:
-                        log.warning(f"Template file not found: {tempPath}")
+                        log.warning(f"Template file not found: {template}")
                         open(dstPath, "w").close()
                 else:
                     open(dstPath, "w").close()
@@ -151,6 +194,7 @@ class WorkManager:
                 item = self.currentFile
             titem: WorkItem = cast(WorkItem, item)
             if titem.type == WorkItemType.File:
+                import click
                 click.edit(filename=titem.name, editor=self.defaultEditor)
             return True
         except:
@@ -170,16 +214,10 @@ class WorkManager:
                 except:
                     log.warning(f"Clean failed: {pat}", exc_info=True)
 
-    def execute(self, io: Optional[str] = None, item: Optional[WorkItem] = None)->bool:
-        if not io:
-            io = self.defaultIO
-        if not item:
-            item = self.currentFile
-        titem: WorkItem = cast(WorkItem, item)
-        cmds: Optional[CommandList] = None
-        console = ui.getConsole()
-        if titem.type == WorkItemType.File:
-            file = titem.name
+    def getRunCommands(self, item: WorkItem) -> Tuple[CommandList, Dict[str, str], str]:
+        """Return the run commands of the item with their variables and working directory."""
+        if item.type == WorkItemType.File:
+            file = item.name
             fileNameWithoutExt, fileext = cast(
                 Tuple[str, str], os.path.splitext(file))
             ext = fileext[1:]
@@ -189,37 +227,125 @@ class WorkManager:
                 defaultData.CMDVAR_FileName: file,
                 defaultData.CMDVAR_FileNameWithoutExt: fileNameWithoutExt,
             }
-
-            console.info(f"Running {file}")
-            return runCommands(io=io, commands=cmds, variables=formats, wdir=self.workingDirectory,
-                               getSystemCommand=lambda p: getSystemCommand(
-                                   p, self),
-                               inputFile=ecrpath.getFileInputPath(
-                                   self.getConfigPath()),
-                               outputFile=ecrpath.getFileOutputPath(
-                                   self.getConfigPath()),
-                               defaultTimeLimit=self.defaultTimeLimit)
+            return cmds, formats, self.workingDirectory
         else:  # directory
-            cmds = titem.run
-            formats = {
-            }
+            return item.run, {}, item.path
 
-            console.info(f"Running {titem.name}")
-            if cmds:
-                return runCommands(io=io, commands=cmds, variables=formats, wdir=titem.path,
-                                   getSystemCommand=lambda p: getSystemCommand(
-                                       p, self),
-                                   inputFile=ecrpath.getFileInputPath(
-                                       self.getConfigPath()),
-                                   outputFile=ecrpath.getFileOutputPath(
-                                       self.getConfigPath()),
-                                   defaultTimeLimit=self.defaultTimeLimit)
-            else:
-                return True
-        return False
+    def execute(self, io: Optional[str] = None, item: Optional[WorkItem] = None,
+                outputHandler: Optional[OutputHandler] = None,
+                cancelToken: Optional[CancelToken] = None, startStep: int = 0)->RunCommandsResult:
+        if not io:
+            io = self.defaultIO
+        if not item:
+            item = self.currentFile
+        titem: WorkItem = cast(WorkItem, item)
+        console = ui.getConsole()
+        cmds, formats, wdir = self.getRunCommands(titem)
+        console.info(f"Running {titem.name}")
+        if titem.type == WorkItemType.Directory and not cmds:
+            return RunCommandsResult()
+        return runCommands(io=io, commands=cmds, variables=formats, wdir=wdir,
+                           getSystemCommand=lambda p: getSystemCommand(
+                               p, self),
+                           inputFile=ecrpath.getFileInputPath(
+                               self.getConfigPath()),
+                           outputFile=ecrpath.getFileOutputPath(
+                               self.getConfigPath()),
+                           defaultTimeLimit=self.defaultTimeLimit,
+                           compileCache=self.getCompileCache() if titem.type == WorkItemType.File else None,
+                           sourceFile=titem.name if titem.type == WorkItemType.File else None,
+                           defaultLimit=self.getDefaultLimit(),
+                           outputHandler=outputHandler, cancelToken=cancelToken,
+                           startStep=startStep, stepRecord=self.getStepRecordPath(titem))
+
+    def build(self, item: WorkItem, variables: Optional[Dict[str, str]] = None,
+              commands: Optional[CommandList] = None, showLog: bool = True,
+              cancelToken: Optional[CancelToken] = None,
+              compileOutput: Optional[str] = None) -> Optional[CommandStep]:
+        """
+        Run the compile steps of the item and return its program step with the command
+        expanded, or None if there is nothing to run or compiling failed.
+        `variables` and `commands` override the item's own.
+        """
+        cmds, formats, wdir = self.getRunCommands(item)
+        if commands is not None:
+            cmds = commands
+        if variables:
+            formats.update(variables)
+        if not cmds:
+            return None
+        isFile = item.type == WorkItemType.File
+        if showLog:
+            ui.getConsole().info(f"Building {item.name}")
+        if not runCommands(io=defaultData.CIO_SISO, commands=cmds, variables=formats, wdir=wdir,
+                           getSystemCommand=lambda p: getSystemCommand(p, self),
+                           inputFile=None, outputFile=None,
+                           defaultTimeLimit=self.defaultTimeLimit, showLog=showLog,
+                           compileCache=self.getCompileCache() if isFile else None,
+                           sourceFile=item.name if isFile else None,
+                           defaultLimit=self.getDefaultLimit(), compileOnly=True,
+                           cancelToken=cancelToken, compileOutput=compileOutput):
+            return None
+        step = parseStep(cmds[-1], RunLimit(
+            timeLimit=self.defaultTimeLimit).merge(self.getDefaultLimit()))
+        step.baseCommand = step.command.format(**formats)
+        step.toSystem = lambda cmd: getSystemCommand(cmd, self)
+        step.command = step.toSystem(step.baseCommand)
+        return step
+
+    def benchmark(self, repeat: int, warmup: int = 1, item: Optional[WorkItem] = None,
+                  onResult: Optional[Callable[[StepResult], None]] = None) -> Optional[List[StepResult]]:
+        """
+        Run the item once as usual, so it is compiled only once, then run its last step
+        `warmup` times untimed and `repeat` times timed, reading the input file and
+        discarding the output. Return the timed results, or None if a run failed.
+        """
+        if not item:
+            item = self.currentFile
+        titem: WorkItem = cast(WorkItem, item)
+        isFile = titem.type == WorkItemType.File
+        if not self.execute(io=defaultData.CIO_FIFO if isFile else defaultData.CIO_SISO, item=titem):
+            return None
+        cmds, formats, wdir = self.getRunCommands(titem)
+        if not cmds:
+            return []
+        limit = RunLimit(timeLimit=self.defaultTimeLimit).merge(self.getDefaultLimit())
+        step = parseStep(cmds[-1], limit)
+        command = getSystemCommand(step.command.format(**formats), self)
+        ret = []
+        for ind, result in enumerate(repeatStep(
+                command, wdir, ecrpath.getFileInputPath(self.getConfigPath()) if isFile else None,
+                step.limit, warmup + repeat)):
+            if result.result != RunResult.Success:
+                log.error(f"Benchmark run failed: {command} -> {result.result.name} {result}")
+                return None
+            if ind >= warmup:
+                ret.append(result)
+                if onResult:
+                    onResult(result)
+        return ret
+
+    def streamJudge(self, item: Optional[WorkItem] = None, tee: bool = False) -> bool:
+        """
+        Run the item with its stdout piped into a text comparator against the std file,
+        stopping at the first mismatch. With `tee`, the output is also written to the output file.
+        """
+        console = ui.getConsole()
+        comparator = StreamComparator(ecrpath.getFileStdPath(self.getConfigPath()),
+                                      os.path.split(ecrpath.getFileOutputPath(self.getConfigPath()))[-1])
+        result = self.execute(io=defaultData.CIO_FIFO if tee else defaultData.CIO_FISO,
+                              item=item, outputHandler=comparator.feed)
+        judgeResult, message = comparator.finish()
+        lastStep = result.steps[-1] if result.steps else None
+        if not result and (not lastStep or lastStep.result != RunResult.Stopped):
+            console.error("Running failed")
+            return False
+        if message:
+            console.write(message)
+        return judgeResult == JudgeResult.Accept
 
-    def judge(self, item: Optional[WorkItem] = None,
-              judger: Optional[str] = None) -> bool:
+    def judge(self, item: Optional[WorkItem] = None, judger: Optional[str] = None,
+              cancelToken: Optional[CancelToken] = None) -> RunCommandsResult:
         if not item:
             item = self.currentFile
         if not judger:
@@ -231,12 +357,21 @@ class WorkManager:
         if titem.type == WorkItemType.File:
             cmds = self.judgerMap[judger]
             formats = {
-                defaultData.CMDVAR_JudgerDir: ecrpath.getJudgerPath(self.getConfigPath()),
+                defaultData.CMDVAR_JudgerDir: ecrpath.findJudgerPath(self.getConfigPath()),
                 defaultData.CMDVAR_ExpectFile: ecrpath.getFileStdPath(self.getConfigPath()),
                 defaultData.CMDVAR_RealFile: ecrpath.getFileOutputPath(self.getConfigPath()),
             }
 
             console.info(f"Judging {titem.name}")
+            if len(cmds) == 1 and not isGroup(cmds[0]):
+                cmd = parseStep(cmds[0]).command.format(**formats)
+                files = parseJudgerCommand(cmd)
+                if files:
+                    script, expectFile, realFile = [os.path.join(
+                        self.workingDirectory, x) for x in files]
+                    inProcess = getInProcessJudger(script)
+                    if inProcess:
+                        return runJudger(inProcess, cmd, expectFile, realFile)
             return runCommands(io=defaultData.CIO_SISO, commands=cmds, variables=formats, wdir=self.workingDirectory,
                                getSystemCommand=lambda p: getSystemCommand(
                                    p, self),
@@ -244,25 +379,26 @@ class WorkManager:
                                    self.getConfigPath()),
                                outputFile=ecrpath.getFileOutputPath(
                                    self.getConfigPath()),
-                               defaultTimeLimit=self.defaultTimeLimit)
+                               defaultTimeLimit=self.defaultTimeLimit, cancelToken=cancelToken)
         else:  # directory
             cmds = titem.test
             formats = {
-                defaultData.CMDVAR_JudgerDir: ecrpath.getJudgerPath(self.getConfigPath()),
+                defaultData.CMDVAR_JudgerDir: ecrpath.findJudgerPath(self.getConfigPath()),
             }
 
             console.info(f"Judging {titem.name}")
             if cmds:
                 return runCommands(io=defaultData.CIO_SISO, commands=cmds, variables=formats, wdir=titem.path,
+                                   stepRecord=self.getStepRecordPath(titem),
                                    getSystemCommand=lambda p: getSystemCommand(
                                        p, self),
                                    inputFile=ecrpath.getFileInputPath(
                                        self.getConfigPath()),
                                    outputFile=ecrpath.getFileOutputPath(
                                        self.getConfigPath()),
-                                   defaultTimeLimit=self.defaultTimeLimit)
+                                   defaultTimeLimit=self.defaultTimeLimit, cancelToken=cancelToken)
             else:
-                return True
+                return RunCommandsResult()
 
 
 def loadFrom(basepath: str) -> Tuple[Optional[WorkManager], Optional[Exception]]:
@@ -271,24 +407,34 @@ def loadFrom(basepath: str) -> Tuple[Optional[WorkManager], Optional[Exception]]
     ret = WorkManager(basepath)
     exp = None
     try:
-        with open(ecrpath.getExecutorPath(basepath), "r", encoding='utf-8') as f:
-            ret.executorMap = yaml.load(f.read())
-
-        with open(ecrpath.getJudgerConfigPath(basepath), "r", encoding='utf-8') as f:
-            ret.judgerMap = yaml.load(f.read())
-
-        with open(ecrpath.getTemplateConfigPath(basepath), "r", encoding='utf-8') as f:
-            ret.defaultTemplate = yaml.load(f.read())
-
-        with open(ecrpath.getConfigPath(basepath), "r", encoding='utf-8') as f:
-            config = yaml.load(f.read())
-            ret.tempFileFilter = config[CONST_tempFileFilter]
-            ret.importedCommand = config[CONST_importedCommand]
-            ret.defaultShell = config[CONST_defaultShell]
-            ret.defaultIO = config[CONST_defaultIO]
-            ret.defaultEditor = config[CONST_defaultEditor]
-            ret.defaultJudger = config[CONST_defaultJudger]
-            ret.eVersion = config[CONST_eVersion]
+        start = time.perf_counter()
+        (ret.executorMap, ret.judgerMap, ret.defaultTemplate, config), ret.configCached = loadYamlFiles(
+            [ecrpath.getExecutorPath(basepath), ecrpath.getJudgerConfigPath(basepath),
+             ecrpath.getTemplateConfigPath(basepath), ecrpath.getConfigPath(basepath)],
+            ecrpath.getConfigCachePath(basepath))
+        ret.loadTime = time.perf_counter() - start
+        log.debug(f"Config loaded in {ret.loadTime * 1000:.1f}ms "
+                  f"({'cached' if ret.configCached else 'parsed'}) from {basepath}")
+
+        ret.tempFileFilter = config[CONST_tempFileFilter]
+        ret.importedCommand = config[CONST_importedCommand]
+        ret.defaultShell = config[CONST_defaultShell]
+        ret.defaultIO = config[CONST_defaultIO]
+        ret.defaultTimeLimit = config.get(
+            CONST_defaultTimeLimit, defaultData.timeLimit)
+        ret.defaultMemoryLimit = config.get(
+            CONST_defaultMemoryLimit, defaultData.memoryLimit)
+        ret.defaultCpuTimeLimit = config.get(
+            CONST_defaultCpuTimeLimit, defaultData.cpuTimeLimit)
+        ret.defaultStackSize = config.get(
+            CONST_defaultStackSize, defaultData.stackSize)
+        ret.defaultEditor = config[CONST_defaultEditor]
+        ret.defaultJudger = config[CONST_defaultJudger]
+        ret.eVersion = config[CONST_eVersion]
+        ret.compileCache = config.get(
+            CONST_compileCache, defaultData.compileCache)
+        ret.compileCacheSize = config.get(
+            CONST_compileCacheSize, defaultData.compileCacheSize)
         ret.state = WorkManagerState.Loaded
     except Exception as e:
         log.errorWithException(f"Loading ecr data failed from {basepath}")
@@ -312,12 +458,13 @@ def load(basepath: str) -> Tuple[Optional[WorkManager], Optional[Exception]]:
 
 def clear(basepath: str)->None:
     oipath = ecrpath.getMainPath(basepath)
-    if hasInitialized(basepath):
+    if os.path.exists(oipath):
         log.debug(f"Clear ecr data at {basepath}")
         shutil.rmtree(oipath)
 
 
 def initialize(basepath: str)->None:
+    import yaml
     clear(basepath)
 
     log.debug(f"Initialize ecr data at {basepath}")
@@ -332,11 +479,8 @@ def initialize(basepath: str)->None:
     #   "w", encoding='utf-8') as f:
     # f.write(v)
 
-    # os.mkdir(ecrpath.getJudgerPath(basepath))
-    shutil.copytree(ecrpath.getCoreJudgerPath(),
-                    ecrpath.getJudgerPath(basepath))
-    shutil.copytree(ecrpath.getCoreTemplatePath(),
-                    ecrpath.getTemplatePath(basepath))
+    # judgers/ and templates/ are looked up in the global and built-in directories
+    # when missing, see ecrpath.getTemplatePaths
 
     executors = defaultData.executors
     with open(ecrpath.getExecutorPath(basepath), "w", encoding='utf-8') as f:
@@ -364,8 +508,13 @@ def initialize(basepath: str)->None:
               CONST_defaultShell: "powershell -c" if platform.system() == "Windows" else None,
               CONST_defaultIO: defaultData.io,
               CONST_defaultTimeLimit: defaultData.timeLimit,
+              CONST_defaultMemoryLimit: defaultData.memoryLimit,
+              CONST_defaultCpuTimeLimit: defaultData.cpuTimeLimit,
+              CONST_defaultStackSize: defaultData.stackSize,
               CONST_defaultEditor: defaultData.editor,
               CONST_defaultJudger: defaultData.judger,
+              CONST_compileCache: defaultData.compileCache,
+              CONST_compileCacheSize: defaultData.compileCacheSize,
               CONST_eVersion: __version__}
 
     with open(ecrpath.getConfigPath(basepath), "w", encoding='utf-8') as f:
@@ -1,7 +1,5 @@
 from typing import Dict, List
 
-from prompt_toolkit.application import run_in_terminal
-
 fileextToLanguage: Dict[str, str] = {
     "c": "c",
     "cpp": "cpp",
@@ -31,4 +29,5 @@ def getSystemCommand(cmd: str, man=None) -> str:
 
 
 def safeOutput(*values: List)->None:
+    from prompt_toolkit.application import run_in_terminal
     run_in_terminal(lambda: print(*values, end=""))
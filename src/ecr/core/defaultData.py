@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from ..types import CommandMapping, ExecutorMapping, JudgerMapping, CodeTemplateMapping
 
@@ -10,8 +10,15 @@ CIO_Types: List[str] = [CIO_SISO, CIO_SIFO, CIO_FISO, CIO_FIFO]
 
 io: str = CIO_SISO
 timeLimit: int = 10
+memoryLimit: Optional[int] = None  # MB
+cpuTimeLimit: Optional[int] = None  # s
+stackSize: Optional[int] = None  # MB
 editor: str = "vim"
 judger: str = "text"
+compileCache: bool = True
+compileCacheSize: int = 512  # MB
+# never watched in directory work-items, besides their own `ignore` globs
+watchIgnore: List[str] = [".ecr", ".git", ".svn", ".hg", "__pycache__", "*.pyc", "*.swp", "*~", ".DS_Store"]
 
 CMDVAR_FileName: str = "fileName"
 CMDVAR_FileNameWithoutExt: str = "fileNameWithoutExt"
@@ -3,4 +3,10 @@
 from ._manager import getSystemCommand
 from ._WorkItem import WorkItem, WorkItemType, initializeCodeDirectory
 from ._WorkManager import WorkManager, WorkManagerState, hasInitialized, initialize, clear, load
-from ._Runner import runCommands
+from ._Runner import CancelToken, runCommands, Runner, RunResult, StepResult, RunCommandsResult
+from ._Bench import BenchCandidate, BenchResult, runInterleaved
+from ._Stress import Counterexample, StressResult, runStress, saveCase
+from ._Minimize import FailureTester, MinimizeResult, minimize, predicates
+from ._Complexity import ScalingResult, geometricSizes, measureScaling
+from ._Step import CommandStep, RunLimit, firstAffectedStep, stepOutputs
+from ._TemplateIndex import TemplateEntry, TemplateIndex
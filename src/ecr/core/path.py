@@ -1,4 +1,5 @@
 import os
+from typing import Callable, List, Optional
 
 
 def getGlobalBasePath() -> str:
@@ -45,6 +46,34 @@ def getFileStdPath(basepath: str) -> str:
     return os.path.join(getMainPath(basepath), "std.data")
 
 
+def getCachePath(basepath: str) -> str:
+    return os.path.join(getMainPath(basepath), "cache")
+
+
+def getCompileCachePath(basepath: str) -> str:
+    return os.path.join(getCachePath(basepath), "compile")
+
+
+def getConfigCachePath(basepath: str) -> str:
+    return os.path.join(getCachePath(basepath), "config.pickle")
+
+
+def getTemplateIndexPath(basepath: str) -> str:
+    return os.path.join(getCachePath(basepath), "templates.pickle")
+
+
+def getManifestPath(basepath: str) -> str:
+    return os.path.join(getCachePath(basepath), "manifest.yml")
+
+
+def getCaseResultsPath(basepath: str) -> str:
+    return os.path.join(getCachePath(basepath), "results.json")
+
+
+def getStepRecordPath(basepath: str, name: str) -> str:
+    return os.path.join(getCachePath(basepath), "steps", f"{name}.json")
+
+
 def getCodeDirConfigPath(basepath: str) -> str:
     return os.path.join(basepath, "config.yml")
 
@@ -63,3 +92,31 @@ def getCoreJudgerPath() -> str:
 
 def getCoreTemplatePath() -> str:
     return os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "templates")
+
+
+def _searchPaths(getPath: Callable[[str], str], core: str, basepath: str) -> List[str]:
+    ret: List[str] = []
+    for item in (getPath(basepath), getPath(getGlobalBasePath()), core):
+        if os.path.isdir(item) and os.path.normpath(item) not in map(os.path.normpath, ret):
+            ret.append(item)
+    return ret
+
+
+def getTemplatePaths(basepath: str) -> List[str]:
+    """
+    Template directories in lookup order: the one at `basepath`, the global one, and
+    the built-in one, so `init` refers to shared templates instead of copying them.
+    """
+    return _searchPaths(getTemplatePath, getCoreTemplatePath(), basepath)
+
+
+def findTemplate(basepath: str, name: str) -> Optional[str]:
+    for item in getTemplatePaths(basepath):
+        if os.path.exists(os.path.join(item, name)):
+            return os.path.join(item, name)
+    return None
+
+
+def findJudgerPath(basepath: str) -> str:
+    """The first judger directory of the one at `basepath`, the global one, and the built-in one."""
+    return _searchPaths(getJudgerPath, getCoreJudgerPath(), basepath)[0]
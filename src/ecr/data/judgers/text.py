@@ -1,18 +1,11 @@
-import difflib
 from typing import Optional, Tuple
 
-from ecr.lib.judger import DataItem, JudgeResult, judging, trimLineEnd
+from ecr.lib.judger import DataItem, JudgeResult, compareFiles, judging
 
 
 def judge(std: DataItem, out: DataItem) -> Tuple[JudgeResult, Optional[str]]:
-    diff = difflib.context_diff(trimLineEnd(std.data), trimLineEnd(
-        out.data), fromfile=std.name, tofile=out.name, lineterm="")
-    ls = list(diff)
-    if ls:
-        return JudgeResult.Wrong, "\n".join(ls)
-    else:
-        return JudgeResult.Accept, None
+    return compareFiles(std.file, out.file)
 
 
 if __name__ == "__main__":
-    judging(judge)
+    judging(judge, autoload=False)
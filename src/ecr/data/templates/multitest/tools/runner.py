@@ -1,46 +1,30 @@
+import argparse
 import os
-import sys
-from ecr.lib.runner import runCommands, CIO_FIFO
-from ecr.lib.console import info, error, write
+from ecr.lib.multitest import runCases, printResults
 
 dataPath = "./data"
 timeLimit = 5
+workers = None
 command = ""
 
 
-def runOne(cmd, inputFile, outputFile, timelimit) -> bool:
-    return runCommands(CIO_FIFO, [cmd], {}, os.getcwd(),
-                       lambda s: s, inputFile, outputFile, timelimit, False)
-
-
 def run():
-    global command, timeLimit
-
-    if len(sys.argv) < 3:
-        print("No enough arguments")
-        exit(-1)
-
-    command = sys.argv[1]
-    timeLimit = int(sys.argv[2])
-
-    total = 0
-    passed = 0
-    for item in os.listdir(dataPath):
-        inputFile = os.path.join(dataPath, item)
-        if not os.path.isfile(inputFile):
-            continue
-        if not item.startswith("input"):
-            continue
-        total += 1
-        name = os.path.splitext(item)[0].replace("input", "")
-        outputFile = os.path.join(dataPath, item.replace("input", "output"))
-        info(f"Running: {name}")
-        result = runOne(command, inputFile, outputFile, timeLimit)
-        if result:
-            passed += 1
-        else:
-            error(f"Run case {name} failed.")
-    info(f"Finished {passed} / {total}")
+    global command, timeLimit, workers
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", help="Command to run on each case")
+    parser.add_argument("timeLimit", type=int, help="Time limit in seconds")
+    parser.add_argument("workers", type=int, nargs="?", default=None, help="Cases run at once")
+    parser.add_argument("-t", "--tag", action="append", default=None, help="Only cases with this tag")
+    parser.add_argument("-c", "--case", action="append", default=None, help="Only cases whose name matches this glob")
+    parser.add_argument("--changed", action="store_true", help="Only cases changed since the last run")
+    args = parser.parse_args()
+
+    command, timeLimit, workers = args.command, args.timeLimit, args.workers
+
+    results = runCases(command, dataPath, timeLimit, workers, wdir=os.getcwd(),
+                       tags=args.tag, patterns=args.case, changedOnly=args.changed)
+    printResults(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+from typing import Callable, Dict, Optional, Set
+
+FICLONE: int = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+
+_noReflink: Set[int] = set()  # st_dev of file systems without reflink support
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Share the blocks of `src` with a new file `dst` (copy-on-write), where the file system supports it."""
+    if not sys.platform.startswith("linux"):
+        return False
+    dev = os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    if dev in _noReflink:
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+    except OSError:
+        _noReflink.add(dev)
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def cloneFile(src: str, dst: str, link: bool = False) -> str:
+    """
+    Materialize `src` at `dst` as cheap as possible: a hard link when `link` is set
+    (only for files nobody edits, since both names share one inode), otherwise a reflink,
+    and a plain copy when neither works. Return the way used: link, reflink or copy.
+    """
+    if link:
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass
+    if reflink(src, dst):
+        return "reflink"
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def cloneTree(src: str, dst: str, ignore=None,
+              link: Optional[Callable[[str], bool]] = None) -> Dict[str, int]:
+    """
+    `shutil.copytree` cloning files with `cloneFile`. `link` gets the path of a file
+    relative to `src` (with `/`) and tells whether it may be hard linked.
+    Return how many files were materialized each way.
+    """
+    counts: Dict[str, int] = {"link": 0, "reflink": 0, "copy": 0}
+
+    def copy(s: str, d: str) -> str:
+        rel = os.path.relpath(s, src).replace(os.sep, "/")
+        way = cloneFile(s, d, link is not None and link(rel))
+        counts[way] += 1
+        return d
+
+    shutil.copytree(src, dst, ignore=ignore, copy_function=copy)
+    return counts
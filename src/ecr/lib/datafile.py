@@ -0,0 +1,194 @@
+import io
+import os
+import threading
+from typing import IO, Any, List, Optional, Tuple
+
+compressionExts: Tuple[str, ...] = (".gz", ".xz", ".zst")
+packExts: Tuple[str, ...] = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.xz", ".txz", ".tar.zst")
+
+chunkSize: int = 1 << 16
+
+
+def _openZstd(path: str) -> IO[bytes]:
+    try:
+        from compression import zstd  # type: ignore  # Python 3.14+
+        return zstd.open(path, "rb")
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        raise OSError(f"Reading {path} needs the zstandard package") from None
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return io.BufferedReader(reader, chunkSize)
+
+
+def stripCompression(name: str) -> str:
+    """`input1.data.gz` -> `input1.data`"""
+    for ext in compressionExts:
+        if name.endswith(ext) and not isPack(name):
+            return name[:-len(ext)]
+    return name
+
+
+def isCompressed(path: str) -> bool:
+    return stripCompression(path) != path
+
+
+def isPack(path: str) -> bool:
+    return path.endswith(packExts)
+
+
+def openCompressed(path: str) -> IO[bytes]:
+    """Open a file for binary reading, decompressing .gz, .xz and .zst on the fly."""
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, "rb")
+    if path.endswith(".xz"):
+        import lzma
+        return lzma.open(path, "rb")
+    if path.endswith(".zst"):
+        return _openZstd(path)
+    return open(path, "rb")
+
+
+class _Member:
+    """A file in a pack, closing the pack along with it."""
+
+    def __init__(self, file: IO[bytes], pack: Any):
+        self._file = file
+        self._pack = pack
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+        self._pack.close()
+
+
+class _Tar:
+    """A tar pack together with the zstd stream it reads from, if any."""
+
+    def __init__(self, pack: str):
+        import tarfile
+        self.raw: Optional[IO[bytes]] = None
+        if pack.endswith(".tar.zst"):
+            # tarfile cannot seek in a zstd stream, so read it sequentially
+            self.raw = _openZstd(pack)
+            self.tar = tarfile.open(fileobj=self.raw, mode="r|")
+        else:
+            self.tar = tarfile.open(pack, "r:*")
+
+    def close(self) -> None:
+        self.tar.close()
+        if self.raw:
+            self.raw.close()
+
+
+def listPack(pack: str) -> List[str]:
+    """Names of the files in a zip or tar pack."""
+    if pack.endswith(".zip"):
+        import zipfile
+        with zipfile.ZipFile(pack) as z:
+            return [x.filename for x in z.infolist() if not x.is_dir()]
+    t = _Tar(pack)
+    try:
+        return [x.name for x in t.tar if x.isfile()]
+    finally:
+        t.close()
+
+
+def openMember(pack: str, name: str) -> IO[bytes]:
+    """
+    Open a file in a pack without extracting it. Zip files and plain tars have random
+    access; compressed tars are decompressed from the start up to the member.
+    """
+    if pack.endswith(".zip"):
+        import zipfile
+        z = zipfile.ZipFile(pack)
+        try:
+            return _Member(z.open(name), z)  # type: ignore
+        except BaseException:
+            z.close()
+            raise
+    t = _Tar(pack)
+    try:
+        for member in t.tar:
+            if member.name == name and member.isfile():
+                file = t.tar.extractfile(member)
+                assert file
+                return _Member(file, t)  # type: ignore
+    except BaseException:
+        t.close()
+        raise
+    t.close()
+    raise FileNotFoundError(f"{name} not in {pack}")
+
+
+def splitPackPath(path: str) -> Optional[Tuple[str, str]]:
+    """`data.zip/input1.data` -> (`data.zip`, `input1.data`), if `data.zip` is a pack file."""
+    parent, rest = os.path.normpath(path), ""
+    while True:
+        parent, base = os.path.split(parent)
+        if not base:
+            return None
+        rest = f"{base}/{rest}" if rest else base
+        if isPack(parent) and os.path.isfile(parent):
+            return parent, rest
+
+
+def openData(path: str) -> IO[bytes]:
+    """
+    Open a data file for binary reading: a plain file, a compressed one, or a file in a
+    zip or tar pack addressed as if the pack were a directory (`data.zip/input1.data`).
+    """
+    if os.path.isfile(path):
+        return openCompressed(path)
+    pack = splitPackPath(path)
+    if pack:
+        return openMember(*pack)
+    raise FileNotFoundError(path)
+
+
+def openDataText(path: str) -> IO[str]:
+    return io.TextIOWrapper(openData(path), encoding='utf-8')  # type: ignore
+
+
+def isPlainFile(path: str) -> bool:
+    """Whether the data can be handed to a process as a regular file."""
+    return os.path.isfile(path) and not isCompressed(path)
+
+
+def feedData(path: str):
+    """
+    Return a pipe file descriptor to use as the stdin of a process and a started thread
+    writing the decompressed data of `path` into it, so decompression overlaps with the run.
+    Close the descriptor after starting the process and join the thread after it exits.
+    """
+    src = openData(path)
+    rfd, wfd = os.pipe()
+
+    def feed() -> None:
+        try:
+            with src, open(wfd, "wb", buffering=0) as dst:
+                for chunk in iter(lambda: src.read(chunkSize), b""):
+                    dst.write(chunk)
+        except BrokenPipeError:
+            pass  # the process stopped reading
+        except (OSError, EOFError) as e:
+            from .console import error
+            error(f"Reading {path} failed: {e}")
+
+    thread = threading.Thread(target=feed, daemon=True)
+    thread.start()
+    return rfd, thread
@@ -0,0 +1,56 @@
+import os
+import re
+from functools import lru_cache
+from typing import Iterable, List, Pattern
+
+
+@lru_cache(maxsize=None)
+def compileGlob(pattern: str) -> Pattern:
+    """
+    `*` and `?` do not cross `/`, `**` does. A pattern without `/` matches the
+    last component of a path, others the whole path relative to the root.
+    """
+    pattern = pattern.strip("/")
+    ret, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            ret.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            ret.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            ret.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            ret.append("[^/]")
+            i += 1
+        else:
+            ret.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "" if "/" in pattern else "(?:.*/)?"
+    return re.compile(f"^{prefix}{''.join(ret)}$")
+
+
+def matchAny(path: str, patterns: Iterable[str]) -> bool:
+    """`path` is relative, separated by `/`."""
+    return any(compileGlob(x).match(path) for x in patterns)
+
+
+def isIgnored(path: str, patterns: Iterable[str]) -> bool:
+    """True if `path` or one of the folders it is in matches a pattern."""
+    parts = path.split("/")
+    return any(matchAny("/".join(parts[:i]), patterns) for i in range(1, len(parts) + 1))
+
+
+def expandGlobs(root: str, patterns: Iterable[str], ignore: Iterable[str] = ()) -> List[str]:
+    """Files under `root` matching one of `patterns`, as sorted relative `/`-separated paths."""
+    patterns, ignore = list(patterns), list(ignore)
+    ret = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        prefix = "" if rel == "." else rel + "/"
+        dirnames[:] = [x for x in dirnames if not matchAny(prefix + x, ignore)]
+        ret += [prefix + x for x in filenames
+                if matchAny(prefix + x, patterns) and not matchAny(prefix + x, ignore)]
+    return sorted(ret)
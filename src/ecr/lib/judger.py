@@ -1,7 +1,10 @@
 import os
 import sys
+from collections import deque
 from enum import Enum
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Deque, List, Optional, Tuple
+
+from .datafile import isPlainFile, openData, openDataText, stripCompression
 
 
 class JudgeResult(Enum):
@@ -11,10 +14,22 @@ class JudgeResult(Enum):
 
 
 class DataItem:
-    def __init__(self, file: str, data: List[str]):
+    def __init__(self, file: str, data: Optional[List[str]] = None):
         self.file: str = file
         self.name = os.path.split(self.file)[-1]
-        self.data: List[str] = data
+        self._data: Optional[List[str]] = data
+
+    @property
+    def data(self) -> List[str]:
+        # loaded on first use, so judgers that stream the file never read it whole
+        if self._data is None:
+            with openDataText(self.file) as f:
+                self._data = f.readlines()
+        return self._data
+
+    @data.setter
+    def data(self, value: List[str]) -> None:
+        self._data = value
 
 
 def judged(code: JudgeResult, message: Optional[str] = None):
@@ -36,10 +51,10 @@ def getFileContents(expectedFile=None, realFile=None) -> Tuple[List[str], List[s
     if not expectedFile:
         expectedFile = getFileNames()[0]
     if not realFile:
-        expectedFile = getFileNames()[1]
+        realFile = getFileNames()[1]
     expectedData: List[str] = []
     realData: List[str] = []
-    with open(expectedFile, "r", encoding='utf-8') as f:
+    with openDataText(expectedFile) as f:
         expectedData = f.readlines()
     with open(realFile, "r", encoding='utf-8') as f:
         realData = f.readlines()
@@ -50,7 +65,150 @@ def trimLineEnd(data: List[str]) -> List[str]:
     return [x.rstrip() for x in data]
 
 
+def _decode(line: Optional[bytes]) -> str:
+    return "<EOF>" if line is None else line.decode("utf-8", "replace")
+
+
+class StreamComparator:
+    """
+    Compare output fed in chunks against an expected file line by line,
+    ignoring trailing whitespace. Memory stays bounded by the longest line
+    and `context`, the number of lines reported around the first difference.
+    The expected file may be compressed or in a pack (see `datafile.openData`).
+    """
+
+    def __init__(self, expectedFile: str, realName: str = "output", context: int = 3):
+        self.expectedName: str = stripCompression(os.path.split(expectedFile)[-1])
+        self.realName: str = realName
+        self.context: int = context
+        self.line: int = 0
+        self.result: Optional[JudgeResult] = None
+        self.message: Optional[str] = None
+        self._expected = openData(expectedFile)
+        self._buffer: bytes = b""
+        self._before: Deque[bytes] = deque(maxlen=context)
+        self._diff: Optional[Tuple[int, Optional[bytes], Optional[bytes]]] = None
+        self._afterReal: List[bytes] = []
+        self._done: bool = False
+
+    def skip(self, offset: int, lines: int, before: List[bytes]) -> None:
+        """Start comparing at byte `offset` of the expected file, after `lines` equal lines."""
+        self._expected.seek(offset)
+        self.line = lines
+        self._before.extend(x.rstrip() for x in before)
+
+    def _compare(self, real: Optional[bytes]) -> bool:
+        if self._diff:
+            if real is not None and len(self._afterReal) < self.context:
+                self._afterReal.append(real.rstrip())
+            self._done = real is None or len(self._afterReal) >= self.context
+            return not self._done
+        expected: Optional[bytes] = self._expected.readline()
+        if not expected and real is None:
+            return True
+        self.line += 1
+        if not expected or real is None or expected.rstrip() != real.rstrip():
+            self._diff = (self.line, expected.rstrip() if expected else None,
+                          real.rstrip() if real is not None else None)
+            self._done = real is None or self.context == 0
+            return not self._done
+        self._before.append(expected.rstrip())
+        return True
+
+    def feed(self, data: bytes) -> bool:
+        """Return False as soon as the output is known to be wrong."""
+        if self._done:
+            return False
+        lines = (self._buffer + data).split(b"\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            if not self._compare(line):
+                return False
+        return True
+
+    def finish(self) -> Tuple[JudgeResult, Optional[str]]:
+        if self.result is None:
+            if not self._done:
+                if self._buffer:
+                    self._compare(self._buffer)
+                self._compare(None)
+            if self._diff:
+                self.result = JudgeResult.Wrong
+                self.message = self._getMessage()
+            else:
+                self.result = JudgeResult.Accept
+            self._expected.close()
+        return self.result, self.message
+
+    def _getMessage(self) -> str:
+        assert self._diff
+        line, expected, real = self._diff
+        afterExpected = []
+        while expected is not None and len(afterExpected) < self.context:
+            item = self._expected.readline()
+            if not item:
+                break
+            afterExpected.append(item.rstrip())
+        ls = [f"--- {self.expectedName}", f"+++ {self.realName}",
+              f"@@ line {line} @@"]
+        ls += ["  " + _decode(x) for x in self._before]
+        ls += ["- " + _decode(expected), "+ " + _decode(real)]
+        ls += ["- " + _decode(x) for x in afterExpected]
+        ls += ["+ " + _decode(x) for x in self._afterReal]
+        return "\n".join(ls)
+
+
+def compareFiles(expectedFile: str, realFile: str, context: int = 3,
+                 chunkSize: int = 1 << 20) -> Tuple[JudgeResult, Optional[str]]:
+    """
+    Compare two text files ignoring trailing whitespace in constant memory.
+    Identical blocks are skipped without splitting lines. Compressed or packed expected
+    files are decompressed while comparing.
+    """
+    comparator = StreamComparator(expectedFile, os.path.split(realFile)[-1], context)
+    if not isPlainFile(expectedFile):
+        with open(realFile, "rb") as fr:
+            for data in iter(lambda: fr.read(chunkSize), b""):
+                if not comparator.feed(data):
+                    break
+        return comparator.finish()
+    with open(expectedFile, "rb") as fe, open(realFile, "rb") as fr:
+        offset, lines, boundary, boundaryLines = 0, 0, 0, 0
+        window = b""  # the last two equal blocks, for context lines
+        while True:
+            expected, real = fe.read(chunkSize), fr.read(chunkSize)
+            if expected != real:
+                break
+            if not expected:
+                comparator.finish()
+                return JudgeResult.Accept, None
+            lines += expected.count(b"\n")
+            ind = expected.rfind(b"\n")
+            if ind >= 0:
+                boundary, boundaryLines = offset + ind + 1, lines
+            offset += len(expected)
+            window = window[-chunkSize:] + expected
+        cut = offset - boundary
+        before = window[:len(window) - cut] if cut <= len(window) else b""
+        comparator.skip(boundary, boundaryLines,
+                        before.split(b"\n")[:-1][-context:] if context else [])
+        fr.seek(boundary)
+        while True:
+            data = fr.read(chunkSize)
+            if not data or not comparator.feed(data):
+                break
+    return comparator.finish()
+
+
+def judgeText(std: DataItem, out: DataItem) -> Tuple[JudgeResult, Optional[str]]:
+    return compareFiles(std.file, out.file)
+
+
 def judging(func: Callable[[DataItem, DataItem], Tuple[JudgeResult, Optional[str]]], autoload: bool = True) -> None:
     assertArgv()
-    files, data = getFileNames(), getFileContents() if autoload else ([], [])
-    judged(*func(DataItem(files[0], data[0]), DataItem(files[1], data[1])))
+    files = getFileNames()
+    if autoload:
+        data = getFileContents(*files)
+        judged(*func(DataItem(files[0], data[0]), DataItem(files[1], data[1])))
+    else:
+        judged(*func(DataItem(files[0], []), DataItem(files[1], [])))
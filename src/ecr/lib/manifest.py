@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..core._ConfigCache import loadYamlFile, racyWindow
+from ..core._Step import CONST_cpuTimeLimit, CONST_memoryLimit, CONST_stackSize, CONST_timeLimit, RunLimit
+from ..core.path import getManifestPath
+from .datafile import listPack, openData, packExts, splitPackPath, stripCompression
+from .globs import matchAny
+
+MANIFEST_FILE: str = "manifest.yml"
+
+CONST_cases: str = "cases"
+CONST_name: str = "name"
+CONST_input: str = "input"
+CONST_std: str = "std"
+CONST_tags: str = "tags"
+CONST_hash: str = "hash"
+CONST_stamp: str = "stamp"
+
+limitKeys: Tuple[str, ...] = (CONST_timeLimit, CONST_memoryLimit, CONST_cpuTimeLimit, CONST_stackSize)
+
+
+def naturalKey(text: str) -> List:
+    """Sort key putting `input2` before `input10`."""
+    return [(0, int(x), "") if x.isdigit() else (1, 0, x.lower()) for x in re.split(r"(\d+)", text) if x]
+
+
+def _dataFiles(dataPath: str) -> Dict[str, str]:
+    """Data file names (without compression extension) to their paths, packs included."""
+    ret: Dict[str, str] = {}
+    sources: List[Tuple[str, List[str]]] = []
+    if os.path.isdir(dataPath):
+        sources.append((dataPath, sorted(x for x in os.listdir(dataPath)
+                                         if os.path.isfile(os.path.join(dataPath, x)))))
+    for ext in packExts:
+        pack = dataPath.rstrip("/\\") + ext
+        if os.path.isfile(pack):
+            sources.append((pack, sorted(listPack(pack))))
+    # packs made from the data directory itself hold `data/inputN...`
+    prefix = os.path.basename(os.path.normpath(dataPath)) + "/"
+    for base, names in sources:
+        for name in names:
+            key = stripCompression(name[len(prefix):] if name.startswith(prefix) else name)
+            if key not in ret:  # plain files in the directory win
+                ret[key] = os.path.join(base, name)
+    return ret
+
+
+def discoverCases(dataPath: str) -> List[Tuple[str, str, str]]:
+    """(name, input, expected output) of the `inputN`/`stdN` files, in natural order."""
+    ret = []
+    files = _dataFiles(dataPath)
+    for item in files:
+        name = os.path.basename(item)
+        if not name.startswith("input") or os.path.dirname(item):
+            continue
+        expect = item.replace("input", "std", 1)
+        ret.append((os.path.splitext(name)[0].replace("input", "", 1), files[item],
+                    files.get(expect, os.path.join(dataPath, expect))))
+    ret.sort(key=lambda x: naturalKey(x[0]))
+    return ret
+
+
+def _stamp(path: str) -> List[int]:
+    """mtime and size of a data file, or of the pack holding it; empty while it may still change."""
+    pack = splitPackPath(path)
+    try:
+        st = os.stat(pack[0] if pack else path)
+    except OSError:
+        return []
+    if st.st_mtime_ns >= (time.time() - racyWindow) * 1e9:
+        return []
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _hash(path: str) -> Optional[str]:
+    # compressed files are hashed as stored, files in packs by content
+    h = hashlib.sha256()
+    try:
+        with (openData(path) if splitPackPath(path) else open(path, "rb")) as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+class CaseEntry:
+    def __init__(self, name: str, input: str, std: str):  # pylint: disable=W0622
+        self.name: str = name
+        self.input: str = input  # relative to the parent of the data directory
+        self.std: str = std
+        self.tags: List[str] = []
+        self.limit: RunLimit = RunLimit()
+        self.hash: Dict[str, Optional[str]] = {}  # input/std: sha256
+        self.stamp: Dict[str, List[int]] = {}  # input/std: [mtime, size]
+
+    def toDict(self) -> Dict:
+        ret: Dict = {CONST_name: self.name, CONST_input: self.input, CONST_std: self.std,
+                     CONST_tags: list(self.tags)}
+        for key in limitKeys:
+            if getattr(self.limit, key) is not None:
+                ret[key] = getattr(self.limit, key)
+        ret[CONST_hash] = dict(self.hash)
+        ret[CONST_stamp] = {k: list(v) for k, v in self.stamp.items()}
+        return ret
+
+    @staticmethod
+    def fromDict(data: Dict) -> "CaseEntry":
+        ret = CaseEntry(str(data[CONST_name]), data[CONST_input], data[CONST_std])
+        ret.tags = [str(x) for x in data.get(CONST_tags) or []]
+        ret.limit = RunLimit(**{k: data.get(k) for k in limitKeys})
+        ret.hash = data.get(CONST_hash) or {}
+        ret.stamp = data.get(CONST_stamp) or {}
+        return ret
+
+
+class Manifest:
+    """
+    The cases of a data directory kept in `.ecr/cache/manifest.yml` of its parent, out of
+    the data the runs read and the watcher sees: name, input and expected output (relative
+    to the parent of the data directory), tags and limits, which are edited by hand and
+    kept, and content hashes, which `update` refreshes for the files whose mtime or size changed.
+    """
+
+    def __init__(self, dataPath: str):
+        self.dataPath: str = dataPath
+        self.base: str = os.path.dirname(os.path.abspath(dataPath))
+        self.file: str = getManifestPath(self.base)
+        self.cases: List[CaseEntry] = []
+        self.changed: List[str] = []  # names of the cases new or changed since the last update
+        self._saved: List[Dict] = []
+        # manifests used to be kept in the data directory; move them on the next save
+        self._legacy: Optional[str] = os.path.join(dataPath, MANIFEST_FILE)
+        if os.path.isfile(self.file) or not os.path.isfile(self._legacy):
+            self._legacy = None
+        source = self._legacy or self.file
+        if os.path.isfile(source):
+            data = loadYamlFile(source) or {}
+            self.cases = [CaseEntry.fromDict(x) for x in data.get(CONST_cases) or []]
+            if not self._legacy:
+                self._saved = [x.toDict() for x in self.cases]
+
+    def path(self, rel: str) -> str:
+        return os.path.join(self.base, rel)
+
+    def update(self) -> List[str]:
+        """Sync with the data files and save; return the names of new and changed cases."""
+        old = {x.name: x for x in self.cases}
+        self.cases, self.changed = [], []
+        for name, inputFile, stdFile in discoverCases(self.dataPath):
+            entry = old.get(name)
+            if not entry:
+                entry = CaseEntry(name, "", "")
+            files = {CONST_input: inputFile, CONST_std: stdFile}
+            isChanged = name not in old
+            for key, file in files.items():
+                rel = os.path.relpath(os.path.abspath(file), self.base).replace(os.sep, "/")
+                stamp = _stamp(file)
+                if rel != getattr(entry, key) or not stamp or stamp != entry.stamp.get(key):
+                    digest = _hash(file)
+                    isChanged = isChanged or digest != entry.hash.get(key)
+                    entry.hash[key] = digest
+                setattr(entry, key, rel)
+                entry.stamp[key] = stamp
+            if isChanged:
+                self.changed.append(name)
+            self.cases.append(entry)
+        self.save()
+        return self.changed
+
+    def select(self, tags: Optional[List[str]] = None, patterns: Optional[List[str]] = None,
+               changedOnly: bool = False) -> List[CaseEntry]:
+        """Cases with any of `tags` whose name matches any of the glob `patterns`."""
+        return [x for x in self.cases
+                if (not tags or set(tags) & set(x.tags))
+                and (not patterns or matchAny(x.name, patterns))
+                and (not changedOnly or x.name in self.changed)]
+
+    def save(self) -> None:
+        data = [x.toDict() for x in self.cases]
+        if data == self._saved:
+            return
+        import yaml
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        temp = f"{self.file}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding='utf-8') as f:
+            f.write("# Generated by ecr; tags and limits (timeLimit, memoryLimit, cpuTimeLimit, "
+                    "stackSize) of cases may be edited\n")
+            f.write(yaml.dump({CONST_cases: data}, indent=4, default_flow_style=False))
+        os.replace(temp, self.file)
+        self._saved = data
+        if self._legacy:
+            os.remove(self._legacy)
+            self._legacy = None
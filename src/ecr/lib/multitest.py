@@ -0,0 +1,263 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..core._Runner import Runner, RunResult, StepResult, startProcess
+from ..core._Step import RunLimit
+from ..core.path import getCaseResultsPath
+from .console import error, info, ok, write
+from .datafile import feedData, isPlainFile
+from .judger import DataItem, JudgeResult, judgeText
+from .manifest import Manifest
+
+Judger = Callable[[DataItem, DataItem], Tuple[JudgeResult, Optional[str]]]
+
+
+class TestCase:
+    def __init__(self, name: str, inputFile: str, outputFile: str, expectFile: str):
+        self.name: str = name
+        self.inputFile: str = inputFile
+        self.outputFile: str = outputFile
+        self.expectFile: str = expectFile
+        self.tags: List[str] = []
+        self.limit: Optional[RunLimit] = None  # overrides the limits of the run
+        self.hash: Dict[str, Optional[str]] = {}  # input/std: sha256, from the manifest
+
+
+class CaseResult:
+    def __init__(self, case: TestCase):
+        self.case: TestCase = case
+        self.runResult: Optional[RunResult] = None
+        self.returnCode: Optional[int] = None
+        self.judgeResult: Optional[JudgeResult] = None
+        self.message: Optional[str] = None
+        self.time: float = 0
+        self.cpuTime: float = 0
+        self.maxRss: int = 0
+        self.stamp: List = []  # of the case files the result was got from, see `_caseStamp`
+
+    @property
+    def passed(self) -> bool:
+        if self.runResult != RunResult.Success:
+            return False
+        return self.judgeResult in (None, JudgeResult.Accept)
+
+    def toDict(self) -> Dict:
+        return {"runResult": self.runResult.name if self.runResult else None,
+                "returnCode": self.returnCode,
+                "judgeResult": self.judgeResult.name if self.judgeResult else None,
+                "message": self.message, "time": self.time, "cpuTime": self.cpuTime,
+                "maxRss": self.maxRss, "stamp": self.stamp}
+
+    @staticmethod
+    def fromDict(case: TestCase, data: Dict) -> "CaseResult":
+        ret = CaseResult(case)
+        ret.runResult = RunResult[data["runResult"]] if data.get("runResult") else None
+        ret.returnCode = data.get("returnCode")
+        ret.judgeResult = JudgeResult[data["judgeResult"]] if data.get("judgeResult") else None
+        ret.message = data.get("message")
+        ret.time, ret.cpuTime, ret.maxRss = data.get("time", 0), data.get("cpuTime", 0), data.get("maxRss", 0)
+        ret.stamp = data.get("stamp") or []
+        return ret
+
+
+def findCases(dataPath: str, tags: Optional[List[str]] = None, patterns: Optional[List[str]] = None,
+              changedOnly: bool = False) -> List[TestCase]:
+    """
+    Cases `inputN`/`stdN` in `dataPath`, plain or compressed (.gz, .xz, .zst), or in a
+    pack next to it (`data.zip`, `data.tar.gz`, ...), in natural order. They are kept in
+    the manifest of `dataPath` (see `Manifest`), and can be selected by `tags`,
+    by glob `patterns` of their names, or to those changed since the last call.
+    Outputs are written to `dataPath`.
+    """
+    manifest = Manifest(dataPath)
+    manifest.update()
+    ret = []
+    for entry in manifest.select(tags, patterns, changedOnly):
+        case = TestCase(entry.name, manifest.path(entry.input),
+                        os.path.join(dataPath, f"output{entry.name}.data"), manifest.path(entry.std))
+        case.tags, case.limit, case.hash = entry.tags, entry.limit, dict(entry.hash)
+        ret.append(case)
+    return ret
+
+
+def _caseStamp(case: TestCase) -> List:
+    """Hashes of the input and expected output, mtime and size of the output."""
+    try:
+        st = os.stat(case.outputFile)
+        output = [st.st_mtime_ns, st.st_size]
+    except OSError:
+        output = []
+    return [case.hash.get("input"), case.hash.get("std"), output]
+
+
+def loadResults(dataPath: str, cases: List[TestCase]) -> Dict[str, CaseResult]:
+    """
+    Results saved by `runCases` for `cases`, by name, leaving out the cases not run
+    and not judged since, or whose input, expected or actual output changed since.
+    """
+    try:
+        with open(getCaseResultsPath(os.path.dirname(os.path.abspath(dataPath))), "r", encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    ret = {}
+    for case in cases:
+        item = data.get(case.name)
+        if not item:
+            continue
+        try:
+            result = CaseResult.fromDict(case, item)
+        except (KeyError, TypeError):
+            continue
+        if result.stamp == _caseStamp(case) and (
+                result.judgeResult is not None or result.runResult != RunResult.Success):
+            ret[case.name] = result
+    return ret
+
+
+def saveResults(dataPath: str, results: List[CaseResult]) -> None:
+    """Keep the results of a run for `judgeCases`, along with those of the cases not run."""
+    file = getCaseResultsPath(os.path.dirname(os.path.abspath(dataPath)))
+    try:
+        with open(file, "r", encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    for result in results:
+        data[result.case.name] = result.toDict()
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    temp = f"{file}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp, file)
+
+
+def judgeCase(case: TestCase, judger: Judger = judgeText, result: Optional[CaseResult] = None) -> CaseResult:
+    if result is None:
+        result = CaseResult(case)
+        result.runResult = RunResult.Success
+    try:
+        result.judgeResult, result.message = judger(
+            DataItem(case.expectFile), DataItem(case.outputFile))
+    except Exception as e:  # pylint: disable=W0703
+        result.judgeResult, result.message = JudgeResult.Error, f"Judger Error: {e}"
+    return result
+
+
+def _runStep(case: TestCase, command: str, wdir: str, limit: RunLimit) -> StepResult:
+    os.makedirs(os.path.dirname(case.outputFile) or ".", exist_ok=True)
+    if isPlainFile(case.inputFile):
+        with open(case.inputFile, "r") as fin, open(case.outputFile, "w") as fout:
+            proc = startProcess(command, cwd=wdir, stdin=fin,
+                                stdout=fout, stderr=subprocess.DEVNULL, limit=limit)
+            return Runner(proc=proc, io="ff", timelimit=limit.timeLimit, limit=limit).run()
+    # decompress into a pipe while the program runs
+    fin, feeder = feedData(case.inputFile)
+    try:
+        with open(case.outputFile, "w") as fout:
+            proc = startProcess(command, cwd=wdir, stdin=fin,
+                                stdout=fout, stderr=subprocess.DEVNULL, limit=limit)
+    finally:
+        os.close(fin)
+    step = Runner(proc=proc, io="ff", timelimit=limit.timeLimit, limit=limit).run()
+    feeder.join()
+    return step
+
+
+def runCase(case: TestCase, command: str, wdir: str, timeLimit: Optional[int] = None,
+            judger: Optional[Judger] = judgeText, limit: Optional[RunLimit] = None) -> CaseResult:
+    result = CaseResult(case)
+    limit = RunLimit(timeLimit=timeLimit).merge(limit).merge(case.limit)
+    try:
+        step = _runStep(case, command, wdir, limit)
+    except Exception as e:  # pylint: disable=W0703
+        # e.g. the command or the input cannot be found: fail this case only
+        result.runResult, result.message = RunResult.Error, f"Run Error: {e}"
+        result.stamp = _caseStamp(case)
+        return result
+    result.runResult, result.returnCode = step.result, step.returnCode
+    result.time, result.cpuTime, result.maxRss = step.wallTime, step.cpuTime, step.maxRss
+    if judger is not None and result.runResult == RunResult.Success:
+        judgeCase(case, judger, result)
+    result.stamp = _caseStamp(case)
+    return result
+
+
+def _runAll(func, cases: List[TestCase], workers: Optional[int], showLog: bool, args) -> List[CaseResult]:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, case, *args): case for case in cases}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # pylint: disable=W0703
+                # a worker that died, or a result that cannot be sent back
+                result = CaseResult(futures[future])
+                result.runResult, result.message = RunResult.Error, f"Error: {e}"
+            if showLog:
+                if result.passed:
+                    info(f"Finished: {result.case.name}")
+                else:
+                    error(f"Test case {result.case.name} failed.")
+            results.append(result)
+    order = {case.name: ind for ind, case in enumerate(cases)}
+    results.sort(key=lambda x: order[x.case.name])
+    return results
+
+
+def runCases(command: str, dataPath: str = "./data", timeLimit: Optional[int] = None,
+             workers: Optional[int] = None, judger: Optional[Judger] = judgeText,
+             wdir: Optional[str] = None, showLog: bool = True,
+             limit: Optional[RunLimit] = None, tags: Optional[List[str]] = None,
+             patterns: Optional[List[str]] = None, changedOnly: bool = False) -> List[CaseResult]:
+    """
+    Run every case in `dataPath` (or those selected, see `findCases`) on a process pool
+    with `workers` workers (default: cpu count). Each case is judged in its worker
+    as soon as its run finishes, unless `judger` is None. The results are saved
+    for `judgeCases` in `.ecr/cache/results.json` next to `dataPath`.
+    """
+    results = _runAll(runCase, findCases(dataPath, tags, patterns, changedOnly), workers, showLog,
+                      (command, wdir if wdir else os.getcwd(), timeLimit, judger, limit))
+    saveResults(dataPath, results)
+    return results
+
+
+def judgeCases(dataPath: str = "./data", workers: Optional[int] = None,
+               judger: Judger = judgeText, showLog: bool = True,
+               tags: Optional[List[str]] = None, patterns: Optional[List[str]] = None,
+               useSaved: bool = False) -> List[CaseResult]:
+    """
+    Judge the outputs of the cases. With `useSaved`, the results saved by `runCases`
+    are reported instead for the cases judged by it whose files are unchanged since.
+    """
+    cases = findCases(dataPath, tags, patterns)
+    saved = loadResults(dataPath, cases) if useSaved else {}
+    judged = _runAll(judgeCase, [x for x in cases if x.name not in saved], workers, showLog, (judger,))
+    results = {x.case.name: x for x in judged}
+    results.update(saved)
+    return [results[x.name] for x in cases]
+
+
+def printResults(results: List[CaseResult], showMessage: bool = True) -> None:
+    nameLen = max([len("Case")] + [len(x.case.name) for x in results])
+    write(f"{'Case'.ljust(nameLen)}  {'Run'.ljust(8)}  {'Judge'.ljust(8)}  {'Time'.ljust(8)}  {'CPU'.ljust(8)}  Memory")
+    for result in results:
+        run = result.runResult.name if result.runResult else "-"
+        judge = result.judgeResult.name if result.judgeResult else "-"
+        line = f"{result.case.name.ljust(nameLen)}  {run[:8].ljust(8)}  {judge.ljust(8)}  {f'{result.time:.3f}s'.ljust(8)}  {f'{result.cpuTime:.3f}s'.ljust(8)}  {result.maxRss / 1024:.1f}MB"
+        if result.passed:
+            write(line)
+        else:
+            error(line)
+    for result in results:
+        if showMessage and result.message:
+            write(result.message)
+    passed = len([x for x in results if x.passed])
+    summary = f"Passed {passed} / {len(results)}, total time {sum(x.time for x in results):.3f}s"
+    if passed == len(results):
+        ok(summary)
+    else:
+        error(summary)
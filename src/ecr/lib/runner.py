@@ -1,8 +1,10 @@
 from typing import Dict, List, Callable, Optional
 from ..core.defaultData import CIO_SISO, CIO_SIFO, CIO_FISO, CIO_FIFO, CIO_Types
+from ..core._Runner import RunCommandsResult, RunResult, StepResult
+from ..core._Step import RunLimit
 
 
-def runCommands(io: str, commands: List[str], variables: Dict[str, str], wdir: str, getSystemCommand: Callable[[str], str], inputFile: str, outputFile: str, defaultTimeLimit: Optional[int] = None, showLog: bool = True) -> bool:
+def runCommands(io: str, commands: List[str], variables: Dict[str, str], wdir: str, getSystemCommand: Callable[[str], str], inputFile: str, outputFile: str, defaultTimeLimit: Optional[int] = None, showLog: bool = True, defaultLimit: Optional[RunLimit] = None) -> RunCommandsResult:
     from ..core.manager import runCommands as internal_rc
     return internal_rc(io, commands, variables, wdir, getSystemCommand,
-                       inputFile, outputFile, defaultTimeLimit, showLog)
+                       inputFile, outputFile, defaultTimeLimit, showLog, defaultLimit=defaultLimit)
@@ -0,0 +1,175 @@
+import math
+import statistics
+from typing import Callable, List, Optional, Tuple
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of `values`, `p` in [0, 100]."""
+    data = sorted(values)
+    if not data:
+        return math.nan
+    k = (len(data) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def rejectOutliers(values: List[float], k: float = 1.5) -> Tuple[List[float], List[float]]:
+    """
+    Split `values` into (kept, rejected) by Tukey's fences:
+    outside [Q1 - k*IQR, Q3 + k*IQR]. Less than four values are all kept.
+    """
+    if len(values) < 4:
+        return list(values), []
+    q1, q3 = percentile(values, 25), percentile(values, 75)
+    lo, hi = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    kept = [x for x in values if lo <= x <= hi]
+    return kept, [x for x in values if not lo <= x <= hi]
+
+
+class Summary:
+    def __init__(self, values: List[float], reject: bool = True):
+        kept, rejected = rejectOutliers(values) if reject else (list(values), [])
+        self.count: int = len(kept)
+        self.rejected: int = len(rejected)
+        self.min: float = min(kept) if kept else math.nan
+        self.max: float = max(kept) if kept else math.nan
+        self.median: float = statistics.median(kept) if kept else math.nan
+        self.mean: float = statistics.mean(kept) if kept else math.nan
+        self.p95: float = percentile(kept, 95)
+        self.stddev: float = statistics.stdev(kept) if len(kept) > 1 else 0
+
+
+def tQuantile(df: int, confidence: float = 0.95) -> float:
+    """Two-sided Student t quantile, by bisection on the incomplete beta function."""
+    if df <= 0:
+        return math.inf
+    target = (1 - confidence) / 2
+
+    def tail(t: float) -> float:  # P(T > t)
+        x = df / (df + t * t)
+        return 0.5 * _betaInc(df / 2, 0.5, x)
+    lo, hi = 0.0, 1000.0
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if tail(mid) > target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def _betaInc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b) (continued fraction)."""
+    if x <= 0:
+        return 0
+    if x >= 1:
+        return 1
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1 - x))
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _betaInc(b, a, 1 - x)
+    f, c, d = 1.0, 1.0, 0.0
+    for i in range(200):
+        m = i // 2
+        if i == 0:
+            num = 1.0
+        elif i % 2 == 0:
+            num = m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m))
+        else:
+            num = -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+        d = 1 + num * d
+        d = 1 / (d if abs(d) > 1e-30 else 1e-30)
+        c = 1 + num / (c if abs(c) > 1e-30 else 1e-30)
+        f *= c * d
+        if abs(1 - c * d) < 1e-12:
+            break
+    return front * (f - 1) / a
+
+
+def meanInterval(values: List[float], confidence: float = 0.95) -> Tuple[float, float, float]:
+    """Mean of `values` with its Student t confidence interval, as (mean, low, high)."""
+    mean = statistics.mean(values)
+    if len(values) < 2:
+        return mean, math.nan, math.nan
+    half = tQuantile(len(values) - 1, confidence) * statistics.stdev(values) / math.sqrt(len(values))
+    return mean, mean - half, mean + half
+
+
+def speedupInterval(baseline: List[float], other: List[float],
+                    confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Speedup of `other` over `baseline` from paired samples (run i of both in the same round):
+    the geometric mean of baseline/other with its confidence interval, as (speedup, low, high).
+    Outlying pairs are rejected first.
+    """
+    logs, _ = rejectOutliers([math.log(b / o) for b, o in zip(baseline, other) if b > 0 and o > 0])
+    if not logs:
+        return math.nan, math.nan, math.nan
+    return geomeanInterval(logs, confidence)
+
+
+def geomeanInterval(logs: List[float], confidence: float = 0.95) -> Tuple[float, float, float]:
+    """exp of the mean of `logs` with its confidence interval."""
+    mean, low, high = meanInterval(logs, confidence)
+    return math.exp(mean), math.exp(low), math.exp(high)
+
+
+complexityModels: List[Tuple[str, Callable[[float], float]]] = [
+    ("O(1)", lambda n: 1),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: n ** 2),
+    ("O(n^3)", lambda n: n ** 3),
+    ("O(2^n)", lambda n: 2.0 ** n),
+]
+
+
+class ComplexityFit:
+    """t(n) = a + b * f(n), fitted by least squares on relative errors."""
+
+    def __init__(self, name: str, func: Callable[[float], float], a: float, b: float, error: float):
+        self.name: str = name
+        self.func: Callable[[float], float] = func
+        self.a: float = a  # constant overhead, s
+        self.b: float = b
+        self.error: float = error  # root mean square of the relative errors
+
+    def predict(self, n: float) -> float:
+        try:
+            return self.a + self.b * self.func(n) if self.b else self.a
+        except OverflowError:
+            return math.inf
+
+
+def fitComplexity(sizes: List[float], times: List[float]) -> List[ComplexityFit]:
+    """
+    Fit every model of `complexityModels` to the (size, time) points, best fit first.
+    Each point is weighted by 1/time^2, so small and large sizes count alike.
+    """
+    ret = []
+    weights = [1 / (t * t) if t > 0 else 1.0 for t in times]
+    sw = sum(weights)
+    for name, func in complexityModels:
+        try:
+            xs = [float(func(n)) for n in sizes]
+        except OverflowError:
+            continue
+        fit: Optional[Tuple[float, float]] = None
+        sx = sum(w * x for w, x in zip(weights, xs))
+        sxx = sum(w * x * x for w, x in zip(weights, xs))
+        det = sw * sxx - sx * sx
+        if not math.isinf(sxx) and det > 1e-12 * sw * sxx:
+            sy = sum(w * y for w, y in zip(weights, times))
+            sxy = sum(w * x * y for w, x, y in zip(weights, xs, times))
+            b = (sw * sxy - sx * sy) / det
+            if b >= 0:
+                fit = ((sy - b * sx) / sw, b)
+        if fit is None:  # a constant, or a decreasing fit: keep only the overhead
+            fit = (sum(w * y for w, y in zip(weights, times)) / sw, 0.0)
+        a, b = fit
+        error = math.sqrt(sum(((a + b * x) - y) ** 2 * w
+                              for w, x, y in zip(weights, xs, times)) / len(times))
+        ret.append(ComplexityFit(name, func, a, b, error))
+    ret.sort(key=lambda x: x.error)
+    return ret
@@ -1,6 +1,5 @@
 import logging
 from typing import List, Dict
-from prompt_toolkit import HTML
 
 LOG_FORMAT = "#%(levelname)s|%(asctime)s|%(message)s"
 DATE_FORMAT = "%m/%d/%Y %H:%M:%S %p"
@@ -41,7 +40,8 @@ levelToStyle: Dict[str, str] = {
 }
 
 
-def colored(msg: str) -> HTML:
+def colored(msg: str):
+    from prompt_toolkit import HTML
     if not msg.startswith("#"):
         return HTML(HTML(f'<obj>{msg}</obj>'))
     spl = msg[1:].split('|')
@@ -1,14 +1,15 @@
 import os
 import shutil
-from typing import Optional, Tuple
-import yaml
+from typing import List, Optional, Tuple
 from .. import log
+from ..core._ConfigCache import loadYaml
 from ..types import CommandList
 from .path import getConfigPath, getConfigFile
 
 CONST_rootPath: str = "rootPath"
 CONST_after: str = "after"
 CONST_subject: str = "subject"
+CONST_link: str = "link"
 
 
 class Template:
@@ -16,6 +17,7 @@ class Template:
         self.subject: str = subject
         self.rootPath: str = rootpath
         self.after: CommandList = []
+        self.link: List[str] = []  # globs of read-only files to hard link instead of copying
 
 
 def load(basepath: str) -> Tuple[Optional[Template], Optional[Exception]]:
@@ -25,10 +27,11 @@ def load(basepath: str) -> Tuple[Optional[Template], Optional[Exception]]:
     exp = None
     try:
         with open(getConfigFile(basepath), "r", encoding='utf-8') as f:
-            config = yaml.load(f.read())
+            config = loadYaml(f.read())
             ret.subject = config[CONST_subject]
             ret.rootPath = os.path.join(basepath, config[CONST_rootPath])
             ret.after = config[CONST_after]
+            ret.link = config.get(CONST_link, [])
     except Exception as e:
         log.errorWithException(f"Loading template failed from {basepath}")
         exp = e
@@ -43,6 +46,7 @@ def clear(basepath: str)->None:
 
 
 def initialize(basepath: str)->None:
+    import yaml
     clear(basepath)
 
     log.debug(f"Initialize template data at {basepath}")
@@ -59,7 +63,8 @@ def initialize(basepath: str)->None:
 
     config = {CONST_subject: os.path.split(basepath)[-1],
               CONST_rootPath: "",
-              CONST_after: [], }
+              CONST_after: [],
+              CONST_link: [], }
 
     with open(getConfigFile(basepath), "w", encoding='utf-8') as f:
         f.write(yaml.dump(config, indent=4,
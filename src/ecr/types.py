@@ -1,6 +1,8 @@
-from typing import Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
-CommandList = List[str]
+StepConfig = Union[str, List[Any], Dict[str, Any]]
+
+CommandList = List[StepConfig]
 
 ExecutorMapping = Dict[str, CommandList]
 
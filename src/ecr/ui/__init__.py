@@ -1,9 +1,15 @@
-from .cli import CLI, SwitchState
-from .helper import PathCompleter
+from .cli import CLI, PlainCLI, SwitchState
 
 _console: CLI = CLI()
 
 
+def __getattr__(name: str):
+    if name == "PathCompleter":  # imports prompt_toolkit, only needed by the shell
+        from .helper import PathCompleter
+        return PathCompleter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def getConsole() -> CLI:
     return _console
 
@@ -1,12 +1,7 @@
+import sys
+import threading
 from enum import Enum
-from typing import Dict, List, Optional
-import click
-from pygments.lexers.shell import BashLexer
-from prompt_toolkit import prompt, print_formatted_text, PromptSession
-from prompt_toolkit.lexers import PygmentsLexer
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.shortcuts import ProgressBar
-from prompt_toolkit.application import run_in_terminal
+from typing import Any, Dict, List, Optional
 from . import color
 
 
@@ -27,23 +22,65 @@ confirmStrToSwitch: Dict[str, SwitchState] = {
 switchToConfirmStr: Dict[SwitchState, str] = {
     v: k for k, v in confirmStrToSwitch.items()}
 
-defaultInputCommandSession = PromptSession(
-    message="> ", lexer=PygmentsLexer(BashLexer), auto_suggest=AutoSuggestFromHistory())
+
+def createInputCommandSession(message: str = "> "):
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.lexers import PygmentsLexer
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from .helper.BashLexer import BashLexer
+    return PromptSession(
+        message=message, lexer=PygmentsLexer(BashLexer), auto_suggest=AutoSuggestFromHistory())
 
 
 class CLI:
-    def __init__(self, inputCommandSession: Optional[PromptSession] = None):
-        self.read = prompt
-        self.getProgressBar = ProgressBar
-        self.inputCommandSession: PromptSession = inputCommandSession if inputCommandSession \
-            else defaultInputCommandSession
-        self.inputCommand = self.inputCommandSession.prompt
-        self.edit = click.edit
-        self.clear = click.clear
+    """
+    Interactive console on prompt_toolkit. prompt_toolkit, pygments and click
+    are imported on first use, and the prompt session is built on first input.
+    """
+
+    def __init__(self, inputCommandSession=None):
+        self._inputCommandSession = inputCommandSession
+
+    @property
+    def inputCommandSession(self):
+        if self._inputCommandSession is None:
+            self._inputCommandSession = createInputCommandSession()
+        return self._inputCommandSession
+
+    def inputCommand(self, *args, **kwargs) -> str:
+        return self.inputCommandSession.prompt(*args, **kwargs)
+
+    def read(self, *args, **kwargs) -> str:  # pylint: disable=R0201
+        from prompt_toolkit import prompt
+        return prompt(*args, **kwargs)
+
+    def getProgressBar(self, *args, **kwargs):  # pylint: disable=R0201
+        from prompt_toolkit.shortcuts import ProgressBar
+        return ProgressBar(*args, **kwargs)
+
+    def edit(self, *args, **kwargs):  # pylint: disable=R0201
+        import click
+        return click.edit(*args, **kwargs)
+
+    def clear(self) -> None:  # pylint: disable=R0201
+        import click
+        click.clear()
 
     def write(self, *values, **kwargs)->None:  # pylint: disable=R0201
+        from prompt_toolkit import print_formatted_text
+        from prompt_toolkit.application import run_in_terminal
+
         def func():
             print_formatted_text(*values, **kwargs)
+        if threading.current_thread() is not threading.main_thread():
+            # from a worker thread: print above the prompt if one is shown
+            app = self._inputCommandSession.app if self._inputCommandSession else None
+            loop = getattr(app, "loop", None) if app and app.is_running else None
+            if loop:
+                loop.call_soon_threadsafe(run_in_terminal, func)
+            else:
+                func()
+            return
         run_in_terminal(func)
 
     def info(self, message, end: str = "\n")->None:
@@ -65,3 +102,40 @@ class CLI:
             ret = self.read(
                 f"Not an acceptable value. Please input again ({swstr}): ")
         return confirmStrToSwitch[ret]
+
+
+class PlainCLI(CLI):
+    """
+    Console for non-interactive use (`ecr -c`), writing straight to stdout
+    with ANSI colors only when stdout is a terminal.
+    """
+
+    def __init__(self, file=None):
+        super().__init__()
+        self.file = file
+
+    def _toText(self, value: Any, useColor: bool) -> str:
+        if isinstance(value, color.ColoredText):
+            return value.toAnsi() if useColor else str(value)
+        if hasattr(value, "__pt_formatted_text__"):  # other formatted text, e.g. HTML
+            return "".join(x[1] for x in value.__pt_formatted_text__())
+        return str(value)
+
+    def write(self, *values, **kwargs)->None:
+        file = self.file if self.file else sys.stdout
+        useColor = file.isatty()
+        print(*[self._toText(x, useColor) for x in values],
+              sep=kwargs.get("sep", " "), end=kwargs.get("end", "\n"), file=file, flush=True)
+
+    def read(self, *args, **kwargs) -> str:
+        return input(*args)
+
+    def inputCommand(self, *args, **kwargs) -> str:
+        return input(*args)
+
+    def confirm(self, message: str, choice: List[SwitchState])->SwitchState:  # pragma: no cover
+        try:
+            return super().confirm(message, choice)
+        except EOFError:  # no input in scripts, take the last (most negative) choice
+            self.write()
+            return choice[-1]
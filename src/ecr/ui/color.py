@@ -1,21 +1,49 @@
-from prompt_toolkit import HTML
+from typing import Dict, List, Tuple
 
+ansiCodes: Dict[str, str] = {
+    "ansired": "31",
+    "ansigreen": "32",
+    "ansiyellow": "33",
+    "ansiblue": "34",
+    "ansicyan": "36",
+}
 
-def useRed(content: str)->HTML:
-    return HTML(f'<obj fg="ansired">{content}</obj>')
 
+class ColoredText:
+    """
+    Text in one color. prompt_toolkit renders it as formatted text,
+    so this module doesn't have to import prompt_toolkit.
+    """
 
-def useGreen(content: str)->HTML:
-    return HTML(f'<obj fg="ansigreen">{content}</obj>')
+    def __init__(self, content, fg: str):
+        self.content: str = str(content)
+        self.fg: str = fg
 
+    def __pt_formatted_text__(self) -> List[Tuple[str, str]]:
+        return [(f"fg:{self.fg}", self.content)]
 
-def useBlue(content: str)->HTML:
-    return HTML(f'<obj fg="ansiblue">{content}</obj>')
+    def toAnsi(self) -> str:
+        return f"\x1b[{ansiCodes[self.fg]}m{self.content}\x1b[0m"
 
+    def __str__(self) -> str:
+        return self.content
 
-def useCyan(content: str)->HTML:
-    return HTML(f'<obj fg="ansicyan">{content}</obj>')
 
+def useRed(content: str)->ColoredText:
+    return ColoredText(content, "ansired")
 
-def useYellow(content: str)->HTML:
-    return HTML(f'<obj fg="ansiyellow">{content}</obj>')
+
+def useGreen(content: str)->ColoredText:
+    return ColoredText(content, "ansigreen")
+
+
+def useBlue(content: str)->ColoredText:
+    return ColoredText(content, "ansiblue")
+
+
+def useCyan(content: str)->ColoredText:
+    return ColoredText(content, "ansicyan")
+
+
+def useYellow(content: str)->ColoredText:
+    return ColoredText(content, "ansiyellow")
@@ -42,7 +42,7 @@ class BashLexer(RegexLexer):
             # (r'\b(if|fi|else|while|do|done|for|then|return|function|case|'
             #  r'select|continue|until|esac|elif)(\s*)\b',
             #  bygroups(Keyword, Text)),
-            (r'\b(init|clear|new|now|edit|run|test|clean|pwd|cd|'
+            (r'\b(init|clear|new|now|edit|run|test|bench|background|stress|minimize|complexity|clean|pwd|cd|'
              r'version|cls|exit|debug|status|template|reload|show)', # (?=[\s)`])
              Name.Builtin),
             (r'\A#!.+\n', Comment.Hashbang),
@@ -0,0 +1,44 @@
+import os
+import platform
+import shutil
+import sys
+
+import pytest
+
+from ecr.core._Runner import Runner, RunResult, startProcess
+from ecr.core._Step import RunLimit
+
+linuxOnly = pytest.mark.skipif(platform.system() != "Linux", reason="measures VmHWM on Linux")
+
+
+def run(cmd: str):
+    return Runner(proc=startProcess(cmd, cwd=os.getcwd()), io="ff").run()
+
+
+@linuxOnly
+def test_tiny_program_reports_small_rss():
+    result = run(shutil.which("cat") + " /proc/self/status")
+    assert result.result == RunResult.Success
+    assert result.maxRss < 8 * 1024  # KB, not the RSS of this process inherited across exec
+
+
+@linuxOnly
+def test_rss_of_parent_is_not_inherited():
+    data = bytearray(200 << 20)
+    for i in range(0, len(data), 4096):
+        data[i] = 1
+    result = run(shutil.which("cat") + " /proc/self/status")
+    del data
+    assert result.maxRss < 8 * 1024
+
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="limits memory by RLIMIT_DATA")
+def test_memory_limit_needs_evidence():
+    limit = RunLimit(memoryLimit=64)
+
+    def runLimited(code: str):
+        proc = startProcess(f"{sys.executable} -c \"{code}\"", cwd=os.getcwd(), limit=limit)
+        return Runner(proc=proc, io="ff", limit=limit).run()
+
+    assert runLimited("x = bytearray(300 << 20)").result == RunResult.MemoryLimitExceeded
+    assert runLimited("exit(1)").result == RunResult.Error